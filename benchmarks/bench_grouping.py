@@ -0,0 +1,115 @@
+"""
+BENCH_GROUPING.PY - Benchmark de agrupación padre/variaciones
+Compara el recorrido original (groupby + escrituras .loc por fila) con la
+asignación por columnas de ProductGrouper.group_products
+
+Uso: python benchmarks/bench_grouping.py [n_filas ...]
+"""
+
+import sys
+import re
+import time
+import random
+import logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pandas as pd
+
+from src.grouping import ProductGrouper
+
+BASES = ['TORNILLO HEXAGONAL', 'ABRAZADERA COBRE', 'TUERCA ZINCADA', 'PERNO ANCLAJE',
+         'GOLILLA PRESION', 'ROSCALATA CABEZA PLANA', 'KIT TARUGOS', 'LLAVE ALLEN']
+MEASURES = ['M6', 'M8 X 30MM', '1/2', '3/8"', '10MM', '25MM', '', '(ROJO)']
+
+
+def make_frame(n: int, seed: int = 0) -> pd.DataFrame:
+    """Genera productos sintéticos con nombres base repetidos (grupos)."""
+    rnd = random.Random(seed)
+    names, skus = [], []
+    for i in range(n):
+        base = f"{rnd.choice(BASES)} {rnd.randint(1, n // 8 or 1)}"
+        names.append(f"{base} {rnd.choice(MEASURES)}".strip())
+        skus.append(f"SKU-{i}" if rnd.random() < 0.9 else None)
+    return pd.DataFrame({
+        'Nombre_Limpio': names,
+        'Tiene_Medidas': True,
+        'Atributo_diametro': [rnd.choice(['M6', '1/2"', None]) for _ in range(n)],
+        'SKU': skus,
+    })
+
+
+def legacy_group_products(grouper: ProductGrouper, df: pd.DataFrame) -> pd.DataFrame:
+    """Implementación previa: groupby + escrituras escalares con df.loc."""
+    df = df.copy()
+    if 'SKU_Origen' not in df.columns and 'SKU' in df.columns:
+        df['SKU_Origen'] = df['SKU'].copy()
+    df['Es_Padre_Potencial'] = df['Nombre_Limpio'].apply(grouper._is_potential_parent)
+    df['Tipo'] = 'simple'
+    df['SKU_WooCommerce'] = ''
+    df['SKU_Parent'] = None
+    df['Nombre_Base'] = df['Nombre_Limpio'].apply(grouper._extract_base_name)
+    has_origin = 'SKU_Origen' in df.columns
+    
+    for _, group_df in df.groupby('Nombre_Base'):
+        group_indices = group_df.index.tolist()
+        if len(group_df) > 1:
+            parent_idx = group_indices[0]
+            df.loc[parent_idx, 'Tipo'] = 'variable'
+            if has_origin and pd.notna(df.loc[parent_idx, 'SKU_Origen']):
+                parent_sku = re.sub(r'-[A-Z0-9]+$', '', str(df.loc[parent_idx, 'SKU_Origen']).strip())
+            else:
+                parent_sku = grouper._generate_parent_sku(df.loc[parent_idx, 'Nombre_Limpio'])
+            df.loc[parent_idx, 'SKU_WooCommerce'] = parent_sku
+            df.loc[parent_idx, 'SKU_Parent'] = None
+            for var_idx in group_indices[1:]:
+                df.loc[var_idx, 'Tipo'] = 'variable'
+                df.loc[var_idx, 'SKU_Parent'] = parent_sku
+                if has_origin and pd.notna(df.loc[var_idx, 'SKU_Origen']):
+                    var_sku = str(df.loc[var_idx, 'SKU_Origen']).strip()
+                else:
+                    var_sku = grouper._generate_variation_sku(
+                        parent_sku, df.loc[var_idx, 'Nombre_Limpio'], df.loc[var_idx])
+                df.loc[var_idx, 'SKU_WooCommerce'] = var_sku
+        else:
+            idx = group_indices[0]
+            if has_origin and pd.notna(df.loc[idx, 'SKU_Origen']):
+                df.loc[idx, 'SKU_WooCommerce'] = str(df.loc[idx, 'SKU_Origen']).strip()
+            else:
+                df.loc[idx, 'SKU_WooCommerce'] = grouper._generate_simple_sku(df.loc[idx, 'Nombre_Limpio'])
+    
+    df.loc[df['SKU_WooCommerce'].isna() | (df['SKU_WooCommerce'] == ''), 'SKU_WooCommerce'] = \
+        df['Nombre_Limpio'].apply(grouper._generate_simple_sku)
+    df['SKU'] = df['SKU_WooCommerce']
+    return df
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run(n: int) -> None:
+    df = make_frame(n)
+    grouper = ProductGrouper()
+    
+    legacy, t_legacy = timed(legacy_group_products, grouper, df)
+    columnar, t_columnar = timed(grouper.group_products, df)
+    pd.testing.assert_frame_equal(legacy, columnar)
+    
+    print(f"Filas:               {n} ({columnar['Nombre_Base'].nunique()} grupos)")
+    print(f"groupby + df.loc:    {t_legacy:.2f}s")
+    print(f"Por columnas:        {t_columnar:.2f}s")
+    print(f"Speedup vs original: {t_legacy / t_columnar:.1f}x")
+
+
+def main(sizes) -> None:
+    logging.disable(logging.INFO)
+    for n in sizes:
+        run(n)
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000])
@@ -0,0 +1,84 @@
+"""
+BENCH_PATTERNS.PY - Benchmark de extracción de atributos
+Compara el recorrido original (iterrows + df.at) con extract_to_dataframe
+fila a fila y por columnas (str.extractall)
+
+Uso: python benchmarks/bench_patterns.py [n_nombres]
+"""
+
+import sys
+import time
+import random
+import logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pandas as pd
+
+from src.patterns import PatternExtractor
+
+WORDS = ['ABRAZADERA', 'TORNILLO', 'TUERCA', 'HEXAGONAL', 'ZINCADO', 'TITAN', 'MINI',
+         'CABEZA', 'PLANA', 'ROSCALATA', 'GOLILLA', 'PRESION', 'PERNO', 'ANCLAJE', 'NEGRO']
+MEASURES = ['1/4"', '3/8"', '10MM', 'M6', 'X 30MM', '2.5MM', '10CM', '5M', 'INOX',
+            'ACERO', 'PACK 10', '100 PZ', '1 1/8"', '#8', 'ESPESOR 3']
+
+
+def make_names(n: int, seed: int = 0) -> list:
+    """Genera nombres sintéticos de ferretería."""
+    rnd = random.Random(seed)
+    return [
+        ' '.join(rnd.sample(WORDS, 3) + rnd.sample(MEASURES, rnd.randint(0, 3))
+                 + [str(rnd.randint(1, 9999))])
+        for _ in range(n)
+    ]
+
+
+def legacy_extract_to_dataframe(extractor: PatternExtractor, df: pd.DataFrame,
+                                name_column: str = 'Nombre_Limpio') -> pd.DataFrame:
+    """Implementación previa: iterrows + escrituras escalares con df.at."""
+    df = df.copy()
+    all_extracted = [extractor.extract_all_attributes(row.get(name_column, ''))
+                     for _, row in df.iterrows()]
+    all_attributes = set()
+    for extracted in all_extracted:
+        all_attributes.update(extracted.keys())
+    for attr in sorted(all_attributes):
+        df[f'Atributo_{attr}'] = None
+        df[f'Atributo_{attr}_confianza'] = 0.0
+        df[f'Atributo_{attr}_cantidad'] = 0
+    for idx, extracted in enumerate(all_extracted):
+        for attr, values in extracted.items():
+            if values:
+                df.at[idx, f'Atributo_{attr}'] = values[0].value
+                df.at[idx, f'Atributo_{attr}_confianza'] = values[0].confidence
+                df.at[idx, f'Atributo_{attr}_cantidad'] = len(values)
+    return df
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(n: int = 100_000) -> None:
+    logging.disable(logging.INFO)
+    df = pd.DataFrame({'Nombre_Limpio': make_names(n)})
+    extractor = PatternExtractor()
+    
+    legacy, t_legacy = timed(legacy_extract_to_dataframe, extractor, df)
+    rowwise, t_rowwise = timed(extractor.extract_to_dataframe, df, vectorized=False)
+    columnar, t_columnar = timed(extractor.extract_to_dataframe, df, vectorized=True)
+    pd.testing.assert_frame_equal(legacy, columnar)
+    pd.testing.assert_frame_equal(rowwise, columnar)
+    
+    print(f"Nombres:             {n}")
+    print(f"iterrows + df.at:    {t_legacy:.2f}s")
+    print(f"Fila a fila:         {t_rowwise:.2f}s")
+    print(f"Por columnas:        {t_columnar:.2f}s")
+    print(f"Speedup vs original: {t_legacy / t_columnar:.1f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
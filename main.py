@@ -104,13 +104,21 @@ def main(input_excel: str = None):
         logger.error(f"❌ Error cargando datos: {str(e)}")
         sys.exit(1)
     
+    # Memoización por nombre compartida por las etapas 2-5
+    from src.memo import NameMemo
+    memo = NameMemo()
+    
+    # Reglas parseadas y compiladas una sola vez para las etapas 2-5
+    from src.rules import CompiledRules
+    rules = CompiledRules.load('config/rules.yaml')
+    
     # 2. LIMPIAR NOMBRES Y DETECTAR PATRONES
     print_phase(2, "Normalizando nombres y detectando patrones")
     
     try:
         from src.cleaner import clean_products
         
-        df_clean = clean_products(df, rules_path='config/rules.yaml')
+        df_clean = clean_products(df, rules_path='config/rules.yaml', memo=memo, compiled_rules=rules)
         
     except Exception as e:
         logger.error(f"❌ Error limpiando datos: {str(e)}")
@@ -122,7 +130,7 @@ def main(input_excel: str = None):
     try:
         from src.patterns import extract_attributes
         
-        df_enriched = extract_attributes(df_clean, rules_path='config/rules.yaml')
+        df_enriched = extract_attributes(df_clean, rules_path='config/rules.yaml', memo=memo, compiled_rules=rules)
         
     except Exception as e:
         logger.error(f"❌ Error extrayendo atributos: {str(e)}")
@@ -134,7 +142,7 @@ def main(input_excel: str = None):
     try:
         from src.attributes import validate_attributes
         
-        df_validated = validate_attributes(df_enriched, rules_path='config/rules.yaml')
+        df_validated = validate_attributes(df_enriched, rules_path='config/rules.yaml', compiled_rules=rules)
         
     except Exception as e:
         logger.error(f"❌ Error validando atributos: {str(e)}")
@@ -146,12 +154,17 @@ def main(input_excel: str = None):
     try:
         from src.grouping import group_products
         
-        df_grouped = group_products(df_validated, rules_path='config/rules.yaml')
+        df_grouped = group_products(df_validated, rules_path='config/rules.yaml', memo=memo, compiled_rules=rules)
         
     except Exception as e:
         logger.error(f"❌ Error agrupando productos: {str(e)}")
         sys.exit(1)
     
+    logger.info(memo.get_summary())
+    
+    # Artefactos de reglas construidos en las etapas 2-5: una sola escritura
+    rules.flush()
+    
     # 6. GENERAR FORMATO MAESTRO
     print_phase(6, "Generando formato maestro para revisión humana")
     
@@ -2,14 +2,14 @@
 import sys
 sys.path.insert(0, '.')
 import json
-from src.catalogo_spatial_parser import extract_catalog_from_text
+from src.catalogo_spatial_parser import extract_catalog_from_text, DEFAULT_PAGE_CACHE
 
 # Leer texto del catálogo
 with open('pdf/Catalogo_Mamut_2025.txt', encoding='utf-8') as f:
     text = f.read()
 
-# Extraer con estructura completa
-result = extract_catalog_from_text(text)
+# Extraer con estructura completa (solo se re-parsean las páginas que cambiaron)
+result = extract_catalog_from_text(text, cache_path=DEFAULT_PAGE_CACHE)
 
 # Guardar
 with open('data/catalogo_mamut_2025_spatial.json', 'w', encoding='utf-8') as f:
@@ -19,10 +19,12 @@ import pandas as pd
 import os
 import sys
 from pathlib import Path
-from datetime import datetime
 from typing import Optional, List, Dict, Tuple
 import hashlib
 
+from src.review_journal import EDIT_ADD_COLUMN, EDIT_APPEND, EDIT_RENUMBER_IDS, EDIT_SET, EditJournal, apply_edit
+from src.review_save import FORMAT_WOOCOMMERCE, BackgroundSave, save_targets
+
 
 class Colors:
     """Colores ANSI para terminal."""
@@ -79,6 +81,9 @@ class ProductReviewer:
         self.df = None
         self.modified = False
         self.current_index = 0
+        self.background_save = None
+        self.journal = None
+        self.save_seq = None
         
         # Columnas de atributos WooCommerce (hasta 6 atributos)
         self.attr_cols = [
@@ -107,40 +112,93 @@ class ProductReviewer:
             if 'Notas_Revisión' not in self.df.columns:
                 self.df['Notas_Revisión'] = ''
             
+            # Ediciones anotadas en el diario que el archivo aún no tiene (cierre inesperado)
+            self.journal = EditJournal(self.file_path)
+            self.df, recovered = self.journal.open(self.df)
+            self.modified = recovered > 0
+            
             print_success(f"Archivo cargado: {self.file_path.name}")
             print_info(f"Total productos: {len(self.df)}")
+            if recovered:
+                print_warning(f"Recuperadas {recovered} ediciones sin guardar del diario")
+            if self.journal.set_aside_path is not None:
+                print_warning(f"El archivo cambió fuera del revisor; el diario anterior quedó en {self.journal.set_aside_path.name}")
             return True
         except Exception as e:
             print_error(f"Error cargando archivo: {e}")
             return False
     
-    def save_file(self) -> bool:
-        """Guarda los cambios al archivo."""
+    def record_edit(self, edit: dict):
+        """
+        Aplica una edición al DataFrame y la anota en el diario, para que un
+        cierre inesperado no la pierda. Con muchas ediciones sin guardar se
+        guarda el maestro en segundo plano (y el diario se compacta); el CSV
+        WooCommerce solo se genera al guardar con S.
+        """
+        self.df = apply_edit(self.df, edit)
+        if self.journal is not None:
+            self.journal.append(edit)
+            if self.journal.needs_compaction and self.background_save is None:
+                self.save_file(woocommerce=False)
+    
+    def set_cell(self, idx, col, value):
+        """Cambia una celda (equivale a self.df.at[idx, col] = value, con diario)."""
+        self.record_edit({'op': EDIT_SET, 'row': idx, 'col': col, 'value': value})
+    
+    def save_file(self, woocommerce: bool = True) -> bool:
+        """
+        Guarda los cambios en segundo plano: Excel, CSV y CSV WooCommerce (sin
+        columnas de auditoría); si el archivo es .csv no se genera el Excel.
+        Con woocommerce=False solo se guarda el maestro (compactación del diario).
+        Se puede seguir revisando mientras tanto; el resultado se muestra en el menú.
+        """
+        # No se superponen dos guardados de los mismos archivos
+        self.finish_save()
         try:
-            # Guardar en Excel
-            xlsx_path = self.file_path.with_suffix('.xlsx')
-            with pd.ExcelWriter(xlsx_path, engine='openpyxl') as writer:
-                self.df.to_excel(writer, sheet_name='Maestro', index=False)
-            
-            # También guardar CSV
-            csv_path = self.file_path.with_suffix('.csv')
-            self.df.to_csv(csv_path, index=False, encoding='utf-8')
-            
-            # Generar CSV WooCommerce (sin columnas de auditoría)
-            woo_cols = [col for col in self.df.columns if not col.startswith('SKU_Original') 
-                       and col not in ['Confianza_Automática', 'Revisado_Humano', 'Notas_Revisión']]
-            woo_df = self.df[woo_cols]
-            woo_path = self.file_path.parent / f"woocommerce_import_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            woo_df.to_csv(woo_path, index=False, encoding='utf-8')
-            
-            self.modified = False
-            print_success(f"Guardado: {xlsx_path.name}")
-            print_success(f"Guardado: {csv_path.name}")
-            print_success(f"WooCommerce: {woo_path.name}")
-            return True
+            self.save_seq = self.journal.begin_snapshot() if self.journal is not None else None
+            self.background_save = BackgroundSave(self.df, save_targets(self.file_path, woocommerce=woocommerce)).start()
         except Exception as e:
+            if self.journal is not None:
+                self.journal.snapshot_failed()
             print_error(f"Error guardando: {e}")
             return False
+        
+        # La copia ya tiene todos los cambios; lo que se edite desde ahora vuelve a marcarlo
+        self.modified = False
+        print_info("Guardando en segundo plano...")
+        return True
+    
+    def check_save(self) -> bool:
+        """Informa el resultado del guardado si ya terminó; devuelve True si sigue en curso."""
+        save = self.background_save
+        if save is None:
+            return False
+        if not save.done:
+            print_info(save.status)
+            return True
+        
+        self.background_save = None
+        if save.error is not None:
+            if self.journal is not None:
+                self.journal.snapshot_failed()
+            self.modified = True
+            print_error(f"Error guardando: {save.error}")
+        else:
+            # El archivo ya tiene lo anotado hasta la copia: el diario se compacta
+            if self.journal is not None:
+                self.journal.snapshot_saved(self.save_seq, [path for _fmt, path in save.targets])
+            for fmt, path in save.targets:
+                print_success(f"{'WooCommerce' if fmt == FORMAT_WOOCOMMERCE else 'Guardado'}: {path.name}")
+        return False
+    
+    def finish_save(self):
+        """Espera el guardado en curso (si lo hay) y muestra su resultado."""
+        if self.background_save is None:
+            return
+        if not self.background_save.done:
+            print_info("Terminando de guardar...")
+        self.background_save.wait()
+        self.check_save()
     
     def get_groups(self) -> Dict[str, Dict]:
         """
@@ -202,6 +260,7 @@ class ProductReviewer:
         
         if self.modified:
             print_warning("Hay cambios sin guardar")
+        self.check_save()
     
     def show_groups_list(self):
         """Muestra lista de grupos."""
@@ -335,11 +394,11 @@ class ProductReviewer:
     def approve_group(self, group: Dict):
         """Aprueba un grupo completo."""
         # Aprobar padre
-        self.df.at[group['parent_idx'], 'Revisado_Humano'] = 'Sí'
+        self.set_cell(group['parent_idx'], 'Revisado_Humano', 'Sí')
         
         # Aprobar hijos
         for idx in group['children_idx']:
-            self.df.at[idx, 'Revisado_Humano'] = 'Sí'
+            self.set_cell(idx, 'Revisado_Humano', 'Sí')
         
         self.modified = True
         print_success(f"Grupo aprobado: padre + {len(group['children_idx'])} variaciones")
@@ -359,7 +418,7 @@ class ProductReviewer:
             return
         
         # Actualizar nombre del padre
-        self.df.at[parent_idx, 'Nombre'] = new_base_name
+        self.set_cell(parent_idx, 'Nombre', new_base_name)
         self.modified = True
         
         # Preguntar cómo actualizar los hijos
@@ -387,7 +446,7 @@ class ProductReviewer:
                 else:
                     child_name = f"{new_base_name} - Variante {group['children_idx'].index(child_idx) + 1}"
                 
-                self.df.at[child_idx, 'Nombre'] = child_name
+                self.set_cell(child_idx, 'Nombre', child_name)
             
             print_success(f"Padre + {len(group['children_idx'])} hijos renombrados")
         
@@ -398,7 +457,7 @@ class ProductReviewer:
                 print(f"\n  Hijo {i}: {child['Nombre'][:40]}")
                 child_name = input(f"    Nuevo nombre (Enter para omitir): ").strip()
                 if child_name:
-                    self.df.at[child_idx, 'Nombre'] = child_name
+                    self.set_cell(child_idx, 'Nombre', child_name)
             print_success("Nombres actualizados")
         else:
             print_info("Nombres de hijos sin cambios")
@@ -444,11 +503,11 @@ class ProductReviewer:
         # Asegurar que las columnas existen
         for col in [name_col, val_col, vis_col]:
             if col not in self.df.columns:
-                self.df[col] = ''
+                self.record_edit({'op': EDIT_ADD_COLUMN, 'col': col, 'value': ''})
         
-        self.df.at[parent_idx, name_col] = attr_name
-        self.df.at[parent_idx, val_col] = parent_values
-        self.df.at[parent_idx, vis_col] = visible
+        self.set_cell(parent_idx, name_col, attr_name)
+        self.set_cell(parent_idx, val_col, parent_values)
+        self.set_cell(parent_idx, vis_col, visible)
         self.modified = True
         
         # Preguntar si agregar valores a los hijos
@@ -468,9 +527,9 @@ class ProductReviewer:
                     
                     child_val = input(f"    Valor de '{attr_name}': ").strip()
                     if child_val:
-                        self.df.at[child_idx, name_col] = attr_name
-                        self.df.at[child_idx, val_col] = child_val
-                        self.df.at[child_idx, vis_col] = visible
+                        self.set_cell(child_idx, name_col, attr_name)
+                        self.set_cell(child_idx, val_col, child_val)
+                        self.set_cell(child_idx, vis_col, visible)
         
         print_success(f"Atributo '{attr_name}' agregado")
         input("Presiona Enter para continuar...")
@@ -498,41 +557,41 @@ class ProductReviewer:
             new_name = input(f"    Nombre [{current_name}]: ").strip()
             if new_name == self.NULL_VALUE:
                 # Vaciar atributo en padre
-                self.df.at[parent_idx, name_col] = ''
-                self.df.at[parent_idx, val_col] = ''
-                self.df.at[parent_idx, vis_col] = 0
+                self.set_cell(parent_idx, name_col, '')
+                self.set_cell(parent_idx, val_col, '')
+                self.set_cell(parent_idx, vis_col, 0)
                 # Vaciar también en hijos
                 for child_idx in children_idx:
-                    self.df.at[child_idx, name_col] = ''
-                    self.df.at[child_idx, val_col] = ''
-                    self.df.at[child_idx, vis_col] = 0
+                    self.set_cell(child_idx, name_col, '')
+                    self.set_cell(child_idx, val_col, '')
+                    self.set_cell(child_idx, vis_col, 0)
                 self.modified = True
                 print_info(f"Atributo {i} vaciado (padre + {len(children_idx)} hijos)")
                 continue
             elif new_name:
                 # Actualizar nombre en padre
-                self.df.at[parent_idx, name_col] = new_name
+                self.set_cell(parent_idx, name_col, new_name)
                 # PROPAGAR nombre a todos los hijos
                 for child_idx in children_idx:
-                    self.df.at[child_idx, name_col] = new_name
+                    self.set_cell(child_idx, name_col, new_name)
                 self.modified = True
                 print_info(f"Nombre propagado a {len(children_idx)} variaciones")
             
             new_val = input(f"    Valores [{current_val}]: ").strip()
             if new_val == self.NULL_VALUE:
-                self.df.at[parent_idx, val_col] = ''
+                self.set_cell(parent_idx, val_col, '')
                 self.modified = True
             elif new_val:
-                self.df.at[parent_idx, val_col] = new_val
+                self.set_cell(parent_idx, val_col, new_val)
                 self.modified = True
             
             new_vis = input(f"    Visible [{current_vis}] (0=oculto, 1=visible): ").strip()
             if new_vis in ['0', '1']:
                 vis_int = int(new_vis)
-                self.df.at[parent_idx, vis_col] = vis_int
+                self.set_cell(parent_idx, vis_col, vis_int)
                 # Propagar visibilidad a hijos también
                 for child_idx in children_idx:
-                    self.df.at[child_idx, vis_col] = vis_int
+                    self.set_cell(child_idx, vis_col, vis_int)
                 self.modified = True
         
         print_success("Atributos actualizados (padre + variaciones)")
@@ -563,28 +622,28 @@ class ProductReviewer:
         # Editar nombre
         new_name = input(f"  Nombre [{child['Nombre']}]: ").strip()
         if new_name == self.NULL_VALUE:
-            self.df.at[child_idx, 'Nombre'] = ''
+            self.set_cell(child_idx, 'Nombre', '')
             self.modified = True
         elif new_name:
-            self.df.at[child_idx, 'Nombre'] = new_name
+            self.set_cell(child_idx, 'Nombre', new_name)
             self.modified = True
         
         # Editar precio
         new_price = input(f"  Precio [{child.get('Precio normal', '')}]: ").strip()
         if new_price == self.NULL_VALUE:
-            self.df.at[child_idx, 'Precio normal'] = ''
+            self.set_cell(child_idx, 'Precio normal', '')
             self.modified = True
         elif new_price:
-            self.df.at[child_idx, 'Precio normal'] = new_price
+            self.set_cell(child_idx, 'Precio normal', new_price)
             self.modified = True
         
         # Editar stock
         new_stock = input(f"  Stock [{child.get('Inventario', '')}]: ").strip()
         if new_stock == self.NULL_VALUE:
-            self.df.at[child_idx, 'Inventario'] = ''
+            self.set_cell(child_idx, 'Inventario', '')
             self.modified = True
         elif new_stock:
-            self.df.at[child_idx, 'Inventario'] = new_stock
+            self.set_cell(child_idx, 'Inventario', new_stock)
             self.modified = True
         
         # Editar atributos
@@ -600,15 +659,15 @@ class ProductReviewer:
                 print(f"\n  Atributo {i}: {current_name}")
                 new_val = input(f"    Valor [{current_val}]: ").strip()
                 if new_val == self.NULL_VALUE:
-                    self.df.at[child_idx, val_col] = ''
+                    self.set_cell(child_idx, val_col, '')
                     self.modified = True
                 elif new_val:
-                    self.df.at[child_idx, val_col] = new_val
+                    self.set_cell(child_idx, val_col, new_val)
                     self.modified = True
                 
                 new_vis = input(f"    Visible [{current_vis}] (0=oculto, 1=visible): ").strip()
                 if new_vis in ['0', '1']:
-                    self.df.at[child_idx, vis_col] = int(new_vis)
+                    self.set_cell(child_idx, vis_col, int(new_vis))
                     self.modified = True
         
         print_success("Variación actualizada")
@@ -633,8 +692,8 @@ class ProductReviewer:
         child_idx = group['children_idx'][num - 1]
         
         # Convertir a simple
-        self.df.at[child_idx, 'Tipo'] = 'simple'
-        self.df.at[child_idx, 'Principal'] = ''
+        self.set_cell(child_idx, 'Tipo', 'simple')
+        self.set_cell(child_idx, 'Principal', '')
         
         self.modified = True
         print_success("Variación convertida a producto simple")
@@ -664,8 +723,8 @@ class ProductReviewer:
         parent = group['parent']
         
         # Convertir a variation
-        self.df.at[simple_idx, 'Tipo'] = 'variation'
-        self.df.at[simple_idx, 'Principal'] = f"id:{parent['ID']}"
+        self.set_cell(simple_idx, 'Tipo', 'variation')
+        self.set_cell(simple_idx, 'Principal', f"id:{parent['ID']}")
         
         self.modified = True
         print_success("Producto agregado al grupo como variación")
@@ -678,7 +737,7 @@ class ProductReviewer:
         
         note = input("Nueva nota (o Enter para mantener): ").strip()
         if note:
-            self.df.at[idx, 'Notas_Revisión'] = note
+            self.set_cell(idx, 'Notas_Revisión', note)
             self.modified = True
             print_success("Nota agregada")
     
@@ -802,7 +861,7 @@ class ProductReviewer:
         action = input(f"\n{Colors.CYAN}Acción: {Colors.ENDC}").strip().upper()
         
         if action == 'A':
-            self.df.at[idx, 'Revisado_Humano'] = 'Sí'
+            self.set_cell(idx, 'Revisado_Humano', 'Sí')
             self.modified = True
             print_success("Producto aprobado")
             input("Presiona Enter para continuar...")
@@ -823,34 +882,34 @@ class ProductReviewer:
         # Campos básicos
         new_name = input(f"  Nombre [{prod['Nombre']}]: ").strip()
         if new_name == self.NULL_VALUE:
-            self.df.at[idx, 'Nombre'] = ''
+            self.set_cell(idx, 'Nombre', '')
             self.modified = True
         elif new_name:
-            self.df.at[idx, 'Nombre'] = new_name
+            self.set_cell(idx, 'Nombre', new_name)
             self.modified = True
         
         new_cat = input(f"  Categoría [{prod.get('Categorías', '')}]: ").strip()
         if new_cat == self.NULL_VALUE:
-            self.df.at[idx, 'Categorías'] = ''
+            self.set_cell(idx, 'Categorías', '')
             self.modified = True
         elif new_cat:
-            self.df.at[idx, 'Categorías'] = new_cat
+            self.set_cell(idx, 'Categorías', new_cat)
             self.modified = True
         
         new_price = input(f"  Precio [{prod.get('Precio normal', '')}]: ").strip()
         if new_price == self.NULL_VALUE:
-            self.df.at[idx, 'Precio normal'] = ''
+            self.set_cell(idx, 'Precio normal', '')
             self.modified = True
         elif new_price:
-            self.df.at[idx, 'Precio normal'] = new_price
+            self.set_cell(idx, 'Precio normal', new_price)
             self.modified = True
         
         new_stock = input(f"  Stock [{prod.get('Inventario', '')}]: ").strip()
         if new_stock == self.NULL_VALUE:
-            self.df.at[idx, 'Inventario'] = ''
+            self.set_cell(idx, 'Inventario', '')
             self.modified = True
         elif new_stock:
-            self.df.at[idx, 'Inventario'] = new_stock
+            self.set_cell(idx, 'Inventario', new_stock)
             self.modified = True
         
         # Editar atributos
@@ -861,7 +920,7 @@ class ProductReviewer:
             # Asegurar que las columnas existen
             for col in [name_col, val_col, vis_col]:
                 if col not in self.df.columns:
-                    self.df[col] = ''
+                    self.record_edit({'op': EDIT_ADD_COLUMN, 'col': col, 'value': ''})
             
             current_name = self.df.at[idx, name_col] if pd.notna(self.df.at[idx, name_col]) else ''
             current_val = self.df.at[idx, val_col] if pd.notna(self.df.at[idx, val_col]) else ''
@@ -887,23 +946,23 @@ class ProductReviewer:
                 continue
             elif action == 'Q' or action == self.NULL_VALUE:
                 # Quitar atributo
-                self.df.at[idx, name_col] = ''
-                self.df.at[idx, val_col] = ''
-                self.df.at[idx, vis_col] = 0
+                self.set_cell(idx, name_col, '')
+                self.set_cell(idx, val_col, '')
+                self.set_cell(idx, vis_col, 0)
                 self.modified = True
                 print_info(f"Atributo {i} eliminado")
             elif action == 'E' or action == 'A':
                 # Editar/Agregar atributo
                 new_attr_name = input(f"      Nombre [{current_name}]: ").strip()
                 if new_attr_name == self.NULL_VALUE:
-                    self.df.at[idx, name_col] = ''
-                    self.df.at[idx, val_col] = ''
-                    self.df.at[idx, vis_col] = 0
+                    self.set_cell(idx, name_col, '')
+                    self.set_cell(idx, val_col, '')
+                    self.set_cell(idx, vis_col, 0)
                     self.modified = True
                     print_info(f"Atributo {i} eliminado")
                     continue
                 elif new_attr_name:
-                    self.df.at[idx, name_col] = new_attr_name
+                    self.set_cell(idx, name_col, new_attr_name)
                     self.modified = True
                 elif action == 'A' and not current_name:
                     # Si está agregando y no puso nombre, cancelar
@@ -912,19 +971,19 @@ class ProductReviewer:
                 
                 new_attr_val = input(f"      Valor [{current_val}]: ").strip()
                 if new_attr_val == self.NULL_VALUE:
-                    self.df.at[idx, val_col] = ''
+                    self.set_cell(idx, val_col, '')
                     self.modified = True
                 elif new_attr_val:
-                    self.df.at[idx, val_col] = new_attr_val
+                    self.set_cell(idx, val_col, new_attr_val)
                     self.modified = True
                 
                 new_vis = input(f"      Visible [{current_vis}] (0/1): ").strip()
                 if new_vis in ['0', '1']:
-                    self.df.at[idx, vis_col] = int(new_vis)
+                    self.set_cell(idx, vis_col, int(new_vis))
                     self.modified = True
                 elif action == 'A':
                     # Por defecto visible al agregar
-                    self.df.at[idx, vis_col] = 1
+                    self.set_cell(idx, vis_col, 1)
                     self.modified = True
         
         # Opción para agregar más atributos
@@ -954,9 +1013,9 @@ class ProductReviewer:
             attr_val = input(f"    Valor: ").strip()
             attr_vis = input(f"    Visible (0/1) [1]: ").strip() or '1'
             
-            self.df.at[idx, name_col] = attr_name
-            self.df.at[idx, val_col] = attr_val
-            self.df.at[idx, vis_col] = int(attr_vis) if attr_vis in ['0', '1'] else 1
+            self.set_cell(idx, name_col, attr_name)
+            self.set_cell(idx, val_col, attr_val)
+            self.set_cell(idx, vis_col, int(attr_vis) if attr_vis in ['0', '1'] else 1)
             self.modified = True
             print_success(f"Atributo '{attr_name}' agregado")
         
@@ -987,8 +1046,8 @@ class ProductReviewer:
         parent = group_list[num - 1][1]['parent']
         
         # Convertir a variation
-        self.df.at[simple_idx, 'Tipo'] = 'variation'
-        self.df.at[simple_idx, 'Principal'] = f"id:{parent['ID']}"
+        self.set_cell(simple_idx, 'Tipo', 'variation')
+        self.set_cell(simple_idx, 'Principal', f"id:{parent['ID']}")
         
         self.modified = True
         print_success("Producto agregado al grupo")
@@ -1132,21 +1191,20 @@ class ProductReviewer:
             parent_data[f'Atributo global {i}'] = 0
         
         # Agregar padre al DataFrame
-        parent_df = pd.DataFrame([parent_data])
-        self.df = pd.concat([self.df, parent_df], ignore_index=True)
+        self.record_edit({'op': EDIT_APPEND, 'values': parent_data})
         
         # Actualizar productos a variaciones
         for idx in indices:
-            self.df.at[idx, 'Tipo'] = 'variation'
-            self.df.at[idx, 'Principal'] = f'id:{new_id}'
+            self.set_cell(idx, 'Tipo', 'variation')
+            self.set_cell(idx, 'Principal', f'id:{new_id}')
         
         # Re-numerar IDs
-        self.df['ID'] = range(1, len(self.df) + 1)
+        self.record_edit({'op': EDIT_RENUMBER_IDS})
         
         # Actualizar referencias Principal
         for idx in indices:
             new_parent_id = self.df[self.df['SKU'] == new_sku]['ID'].values[0]
-            self.df.at[idx, 'Principal'] = f'id:{new_parent_id}'
+            self.set_cell(idx, 'Principal', f'id:{new_parent_id}')
         
         self.modified = True
         print_success(f"Grupo creado: {new_sku} con {len(indices)} variaciones")
@@ -1209,14 +1267,14 @@ class ProductReviewer:
             if action == 'Q':
                 return
             elif action == 'A':
-                self.df.at[idx, 'Revisado_Humano'] = 'Sí'
+                self.set_cell(idx, 'Revisado_Humano', 'Sí')
                 self.modified = True
                 current += 1
             elif action == 'R':
-                self.df.at[idx, 'Revisado_Humano'] = 'No'
+                self.set_cell(idx, 'Revisado_Humano', 'No')
                 note = input("Razón del rechazo: ").strip()
                 if note:
-                    self.df.at[idx, 'Notas_Revisión'] = note
+                    self.set_cell(idx, 'Notas_Revisión', note)
                 self.modified = True
                 current += 1
             elif action == 'E':
@@ -1237,13 +1295,13 @@ class ProductReviewer:
         
         new_name = input(f"Nombre [{prod['Nombre'][:40]}]: ").strip()
         if new_name:
-            self.df.at[idx, 'Nombre'] = new_name
+            self.set_cell(idx, 'Nombre', new_name)
             self.modified = True
         
         if prod['Tipo'] != 'variable':
             new_price = input(f"Precio [{prod.get('Precio normal', '')}]: ").strip()
             if new_price:
-                self.df.at[idx, 'Precio normal'] = new_price
+                self.set_cell(idx, 'Precio normal', new_price)
                 self.modified = True
     
     def main_menu(self):
@@ -1279,10 +1337,19 @@ class ProductReviewer:
                 self.save_file()
                 input("Presiona Enter para continuar...")
             elif action == 'Q':
+                discard = False
                 if self.modified:
                     save = input("¿Guardar cambios antes de salir? (s/n): ").strip().lower()
                     if save == 's':
                         self.save_file()
+                    else:
+                        discard = True
+                # Salir con un guardado a medias dejaría los archivos anteriores
+                self.finish_save()
+                if self.journal is not None:
+                    if discard:
+                        self.journal.discard()
+                    self.journal.close()
                 break
     
     def groups_menu(self):
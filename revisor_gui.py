@@ -10,12 +10,479 @@ Uso:
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
 import tkinter.font as tkfont
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
 import sys
 import os
 
+from src.review_journal import EDIT_APPEND, EDIT_DROP, EDIT_RENUMBER_IDS, EDIT_SET, EditJournal, apply_edit
+from src.review_save import BackgroundSave, save_targets
+
+
+class VirtualProductList:
+    """
+    Lista de productos virtualizada sobre un ttk.Treeview.
+    
+    El Treeview solo contiene las filas de la ventana visible; el resto vive en
+    `rows`, el arreglo de índices del DataFrame que pasan los filtros. Al hacer
+    scroll se materializan únicamente las filas nuevas de la ventana, y la
+    selección se guarda por índice (sobrevive al scroll y a los refrescos).
+    """
+    
+    # Margen de filas bajo el borde visible (la última puede verse a medias)
+    WINDOW_MARGIN = 1
+    
+    def __init__(self, tree, scrollbar, row_values, on_select=None):
+        """
+        Args:
+            tree: ttk.Treeview (iid de cada fila = str(índice del DataFrame))
+            scrollbar: barra vertical; se maneja aquí en lugar de tree.yview
+            row_values: función idx -> (values, tags) para una fila
+            on_select: callback(event) cuando el usuario cambia la selección
+        """
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_values = row_values
+        self.on_select = on_select
+        
+        self.rows = np.empty(0, dtype=np.int64)
+        self.offset = 0
+        self.page_size = 30
+        self.selected = {}  # idx -> None (conjunto ordenado)
+        self._shown = []
+        self._positions = None
+        self._extend_selection = False
+        
+        scrollbar.configure(command=self.yview)
+        tree.bind('<<TreeviewSelect>>', self._on_tree_select)
+        tree.bind('<Configure>', self._on_configure)
+        tree.bind('<Button-1>', self._on_click, add='+')
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            tree.bind(sequence, self._on_mousewheel)
+        for sequence, step in (('<Up>', -1), ('<Down>', 1), ('<Prior>', 'page-'), ('<Next>', 'page+'),
+                               ('<Home>', 'home'), ('<End>', 'end')):
+            tree.bind(sequence, lambda e, s=step: self._on_key(s))
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    # ----- Datos -----
+    
+    def set_rows(self, rows):
+        """Reemplaza las filas filtradas conservando la posición y la selección visible."""
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self._positions = None
+        self.selected = {idx: None for idx in self.selected if self.position(idx) is not None}
+        self._clamp_offset()
+        self.render()
+    
+    def position(self, idx):
+        """Posición de idx en las filas filtradas (None si no está)."""
+        if self._positions is None:
+            self._positions = {int(i): pos for pos, i in enumerate(self.rows.tolist())}
+        return self._positions.get(int(idx))
+    
+    def contains(self, idx) -> bool:
+        return self.position(idx) is not None
+    
+    def update_row(self, idx):
+        """Actualiza en el lugar una fila ya mostrada (sin reconstruir la lista)."""
+        iid = str(idx)
+        if int(idx) in self._shown and self.tree.exists(iid):
+            values, tags = self.row_values(int(idx))
+            self.tree.item(iid, values=values, tags=tags)
+    
+    # ----- Ventana visible -----
+    
+    def window(self):
+        """Índices de la ventana actual."""
+        return self.rows[self.offset:self.offset + self.page_size + self.WINDOW_MARGIN].tolist()
+    
+    def render(self):
+        """Materializa solo las filas de la ventana visible."""
+        window = self.window()
+        if window != self._shown:
+            children = self.tree.get_children()
+            if children:
+                self.tree.delete(*children)
+            for idx in window:
+                values, tags = self.row_values(idx)
+                self.tree.insert('', 'end', iid=str(idx), values=values, tags=tags)
+            self._shown = window
+        
+        visible_selected = [str(idx) for idx in window if idx in self.selected]
+        if set(self.tree.selection()) != set(visible_selected):
+            self.tree.selection_set(visible_selected)
+        self._update_scrollbar()
+    
+    def _update_scrollbar(self):
+        total = len(self.rows)
+        if total == 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        first = self.offset / total
+        last = min(1.0, (self.offset + self.page_size) / total)
+        self.scrollbar.set(first, last)
+    
+    def _clamp_offset(self):
+        self.offset = max(0, min(self.offset, len(self.rows) - self.page_size))
+    
+    def scroll_to(self, offset):
+        self.offset = int(offset)
+        self._clamp_offset()
+        self.render()
+    
+    def see(self, idx):
+        """Desplaza la ventana para que idx quede visible."""
+        pos = self.position(idx)
+        if pos is None:
+            return
+        if pos < self.offset or pos >= self.offset + self.page_size:
+            self.scroll_to(pos - self.page_size // 2)
+    
+    def yview(self, *args):
+        """Comando de la barra de scroll ('moveto' fracción / 'scroll' n units|pages)."""
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self.scroll_to(float(args[1]) * len(self.rows))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if len(args) > 2 and args[2] == 'pages':
+                step *= self.page_size
+            self.scroll_to(self.offset + step)
+    
+    # ----- Selección -----
+    
+    def selection(self):
+        """iids seleccionados (incluye filas fuera de la ventana), en orden de lista."""
+        return tuple(str(idx) for idx in sorted(self.selected, key=self.position))
+    
+    def clear_selection(self):
+        """Olvida la selección (p. ej. tras renumerar el índice del DataFrame)."""
+        self.selected = {}
+        self.render()
+    
+    def select(self, idx) -> bool:
+        """Selecciona solo idx, lo hace visible y le da el foco. False si está filtrado."""
+        if not self.contains(idx):
+            return False
+        self.selected = {int(idx): None}
+        self.see(idx)
+        self.render()
+        self.tree.focus(str(idx))
+        return True
+    
+    def _on_click(self, event):
+        # Shift o Control extienden la selección: se conserva lo que no está en pantalla
+        self._extend_selection = bool(event.state & 0x0005)
+    
+    def _on_tree_select(self, event):
+        current = [int(iid) for iid in self.tree.selection()]
+        shown = set(self._shown)
+        visible_selected = [idx for idx in self._shown if idx in self.selected]
+        if set(current) == set(visible_selected):
+            return  # Cambio hecho por render(), no por el usuario
+        
+        if self._extend_selection:
+            self.selected = {idx: None for idx in self.selected if idx not in shown}
+            self.selected.update(dict.fromkeys(current))
+        else:
+            self.selected = dict.fromkeys(current)
+        self._extend_selection = False
+        if self.on_select is not None:
+            self.on_select(event)
+    
+    def _on_key(self, step):
+        """Navegación con teclado sobre todas las filas (no solo la ventana)."""
+        if len(self.rows) == 0:
+            return 'break'
+        focus = self.tree.focus()
+        pos = self.position(int(focus)) if focus else None
+        if pos is None:
+            pos = self.offset
+        elif step == 'page-':
+            pos -= self.page_size
+        elif step == 'page+':
+            pos += self.page_size
+        elif step == 'home':
+            pos = 0
+        elif step == 'end':
+            pos = len(self.rows) - 1
+        else:
+            pos += step
+        pos = max(0, min(pos, len(self.rows) - 1))
+        
+        idx = int(self.rows[pos])
+        self.select(idx)
+        if self.on_select is not None:
+            self.on_select(None)
+        return 'break'
+    
+    def _on_mousewheel(self, event):
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            self.yview('scroll', -3, 'units')
+        else:
+            self.yview('scroll', 3, 'units')
+        return 'break'
+    
+    def _on_configure(self, event):
+        row_height = self._row_height()
+        page_size = max(1, (event.height - row_height) // row_height)  # menos el encabezado
+        if page_size != self.page_size:
+            self.page_size = page_size
+            self._clamp_offset()
+            self.render()
+    
+    def _row_height(self):
+        try:
+            height = int(ttk.Style().lookup('Treeview', 'rowheight') or 0)
+        except (tk.TclError, ValueError):
+            height = 0
+        return height or 20
+
+
+class ProductSearchIndex:
+    """
+    Índice de filtros y búsqueda del revisor, construido una vez por DataFrame.
+    
+    - Tipo, Revisado_Humano y Marcas quedan como arreglos (códigos por valor):
+      cada filtro es una máscara booleana y se combinan con `&`
+    - SKU y Nombre en mayúsculas se unen en un buffer UTF-8; los trigramas de
+      bytes de cada fila se guardan ordenados como (trigrama << 32 | fila),
+      así una búsqueda intersecta postings en vez de recorrer 100k textos
+    - Búsquedas de 1-2 caracteres comparan el buffer completo con numpy
+    - Las filas editadas se actualizan en el lugar (update_rows): sus códigos
+      cambian al momento y su texto se verifica aparte hasta reconstruir
+    """
+    
+    # Con más filas editadas que esto, conviene reconstruir los postings
+    MAX_DIRTY_ROWS = 2000
+    # Búsquedas recientes guardadas (escribir o borrar letra por letra)
+    QUERY_CACHE_SIZE = 32
+    
+    def __init__(self, df):
+        self.labels = df.index.to_numpy()
+        self._label_pos = None
+        n = len(df)
+        
+        # Igual que el filtro original: astype(str).str.upper(); '\n' separa
+        # SKU de Nombre para que una búsqueda no calce entre ambos
+        sku = df['SKU'].astype(str).str.upper() if 'SKU' in df.columns else pd.Series([''] * n, index=df.index)
+        name = df['Nombre'].astype(str).str.upper() if 'Nombre' in df.columns else pd.Series([''] * n, index=df.index)
+        self.texts = (sku + '\n' + name).tolist()
+        
+        self._tipo_values = {}
+        self.tipo = self._codes(df['Tipo'] if 'Tipo' in df.columns else [''] * n, self._tipo_values)
+        self.revisado = (df['Revisado_Humano'] == 'Sí').to_numpy(copy=True) if 'Revisado_Humano' in df.columns else np.zeros(n, dtype=bool)
+        self._brand_values = {}
+        brands = df['Marcas'].astype(str).str.upper() if 'Marcas' in df.columns else [''] * n
+        self.brand = self._codes(brands, self._brand_values)
+        
+        self._build_postings()
+        self._dirty = {}
+        self._cache = {}
+    
+    @staticmethod
+    def _codes(values, mapping):
+        return np.fromiter((mapping.setdefault(v, len(mapping)) for v in values), dtype=np.int32, count=len(values))
+    
+    def _build_postings(self):
+        encoded = [t.encode('utf-8') for t in self.texts]
+        # '\n' separa filas y campos (no aparece en una búsqueda)
+        self._buffer = np.frombuffer(b'\n'.join(encoded), dtype=np.uint8)
+        lengths = np.fromiter((len(e) + 1 for e in encoded), dtype=np.int64, count=len(encoded))
+        self._row_of_byte = np.repeat(np.arange(len(encoded), dtype=np.int64), lengths)[:len(self._buffer)]
+        
+        buf = self._buffer.astype(np.uint64)
+        if len(buf) < 3:
+            self._postings = np.empty(0, dtype=np.uint64)
+            return
+        codes = (buf[:-2] << 16) | (buf[1:-1] << 8) | buf[2:]
+        valid = (self._buffer[:-2] != 10) & (self._buffer[1:-1] != 10) & (self._buffer[2:] != 10)
+        rows = self._row_of_byte[:-2][valid].astype(np.uint64)
+        postings = (codes[valid] << np.uint64(32)) | rows
+        postings.sort()
+        if len(postings):
+            postings = postings[np.concatenate(([True], postings[1:] != postings[:-1]))]
+        self._postings = postings
+    
+    def matches(self, df) -> bool:
+        """Indica si el índice corresponde a estas filas (mismo índice del DataFrame)."""
+        return len(df) == len(self.labels) and bool((df.index.to_numpy() == self.labels).all())
+    
+    def position(self, idx):
+        if self._label_pos is None:
+            self._label_pos = {label: pos for pos, label in enumerate(self.labels.tolist())}
+        return self._label_pos.get(idx)
+    
+    # ----- Actualización incremental -----
+    
+    def update_rows(self, df, indices):
+        """Refleja la edición de algunas filas sin reconstruir el índice."""
+        for idx in indices:
+            pos = self.position(idx)
+            if pos is None:
+                continue
+            row = df.loc[idx]
+            sku = str(row['SKU']).upper() if 'SKU' in row.index else ''
+            name = str(row['Nombre']).upper() if 'Nombre' in row.index else ''
+            self.texts[pos] = sku + '\n' + name
+            if 'Tipo' in row.index:
+                self.tipo[pos] = self._tipo_values.setdefault(row['Tipo'], len(self._tipo_values))
+            if 'Revisado_Humano' in row.index:
+                self.revisado[pos] = row['Revisado_Humano'] == 'Sí'
+            if 'Marcas' in row.index:
+                self.brand[pos] = self._brand_values.setdefault(str(row['Marcas']).upper(), len(self._brand_values))
+            self._dirty[pos] = None
+        self._cache.clear()
+        if len(self._dirty) > self.MAX_DIRTY_ROWS:
+            self._build_postings()
+            self._dirty = {}
+    
+    # ----- Consultas -----
+    
+    def filter_mask(self, filter_type='all', brand='Todas', search=''):
+        """Máscara booleana (por posición) de los filtros del revisor."""
+        mask = np.ones(len(self.labels), dtype=bool)
+        if filter_type in ('simple', 'variable', 'variation'):
+            code = self._tipo_values.get(filter_type)
+            mask &= self.tipo == (code if code is not None else -1)
+        elif filter_type == 'pending':
+            mask &= ~self.revisado
+        elif filter_type == 'approved':
+            mask &= self.revisado
+        
+        if brand and brand != 'Todas':
+            code = self._brand_values.get(brand.upper())
+            mask &= self.brand == (code if code is not None else -1)
+        
+        if search:
+            hits = np.zeros(len(self.labels), dtype=bool)
+            hits[self.search(search)] = True
+            mask &= hits
+        return mask
+    
+    def count(self, filter_type='all'):
+        """Cantidad de filas de un tipo (o aprobadas con 'approved')."""
+        if filter_type == 'approved':
+            return int(self.revisado.sum())
+        code = self._tipo_values.get(filter_type)
+        return int((self.tipo == code).sum()) if code is not None else 0
+    
+    def search(self, query):
+        """Posiciones (ordenadas) cuyo SKU o Nombre contienen `query` (ya en mayúsculas)."""
+        cached = self._cache.get(query)
+        if cached is not None:
+            return cached
+        
+        encoded = query.encode('utf-8')
+        texts = self.texts
+        # Escribiendo letra a letra: basta revisar los resultados de la búsqueda anterior
+        narrowed = [rows for q, rows in self._cache.items() if q in query] if len(encoded) > 3 else []
+        if narrowed:
+            candidates = min(narrowed, key=len)
+            result = np.array([pos for pos in candidates.tolist() if query in texts[pos]], dtype=np.int64)
+        else:
+            candidates = self._candidates(encoded)
+            if len(encoded) > 3:
+                candidates = np.array([pos for pos in candidates.tolist() if query in texts[pos]], dtype=np.int64)
+            # Con 1-3 bytes el calce de bytes ya es exacto (UTF-8 se autosincroniza);
+            # solo las filas editadas desde la última construcción se revisan aparte
+            result = candidates
+            if self._dirty:
+                dirty = np.fromiter(self._dirty, dtype=np.int64, count=len(self._dirty))
+                still = np.array([pos for pos in self._dirty if query in texts[pos]], dtype=np.int64)
+                result = np.union1d(np.setdiff1d(candidates, dirty, assume_unique=True), still)
+        
+        if len(self._cache) >= self.QUERY_CACHE_SIZE:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[query] = result
+        return result
+    
+    def _candidates(self, query):
+        """Filas que contienen todos los trigramas de `query` (o sus bytes, si es corta)."""
+        if len(query) < 3:
+            hits = self._buffer[:len(self._buffer) - len(query) + 1] == query[0]
+            if len(query) == 2:
+                hits &= self._buffer[1:] == query[1]
+            # Las posiciones crecen, así que las filas ya vienen ordenadas
+            rows = self._row_of_byte[np.flatnonzero(hits)]
+            return rows[np.concatenate(([True], rows[1:] != rows[:-1]))] if len(rows) else rows
+        
+        postings = []
+        for i in range(len(query) - 2):
+            code = np.uint64((query[i] << 16) | (query[i + 1] << 8) | query[i + 2])
+            lo, hi = np.searchsorted(self._postings, [code << np.uint64(32), (code + np.uint64(1)) << np.uint64(32)])
+            postings.append(self._postings[lo:hi])
+        postings.sort(key=len)
+        rows = (postings[0] & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        for other in postings[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, (other & np.uint64(0xFFFFFFFF)).astype(np.int64), assume_unique=True)
+        return rows
+
+
+class ProductGroupIndex:
+    """
+    Índice padre/hijos del revisor: ID -> fila y 'Principal' -> filas hijas.
+    
+    Reemplaza los recorridos `self.df[self.df['Principal'] == f'id:{id}']` y
+    `self.df[self.df['ID'] == id]`. Las acciones que cambian 'Principal' lo
+    mantienen con set_principal; si cambian las filas (borrar, agregar) se
+    reconstruye (ver matches).
+    """
+    
+    def __init__(self, df):
+        self.labels = df.index.to_numpy()
+        labels = self.labels.tolist()
+        self._position = {label: pos for pos, label in enumerate(labels)}
+        
+        # Como parent_df.index[0]: la primera fila con ese ID
+        self._row_by_id = {}
+        if 'ID' in df.columns:
+            for label, value in zip(labels, df['ID'].tolist()):
+                if pd.notna(value):
+                    self._row_by_id.setdefault(value, label)
+        
+        self._principal = {}
+        self._children = {}
+        if 'Principal' in df.columns:
+            for label, principal in zip(labels, df['Principal'].tolist()):
+                self._link(label, principal)
+    
+    def _link(self, label, principal):
+        # Solo textos: un NaN nunca es igual a 'id:N'
+        if isinstance(principal, str) and principal:
+            self._principal[label] = principal
+            self._children.setdefault(principal, set()).add(label)
+    
+    def matches(self, df) -> bool:
+        """Indica si el índice corresponde a estas filas (mismo índice del DataFrame)."""
+        return len(df) == len(self.labels) and bool((df.index.to_numpy() == self.labels).all())
+    
+    def parent_row(self, parent_id):
+        """Fila del padre con ese ID, o None."""
+        return self._row_by_id.get(parent_id)
+    
+    def children(self, parent_id) -> list:
+        """Filas cuyo 'Principal' es 'id:{parent_id}', en el orden del DataFrame."""
+        rows = self._children.get(f'id:{parent_id}')
+        return sorted(rows, key=self._position.__getitem__) if rows else []
+    
+    def set_principal(self, label, principal):
+        """Refleja el cambio de 'Principal' de una fila."""
+        old = self._principal.pop(label, None)
+        if old is not None:
+            rows = self._children[old]
+            rows.discard(label)
+            if not rows:
+                del self._children[old]
+        self._link(label, principal)
+
 
 class ProductReviewerGUI:
     """Interfaz gráfica para revisión de productos."""
@@ -31,6 +498,9 @@ class ProductReviewerGUI:
         ('Nombre del atributo 6', 'Valor(es) del atributo 6', 'Atributo visible 6', 'Atributo global 6'),
     ]
     
+    # Cada cuánto se consulta el avance del guardado en segundo plano (ms)
+    SAVE_POLL_MS = 100
+    
     def __init__(self, root):
         self.root = root
         self.root.title("📦 Revisor de Productos WooCommerce")
@@ -42,6 +512,13 @@ class ProductReviewerGUI:
         self.file_path = None
         self.modified = False
         self.selected_idx = None
+        self.search_index = None
+        self.group_index = None
+        self.background_save = None
+        self.save_pending = False
+        self.journal = None
+        self.save_seq = None
+        self.retired_journal = None
         
         # Configuración de GUI
         self.font_size = tk.IntVar(value=10)
@@ -148,7 +625,7 @@ class ProductReviewerGUI:
         
         # Refrescar la lista si hay datos
         if self.df is not None:
-            self.refresh_product_list()
+            self.refresh_product_list(data_changed=False)
         
         self.update_status(f"Tamaño de fuente cambiado a {size} pt")
     
@@ -360,10 +837,10 @@ class ProductReviewerGUI:
         self.tree.column('precio', width=80, minwidth=60, anchor='e', stretch=False)
         self.tree.column('estado', width=70, minwidth=50, anchor='center', stretch=False)
         
-        # Scrollbars
-        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
+        # Scrollbars (la vertical recorre la lista virtual, no solo las filas del árbol)
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical")
         hsb = ttk.Scrollbar(tree_frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self.tree.configure(xscrollcommand=hsb.set)
         
         self.tree.grid(row=0, column=0, sticky='nsew')
         vsb.grid(row=0, column=1, sticky='ns')
@@ -372,8 +849,8 @@ class ProductReviewerGUI:
         tree_frame.grid_rowconfigure(0, weight=1)
         tree_frame.grid_columnconfigure(0, weight=1)
         
-        # Eventos
-        self.tree.bind('<<TreeviewSelect>>', self.on_product_select)
+        # Eventos (la selección pasa por la lista virtual)
+        self.product_list = VirtualProductList(self.tree, vsb, self.product_row_values, self.on_product_select)
         self.tree.bind('<Double-1>', self.on_product_double_click)
         
         # Tags para colores
@@ -591,9 +1068,7 @@ class ProductReviewerGUI:
             # Obtener hijos si es padre (para propagar cambios)
             children_idx = []
             if tipo == 'variable':
-                parent_id = row['ID']
-                children = self.df[self.df['Principal'] == f'id:{parent_id}']
-                children_idx = children.index.tolist()
+                children_idx = self.get_group_index().children(row['ID'])
             
             # Guardar atributos
             for i, (name_col, val_col, vis_col, glob_col) in enumerate(self.ATTR_COLS):
@@ -604,10 +1079,10 @@ class ProductReviewerGUI:
                 
                 # Guardar en producto actual
                 try:
-                    self.df.at[idx, name_col] = new_name if new_name else ''
-                    self.df.at[idx, val_col] = new_value if new_value else ''
-                    self.df.at[idx, vis_col] = int(new_visible)
-                    self.df.at[idx, glob_col] = int(new_global)
+                    self.set_cell(idx, name_col, new_name if new_name else '')
+                    self.set_cell(idx, val_col, new_value if new_value else '')
+                    self.set_cell(idx, vis_col, int(new_visible))
+                    self.set_cell(idx, glob_col, int(new_global))
                 except Exception:
                     pass
                 
@@ -615,9 +1090,9 @@ class ProductReviewerGUI:
                 if tipo == 'variable' and children_idx:
                     for child_idx in children_idx:
                         try:
-                            self.df.at[child_idx, name_col] = new_name if new_name else ''
-                            self.df.at[child_idx, vis_col] = int(new_visible)
-                            self.df.at[child_idx, glob_col] = int(new_global)
+                            self.set_cell(child_idx, name_col, new_name if new_name else '')
+                            self.set_cell(child_idx, vis_col, int(new_visible))
+                            self.set_cell(child_idx, glob_col, int(new_global))
                         except Exception:
                             pass
             
@@ -672,10 +1147,14 @@ class ProductReviewerGUI:
                             value = None
                 
                 try:
-                    self.df.at[idx, field] = value
+                    self.set_cell(idx, field, value)
                 except Exception:
                     pass  # Ignorar errores de tipo
         
+        # SKU, Nombre y Marcas entran en los filtros
+        if self.search_index is not None:
+            self.search_index.update_rows(self.df, [idx])
+        
         self.modified = True
         self.update_modified_indicator()
     
@@ -756,11 +1235,8 @@ class ProductReviewerGUI:
         selection = self.var_tree.selection()
         if selection:
             idx = int(selection[0])
-            # Buscar en el treeview principal y seleccionar
-            if str(idx) in self.tree.get_children():
-                self.tree.selection_set(str(idx))
-                self.tree.see(str(idx))
-                self.tree.focus(str(idx))
+            # Buscar en la lista principal y seleccionar
+            if self.product_list.select(idx):
                 # Cargar detalles
                 self.selected_idx = idx
                 self.load_product_details(idx)
@@ -776,11 +1252,8 @@ class ProductReviewerGUI:
         
         idx = self.current_parent_idx
         
-        # Buscar en el treeview principal y seleccionar
-        if str(idx) in self.tree.get_children():
-            self.tree.selection_set(str(idx))
-            self.tree.see(str(idx))
-            self.tree.focus(str(idx))
+        # Buscar en la lista principal y seleccionar
+        if self.product_list.select(idx):
             # Cargar detalles
             self.selected_idx = idx
             self.load_product_details(idx)
@@ -792,10 +1265,7 @@ class ProductReviewerGUI:
     
     def _select_product(self, idx):
         """Selecciona un producto en el treeview (helper para after)."""
-        if str(idx) in self.tree.get_children():
-            self.tree.selection_set(str(idx))
-            self.tree.see(str(idx))
-            self.tree.focus(str(idx))
+        if self.product_list.select(idx):
             self.selected_idx = idx
             self.load_product_details(idx)
     
@@ -871,40 +1341,102 @@ class ProductReviewerGUI:
                     # Convertir a int, manejando NaN
                     self.df[col] = pd.to_numeric(self.df[col], errors='coerce').fillna(0).astype(int)
             
+            # Ediciones anotadas en el diario que el archivo aún no tiene (cierre inesperado)
+            if self.journal is not None:
+                self.journal.close()
+            self.journal = EditJournal(path)
+            self.df, recovered = self.journal.open(self.df)
+            
             self.file_path = path
-            self.modified = False
+            self.modified = recovered > 0
+            self.group_index = None
             
             self.update_brand_filter()
+            self.product_list.clear_selection()
             self.refresh_product_list()
-            self.update_status(f"Cargado: {path.name}")
+            self.update_modified_indicator()
+            if recovered:
+                self.update_status(f"Cargado: {path.name} ({recovered} ediciones sin guardar recuperadas del diario)")
+            else:
+                self.update_status(f"Cargado: {path.name}")
+            if self.journal.set_aside_path is not None:
+                messagebox.showwarning(
+                    "Diario de ediciones",
+                    f"El archivo cambió fuera del revisor; las ediciones anotadas no se aplicaron.\n"
+                    f"Quedaron en {self.journal.set_aside_path.name}"
+                )
             self.root.title(f"📦 Revisor de Productos - {path.name}")
             
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo cargar el archivo:\n{e}")
     
     def save_file(self):
-        """Guarda el archivo actual."""
+        """
+        Guarda el archivo actual en segundo plano (xlsx + CSV, o solo CSV si el
+        archivo es .csv). La interfaz sigue respondiendo y el avance se ve en la
+        barra de estado.
+        """
         if self.df is None or self.file_path is None:
             return
         
+        if self.background_save is not None:
+            # Ya hay uno en curso: al terminar se guarda de nuevo con los cambios de ahora
+            self.save_pending = True
+            self.update_status("Guardado en curso; se volverá a guardar al terminar")
+            return
+        
         try:
-            # Guardar Excel
-            xlsx_path = self.file_path.with_suffix('.xlsx')
-            with pd.ExcelWriter(xlsx_path, engine='openpyxl') as writer:
-                self.df.to_excel(writer, sheet_name='Maestro', index=False)
-            
-            # Guardar CSV
-            csv_path = self.file_path.with_suffix('.csv')
-            self.df.to_csv(csv_path, index=False, encoding='utf-8')
-            
-            self.modified = False
-            self.update_status(f"Guardado: {xlsx_path.name}")
-            self.update_modified_indicator()
-            
-            messagebox.showinfo("Guardado", f"Archivo guardado correctamente:\n{xlsx_path.name}")
-            
+            self.save_seq = self.journal.begin_snapshot() if self.journal is not None else None
+            self.background_save = BackgroundSave(self.df, save_targets(self.file_path)).start()
         except Exception as e:
+            if self.journal is not None:
+                self.journal.snapshot_failed()
             messagebox.showerror("Error", f"No se pudo guardar:\n{e}")
+            return
+        
+        # La copia ya tiene todos los cambios; lo que se edite desde ahora vuelve a marcarlo
+        self.modified = False
+        self.update_modified_indicator()
+        self.update_status(self.background_save.status)
+        self.root.after(self.SAVE_POLL_MS, self.poll_save)
+    
+    def poll_save(self):
+        """Muestra el avance del guardado en segundo plano y lo cierra al terminar."""
+        save = self.background_save
+        if save is None:
+            return
+        
+        self.update_status(save.status)
+        if not save.done:
+            self.root.after(self.SAVE_POLL_MS, self.poll_save)
+            return
+        
+        self.background_save = None
+        if save.error is not None:
+            if self.journal is not None:
+                self.journal.snapshot_failed()
+            self.modified = True
+            self.update_modified_indicator()
+            messagebox.showerror("Error", f"No se pudo guardar:\n{save.error}")
+        else:
+            # El archivo ya tiene lo anotado hasta la copia: el diario se compacta
+            if self.journal is not None:
+                self.journal.snapshot_saved(self.save_seq, [path for _fmt, path in save.targets])
+            if self.retired_journal is not None:
+                self.retired_journal.discard()
+                self.retired_journal = None
+        
+        if self.save_pending:
+            self.save_pending = False
+            self.save_file()
+    
+    def wait_for_save(self):
+        """Espera el guardado en curso (y el pendiente, si lo hay)."""
+        while self.background_save is not None:
+            self.update_status("Terminando de guardar...")
+            self.root.update_idletasks()
+            self.background_save.wait()
+            self.poll_save()
     
     def save_as(self):
         """Guarda con nuevo nombre."""
@@ -919,7 +1451,14 @@ class ProductReviewerGUI:
         )
         
         if file_path:
+            self.wait_for_save()
             self.file_path = Path(file_path)
+            if self.journal is not None:
+                # El diario sigue al archivo nuevo; el anterior se descarta cuando este quede guardado
+                self.journal.close()
+                self.retired_journal = self.journal
+                self.journal = EditJournal(self.file_path)
+                self.journal.start()
             self.save_file()
     
     def export_woocommerce(self):
@@ -950,79 +1489,149 @@ class ProductReviewerGUI:
     
     # ===== Lista de productos =====
     
-    def refresh_product_list(self):
-        """Actualiza la lista de productos."""
+    def refresh_product_list(self, data_changed=True):
+        """
+        Actualiza la lista de productos (solo se materializa la ventana visible).
+        Con data_changed=False (cambio de filtro o búsqueda) se reutiliza el
+        índice de búsqueda; si no, se reconstruye en el próximo filtrado.
+        """
         if self.df is None:
             return
         
-        # Limpiar
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        if data_changed:
+            self.search_index = None
+        self.product_list.set_rows(self.get_filtered_index())
         
-        # Aplicar filtros
-        filtered_df = self.get_filtered_df()
+        # Actualizar resumen
+        self.update_summary()
         
-        # Poblar
-        for idx, row in filtered_df.iterrows():
-            tipo = row.get('Tipo', '')
-            sku = row.get('SKU', '')
-            nombre = str(row.get('Nombre', ''))[:50]
-            precio = row.get('Precio normal', '')
-            revisado = row.get('Revisado_Humano', 'No')
-            
-            estado = '✓' if revisado == 'Sí' else '○'
-            
-            # Determinar tag
-            tags = [tipo]
-            if revisado == 'Sí':
-                tags.append('approved')
-            else:
-                tags.append('pending')
-            
-            self.tree.insert('', 'end', iid=str(idx), values=(tipo, sku, nombre, precio, estado), tags=tags)
+    def refresh_rows(self, indices):
+        """
+        Refleja en la lista la edición de algunas filas.
+        Si siguen pasando los filtros igual que antes se actualizan en el lugar;
+        si alguna entra o sale del filtro, se recalcula el índice filtrado.
+        """
+        if self.df is None:
+            return
         
-        # Actualizar resumen
+        indices = [idx for idx in indices if idx in self.df.index]
+        if self.search_index is not None:
+            self.search_index.update_rows(self.df, indices)
+        mask = self.get_filter_mask(self.df.loc[indices])
+        if any(bool(mask[idx]) != self.product_list.contains(idx) for idx in indices):
+            self.refresh_product_list(data_changed=False)
+            return
+        
+        for idx in indices:
+            self.product_list.update_row(idx)
         self.update_summary()
     
-    def get_filtered_df(self):
-        """Aplica filtros al DataFrame."""
-        if self.df is None:
-            return pd.DataFrame()
+    def product_row_values(self, idx):
+        """Valores y tags de una fila de la lista de productos."""
+        row = self.df.loc[idx]
+        tipo = row.get('Tipo', '')
+        sku = row.get('SKU', '')
+        nombre = str(row.get('Nombre', ''))[:50]
+        precio = row.get('Precio normal', '')
+        revisado = row.get('Revisado_Humano', 'No')
+        
+        estado = '✓' if revisado == 'Sí' else '○'
+        
+        # Determinar tag
+        tags = [tipo]
+        if revisado == 'Sí':
+            tags.append('approved')
+        else:
+            tags.append('pending')
         
-        df = self.df.copy()
+        return (tipo, sku, nombre, precio, estado), tags
+    
+    def get_search_index(self):
+        """Índice de filtros al día con self.df (lo reconstruye si cambiaron las filas)."""
+        if self.search_index is None or not self.search_index.matches(self.df):
+            self.search_index = ProductSearchIndex(self.df)
+        return self.search_index
+    
+    def get_group_index(self):
+        """Índice padre/hijos al día con self.df (lo reconstruye si cambiaron las filas)."""
+        if self.group_index is None or not self.group_index.matches(self.df):
+            self.group_index = ProductGroupIndex(self.df)
+        return self.group_index
+    
+    def record_edit(self, edit: dict):
+        """
+        Aplica una edición al DataFrame y la anota en el diario, para que un
+        cierre inesperado no la pierda. Con muchas ediciones sin guardar se
+        guarda el maestro en segundo plano (y el diario se compacta).
+        """
+        self.df = apply_edit(self.df, edit)
+        if self.journal is not None:
+            self.journal.append(edit)
+            if self.journal.needs_compaction and self.background_save is None:
+                self.save_file()
+    
+    def set_cell(self, idx, col, value):
+        """Cambia una celda (equivale a self.df.at[idx, col] = value, con diario)."""
+        self.record_edit({'op': EDIT_SET, 'row': idx, 'col': col, 'value': value})
+    
+    def set_principal(self, idx, principal):
+        """Cambia el 'Principal' de una fila manteniendo el índice padre/hijos."""
+        self.set_cell(idx, 'Principal', principal)
+        self.get_group_index().set_principal(idx, principal)
+    
+    def get_filter_mask(self, df=None):
+        """Máscara booleana de los filtros activos (sobre self.df o un subconjunto)."""
+        if df is None:
+            # Todo el DataFrame: se resuelve con el índice, sin recorrer textos
+            mask = self.get_search_index().filter_mask(
+                self.filter_var.get(), self.brand_filter_var.get(), self.search_var.get().strip().upper()
+            )
+            return pd.Series(mask, index=self.df.index)
+        mask = pd.Series(True, index=df.index)
         
         # Filtro por tipo
         filter_type = self.filter_var.get()
         if filter_type == 'simple':
-            df = df[df['Tipo'] == 'simple']
+            mask &= df['Tipo'] == 'simple'
         elif filter_type == 'variable':
-            df = df[df['Tipo'] == 'variable']
+            mask &= df['Tipo'] == 'variable'
         elif filter_type == 'variation':
-            df = df[df['Tipo'] == 'variation']
+            mask &= df['Tipo'] == 'variation'
         elif filter_type == 'pending':
-            df = df[df['Revisado_Humano'] != 'Sí']
+            mask &= df['Revisado_Humano'] != 'Sí'
         elif filter_type == 'approved':
-            df = df[df['Revisado_Humano'] == 'Sí']
+            mask &= df['Revisado_Humano'] == 'Sí'
         
         # Filtro por marca
         brand = self.brand_filter_var.get()
         if brand and brand != 'Todas':
-            df = df[df['Marcas'].astype(str).str.upper() == brand.upper()]
+            mask &= df['Marcas'].astype(str).str.upper() == brand.upper()
         
         # Filtro por búsqueda
         search = self.search_var.get().strip().upper()
         if search:
-            mask = (
+            mask &= (
                 df['SKU'].astype(str).str.upper().str.contains(search, na=False, regex=False) |
                 df['Nombre'].astype(str).str.upper().str.contains(search, na=False, regex=False)
             )
-            df = df[mask]
         
-        return df
+        return mask
+    
+    def get_filtered_index(self):
+        """Índices (del DataFrame) de las filas que pasan los filtros, en orden."""
+        if self.df is None:
+            return np.empty(0, dtype=np.int64)
+        return self.df.index[self.get_filter_mask().to_numpy()].to_numpy()
+    
+    def get_filtered_df(self):
+        """Aplica filtros al DataFrame."""
+        if self.df is None:
+            return pd.DataFrame()
+        return self.df[self.get_filter_mask()]
     
     def apply_filters(self):
         """Aplica filtros y actualiza lista."""
-        self.refresh_product_list()
+        self.refresh_product_list(data_changed=False)
     
     def update_brand_filter(self):
         """Actualiza las marcas disponibles en el filtro."""
@@ -1072,25 +1681,26 @@ class ProductReviewerGUI:
     
     def filter_by_search(self):
         """Filtra por texto de búsqueda."""
-        self.refresh_product_list()
+        self.refresh_product_list(data_changed=False)
     
     def filter_products(self, filter_type: str):
         """Cambia el filtro activo."""
         self.filter_var.set(filter_type)
-        self.refresh_product_list()
+        self.refresh_product_list(data_changed=False)
     
     def update_summary(self):
         """Actualiza el resumen de productos."""
         if self.df is None:
             return
         
+        index = self.get_search_index()
         total = len(self.df)
-        simples = (self.df['Tipo'] == 'simple').sum()
-        variables = (self.df['Tipo'] == 'variable').sum()
-        variations = (self.df['Tipo'] == 'variation').sum()
-        approved = (self.df['Revisado_Humano'] == 'Sí').sum()
+        simples = index.count('simple')
+        variables = index.count('variable')
+        variations = index.count('variation')
+        approved = index.count('approved')
         
-        filtered = len(self.get_filtered_df())
+        filtered = len(self.product_list)
         
         text = f"Total: {total} | Simples: {simples} | Variables: {variables} | Variaciones: {variations} | "
         text += f"Aprobados: {approved}/{total} | Mostrando: {filtered}"
@@ -1101,7 +1711,7 @@ class ProductReviewerGUI:
     
     def on_product_select(self, event):
         """Maneja selección de producto."""
-        selection = self.tree.selection()
+        selection = self.product_list.selection()
         if not selection:
             return
         
@@ -1188,7 +1798,7 @@ class ProductReviewerGUI:
         if tipo == 'variable':
             # Es padre - mostrar hijos
             parent_id = row['ID']
-            children = self.df[self.df['Principal'] == f'id:{parent_id}']
+            children = self.df.loc[self.get_group_index().children(parent_id)]
             
             self.group_info_label.config(text=f"👨‍👧‍👦 Padre: {row['Nombre'][:50]}\n📊 Variaciones: {len(children)}")
             
@@ -1212,18 +1822,18 @@ class ProductReviewerGUI:
             principal = row.get('Principal', '')
             if 'id:' in str(principal):
                 parent_id = int(str(principal).replace('id:', ''))
-                parent_df = self.df[self.df['ID'] == parent_id]
+                group_index = self.get_group_index()
+                parent_idx = group_index.parent_row(parent_id)
                 
-                if len(parent_df) > 0:
-                    parent = parent_df.iloc[0]
-                    parent_idx = parent_df.index[0]
+                if parent_idx is not None:
+                    parent = self.df.loc[parent_idx]
                     
                     # Guardar índice del padre y mostrar botón
                     self.current_parent_idx = parent_idx
                     self.go_to_parent_btn.pack(side=tk.RIGHT, padx=5)
                     
                     # Buscar todas las variaciones del mismo padre
-                    siblings = self.df[self.df['Principal'] == f'id:{parent_id}']
+                    siblings = self.df.loc[group_index.children(parent_id)]
                     
                     self.group_info_label.config(
                         text=f"👨‍👧‍👦 Padre: {parent['Nombre'][:50]}\n"
@@ -1295,7 +1905,7 @@ class ProductReviewerGUI:
                             value = None
                 
                 try:
-                    self.df.at[idx, field] = value
+                    self.set_cell(idx, field, value)
                 except Exception:
                     pass
         
@@ -1304,10 +1914,10 @@ class ProductReviewerGUI:
             try:
                 name_val = self.attr_vars[i]['name'].get().strip()
                 val_val = self.attr_vars[i]['value'].get().strip()
-                self.df.at[idx, name_col] = name_val if name_val else ''
-                self.df.at[idx, val_col] = val_val if val_val else ''
-                self.df.at[idx, vis_col] = int(self.attr_vars[i]['visible'].get())
-                self.df.at[idx, glob_col] = int(self.attr_vars[i]['global'].get())
+                self.set_cell(idx, name_col, name_val if name_val else '')
+                self.set_cell(idx, val_col, val_val if val_val else '')
+                self.set_cell(idx, vis_col, int(self.attr_vars[i]['visible'].get()))
+                self.set_cell(idx, glob_col, int(self.attr_vars[i]['global'].get()))
             except Exception:
                 pass
         
@@ -1318,13 +1928,11 @@ class ProductReviewerGUI:
         
         self.modified = True
         self.update_modified_indicator()
-        self.refresh_product_list()
+        # Solo la fila editada; la lista completa se recalcula si cambia el filtro
+        self.refresh_rows([idx])
         
         # Re-seleccionar
-        try:
-            self.tree.selection_set(str(idx))
-        except Exception:
-            pass
+        self.product_list.select(idx)
         
         self.update_status("Producto actualizado")
     
@@ -1345,15 +1953,14 @@ class ProductReviewerGUI:
         
         # Obtener ID del padre
         parent_id = int(str(principal).replace('id:', ''))
-        parent_df = self.df[self.df['ID'] == parent_id]
+        group_index = self.get_group_index()
+        parent_idx = group_index.parent_row(parent_id)
         
-        if len(parent_df) == 0:
+        if parent_idx is None:
             return
         
-        parent_idx = parent_df.index[0]
-        
         # Obtener todas las variaciones del mismo padre
-        siblings = self.df[self.df['Principal'] == f'id:{parent_id}']
+        siblings = self.df.loc[group_index.children(parent_id)]
         
         if len(siblings) == 0:
             return
@@ -1389,17 +1996,17 @@ class ProductReviewerGUI:
             # Actualizar el padre si hay atributos
             if attr_names:
                 # Usar el primer nombre encontrado (deberían ser iguales)
-                self.df.at[parent_idx, name_col] = list(attr_names)[0]
+                self.set_cell(parent_idx, name_col, list(attr_names)[0])
                 # Unir todos los valores únicos con |
-                self.df.at[parent_idx, val_col] = '|'.join(sorted(attr_values))
-                self.df.at[parent_idx, vis_col] = 1
-                self.df.at[parent_idx, glob_col] = attr_global
+                self.set_cell(parent_idx, val_col, '|'.join(sorted(attr_values)))
+                self.set_cell(parent_idx, vis_col, 1)
+                self.set_cell(parent_idx, glob_col, attr_global)
             else:
                 # Limpiar si no hay atributos en los hijos
-                self.df.at[parent_idx, name_col] = ''
-                self.df.at[parent_idx, val_col] = ''
-                self.df.at[parent_idx, vis_col] = 0
-                self.df.at[parent_idx, glob_col] = 0
+                self.set_cell(parent_idx, name_col, '')
+                self.set_cell(parent_idx, val_col, '')
+                self.set_cell(parent_idx, vis_col, 0)
+                self.set_cell(parent_idx, glob_col, 0)
     
     def reload_current_product(self):
         """Recarga datos del producto actual."""
@@ -1411,22 +2018,22 @@ class ProductReviewerGUI:
     
     def approve_selected(self):
         """Aprueba productos seleccionados."""
-        selection = self.tree.selection()
+        selection = self.product_list.selection()
         if not selection:
             return
         
         for item in selection:
             idx = int(item)
-            self.df.at[idx, 'Revisado_Humano'] = 'Sí'
+            self.set_cell(idx, 'Revisado_Humano', 'Sí')
         
         self.modified = True
         self.update_modified_indicator()
-        self.refresh_product_list()
+        self.refresh_rows([int(item) for item in selection])
         self.update_status(f"{len(selection)} producto(s) aprobado(s)")
     
     def reject_selected(self):
         """Rechaza productos seleccionados."""
-        selection = self.tree.selection()
+        selection = self.product_list.selection()
         if not selection:
             return
         
@@ -1434,13 +2041,13 @@ class ProductReviewerGUI:
         
         for item in selection:
             idx = int(item)
-            self.df.at[idx, 'Revisado_Humano'] = 'No'
+            self.set_cell(idx, 'Revisado_Humano', 'No')
             if note:
-                self.df.at[idx, 'Notas_Revisión'] = note
+                self.set_cell(idx, 'Notas_Revisión', note)
         
         self.modified = True
         self.update_modified_indicator()
-        self.refresh_product_list()
+        self.refresh_rows([int(item) for item in selection])
         self.update_status(f"{len(selection)} producto(s) rechazado(s)")
     
     def approve_all_visible(self):
@@ -1452,7 +2059,7 @@ class ProductReviewerGUI:
         
         if messagebox.askyesno("Confirmar", f"¿Aprobar {len(filtered_df)} productos?"):
             for idx in filtered_df.index:
-                self.df.at[idx, 'Revisado_Humano'] = 'Sí'
+                self.set_cell(idx, 'Revisado_Humano', 'Sí')
             
             self.modified = True
             self.update_modified_indicator()
@@ -1461,7 +2068,7 @@ class ProductReviewerGUI:
     
     def delete_selected(self):
         """Elimina productos seleccionados."""
-        selection = self.tree.selection()
+        selection = self.product_list.selection()
         if not selection:
             return
         
@@ -1469,11 +2076,12 @@ class ProductReviewerGUI:
             return
         
         indices = [int(item) for item in selection]
-        self.df = self.df.drop(indices).reset_index(drop=True)
-        self.df['ID'] = range(1, len(self.df) + 1)
+        self.record_edit({'op': EDIT_DROP, 'rows': indices})
+        self.record_edit({'op': EDIT_RENUMBER_IDS})
         
         self.modified = True
         self.update_modified_indicator()
+        self.product_list.clear_selection()
         self.refresh_product_list()
         self.selected_idx = None
         self.update_status(f"{len(indices)} producto(s) eliminado(s)")
@@ -1605,9 +2213,9 @@ class ProductReviewerGUI:
             for sel in selections:
                 if sel in idx_map:
                     simple_idx = idx_map[sel]
-                    self.df.at[simple_idx, 'Tipo'] = 'variation'
-                    self.df.at[simple_idx, 'Principal'] = f'id:{parent_id}'
-                    self.df.at[simple_idx, 'Clase de impuesto'] = 'parent'
+                    self.set_cell(simple_idx, 'Tipo', 'variation')
+                    self.set_principal(simple_idx, f'id:{parent_id}')
+                    self.set_cell(simple_idx, 'Clase de impuesto', 'parent')
                     added_count += 1
                     if first_added_idx is None:
                         first_added_idx = simple_idx
@@ -1646,16 +2254,16 @@ class ProductReviewerGUI:
         
         for item in selection:
             idx = int(item)
-            self.df.at[idx, 'Tipo'] = 'simple'
-            self.df.at[idx, 'Principal'] = ''
-            self.df.at[idx, 'Clase de impuesto'] = ''
+            self.set_cell(idx, 'Tipo', 'simple')
+            self.set_principal(idx, '')
+            self.set_cell(idx, 'Clase de impuesto', '')
         
         # Sincronizar atributos del padre después de quitar variaciones
         if parent_id is not None:
             # Buscar cualquier variación restante para sincronizar
-            remaining = self.df[self.df['Principal'] == f'id:{parent_id}']
-            if len(remaining) > 0:
-                self.sync_parent_attributes(remaining.index[0])
+            remaining = self.get_group_index().children(parent_id)
+            if remaining:
+                self.sync_parent_attributes(remaining[0])
         
         self.modified = True
         self.update_modified_indicator()
@@ -1674,7 +2282,7 @@ class ProductReviewerGUI:
         for item in selection:
             idx = int(item)
             if idx in self.df.index:
-                self.df.at[idx, 'Revisado_Humano'] = 'Sí'
+                self.set_cell(idx, 'Revisado_Humano', 'Sí')
                 count += 1
         
         self.modified = True
@@ -1694,7 +2302,7 @@ class ProductReviewerGUI:
         for item in selection:
             idx = int(item)
             if idx in self.df.index:
-                self.df.at[idx, 'Revisado_Humano'] = 'No'
+                self.set_cell(idx, 'Revisado_Humano', 'No')
                 count += 1
         
         self.modified = True
@@ -1716,12 +2324,11 @@ class ProductReviewerGUI:
         new_name = simpledialog.askstring("Renombrar", "Nuevo nombre para el grupo:", 
                                           initialvalue=row['Nombre'])
         if new_name:
-            self.df.at[self.selected_idx, 'Nombre'] = new_name
+            self.set_cell(self.selected_idx, 'Nombre', new_name)
             
             # Preguntar si actualizar hijos
             if messagebox.askyesno("Actualizar hijos", "¿Actualizar nombres de las variaciones sin nombre?"):
-                parent_id = row['ID']
-                children = self.df[self.df['Principal'] == f'id:{parent_id}']
+                children = self.df.loc[self.get_group_index().children(row['ID'])]
                 
                 for child_idx, child in children.iterrows():
                     # Solo actualizar si no tiene nombre o está vacío
@@ -1737,10 +2344,10 @@ class ProductReviewerGUI:
                             attrs.append(str(val))
                     
                     if attrs:
-                        self.df.at[child_idx, 'Nombre'] = f"{new_name} - {' '.join(attrs[:2])}"
+                        self.set_cell(child_idx, 'Nombre', f"{new_name} - {' '.join(attrs[:2])}")
                     else:
                         var_num = list(children.index).index(child_idx) + 1
-                        self.df.at[child_idx, 'Nombre'] = f"{new_name} - Variante {var_num}"
+                        self.set_cell(child_idx, 'Nombre', f"{new_name} - Variante {var_num}")
             
             self.modified = True
             self.update_modified_indicator()
@@ -1749,7 +2356,7 @@ class ProductReviewerGUI:
     
     def create_group_from_selection(self):
         """Crea un grupo desde la selección actual."""
-        selection = self.tree.selection()
+        selection = self.product_list.selection()
         if len(selection) < 2:
             messagebox.showwarning("Aviso", "Selecciona al menos 2 productos")
             return
@@ -1814,17 +2421,16 @@ class ProductReviewerGUI:
                 parent_data[glob_col] = any_global
         
         # Agregar padre
-        parent_df = pd.DataFrame([parent_data])
-        self.df = pd.concat([self.df, parent_df], ignore_index=True)
+        self.record_edit({'op': EDIT_APPEND, 'values': parent_data})
         
         # Actualizar hijos
         new_parent_idx = len(self.df) - 1
         actual_parent_id = self.df.loc[new_parent_idx, 'ID']
         
         for idx in indices:
-            self.df.at[idx, 'Tipo'] = 'variation'
-            self.df.at[idx, 'Principal'] = f'id:{actual_parent_id}'
-            self.df.at[idx, 'Clase de impuesto'] = 'parent'
+            self.set_cell(idx, 'Tipo', 'variation')
+            self.set_principal(idx, f'id:{actual_parent_id}')
+            self.set_cell(idx, 'Clase de impuesto', 'parent')
         
         self.modified = True
         self.update_modified_indicator()
@@ -1833,7 +2439,7 @@ class ProductReviewerGUI:
     
     def add_to_existing_group(self):
         """Agrega selección a un grupo existente."""
-        selection = self.tree.selection()
+        selection = self.product_list.selection()
         if not selection:
             messagebox.showinfo("Info", "Selecciona productos para agregar")
             return
@@ -1908,6 +2514,8 @@ class ProductReviewerGUI:
         # Variable para mapear índice de listbox a índice de DataFrame
         idx_map = {}
         
+        group_index = self.get_group_index()
+        
         def populate_list(filter_text=""):
             """Rellena la lista con grupos filtrados."""
             listbox.delete(0, tk.END)
@@ -1921,8 +2529,7 @@ class ProductReviewerGUI:
                 nombre = str(group.get('Nombre', ''))
                 
                 # Contar variaciones del grupo
-                parent_id = group['ID']
-                var_count = len(self.df[self.df['Principal'] == f'id:{parent_id}'])
+                var_count = len(group_index.children(group['ID']))
                 
                 # Filtrar por texto de búsqueda
                 if filter_text:
@@ -1964,9 +2571,9 @@ class ProductReviewerGUI:
             first_added_idx = None
             for item in selection:
                 idx = int(item)
-                self.df.at[idx, 'Tipo'] = 'variation'
-                self.df.at[idx, 'Principal'] = f'id:{parent_id}'
-                self.df.at[idx, 'Clase de impuesto'] = 'parent'
+                self.set_cell(idx, 'Tipo', 'variation')
+                self.set_principal(idx, f'id:{parent_id}')
+                self.set_cell(idx, 'Clase de impuesto', 'parent')
                 if first_added_idx is None:
                     first_added_idx = idx
             
@@ -1989,7 +2596,7 @@ class ProductReviewerGUI:
     
     def remove_from_group(self):
         """Separa producto seleccionado del grupo."""
-        selection = self.tree.selection()
+        selection = self.product_list.selection()
         if not selection:
             return
         
@@ -2006,16 +2613,16 @@ class ProductReviewerGUI:
         for item in selection:
             idx = int(item)
             if self.df.loc[idx, 'Tipo'] == 'variation':
-                self.df.at[idx, 'Tipo'] = 'simple'
-                self.df.at[idx, 'Principal'] = ''
-                self.df.at[idx, 'Clase de impuesto'] = ''
+                self.set_cell(idx, 'Tipo', 'simple')
+                self.set_principal(idx, '')
+                self.set_cell(idx, 'Clase de impuesto', '')
                 count += 1
         
         # Sincronizar atributos de los padres afectados
         for parent_id in parent_ids_to_sync:
-            remaining = self.df[self.df['Principal'] == f'id:{parent_id}']
-            if len(remaining) > 0:
-                self.sync_parent_attributes(remaining.index[0])
+            remaining = self.get_group_index().children(parent_id)
+            if remaining:
+                self.sync_parent_attributes(remaining[0])
         
         if count > 0:
             self.modified = True
@@ -2069,11 +2676,11 @@ class ProductReviewerGUI:
         
         idx_map = {}
         preselect_index = None
+        group_index = self.get_group_index()
         for i, (idx, group) in enumerate(groups.iterrows()):
             # Contar variaciones
             parent_id = group['ID']
-            variations = self.df[self.df['Principal'] == f'id:{parent_id}']
-            var_count = len(variations)
+            var_count = len(group_index.children(parent_id))
             listbox.insert(tk.END, f"{group['SKU']} - {group['Nombre'][:35]} ({var_count} variaciones)")
             idx_map[i] = idx
             
@@ -2109,8 +2716,7 @@ class ProductReviewerGUI:
             parent_name = parent_row['Nombre']
             
             # Encontrar variaciones
-            variation_mask = self.df['Principal'] == f'id:{parent_id}'
-            variation_indices = self.df[variation_mask].index.tolist()
+            variation_indices = self.get_group_index().children(parent_id)
             var_count = len(variation_indices)
             
             action = action_var.get()
@@ -2127,21 +2733,22 @@ class ProductReviewerGUI:
             if action == "delete_all":
                 # Eliminar padre y variaciones
                 indices_to_delete = [parent_idx] + variation_indices
-                self.df = self.df.drop(indices_to_delete).reset_index(drop=True)
+                self.record_edit({'op': EDIT_DROP, 'rows': indices_to_delete})
                 self.update_status(f"Grupo '{parent_name}' eliminado con {var_count} variaciones")
             else:
                 # Convertir variaciones a simples y eliminar padre
                 for var_idx in variation_indices:
-                    self.df.at[var_idx, 'Tipo'] = 'simple'
-                    self.df.at[var_idx, 'Principal'] = ''
-                    self.df.at[var_idx, 'Clase de impuesto'] = ''
+                    self.set_cell(var_idx, 'Tipo', 'simple')
+                    self.set_principal(var_idx, '')
+                    self.set_cell(var_idx, 'Clase de impuesto', '')
                 
-                self.df = self.df.drop(parent_idx).reset_index(drop=True)
+                self.record_edit({'op': EDIT_DROP, 'rows': [parent_idx]})
                 self.update_status(f"Grupo '{parent_name}' eliminado. {var_count} productos convertidos a simples")
             
             self.modified = True
             self.selected_idx = None
             self.update_modified_indicator()
+            self.product_list.clear_selection()
             self.refresh_product_list()
             self.clear_detail_panel()
             dialog.destroy()
@@ -2188,6 +2795,7 @@ class ProductReviewerGUI:
     
     def on_closing(self):
         """Maneja cierre de ventana."""
+        discard = False
         if self.modified:
             result = messagebox.askyesnocancel(
                 "Guardar cambios",
@@ -2197,7 +2805,15 @@ class ProductReviewerGUI:
                 return
             elif result:  # Yes
                 self.save_file()
-        
+            else:
+                discard = True
+        
+        # Cerrar con un guardado a medias dejaría el archivo anterior
+        self.wait_for_save()
+        if self.journal is not None:
+            if discard:
+                self.journal.discard()
+            self.journal.close()
         self.root.destroy()
 
 
@@ -8,6 +8,8 @@ from src.patterns import PatternExtractor, extract_attributes, normalize_measure
 from src.attributes import AttributeValidator, validate_attributes
 from src.grouping import ProductGrouper, group_products
 from src.review import ReviewFormatter, generate_master_format
+from src.memo import NameMemo
+from src.rules import CompiledRules
 
 __version__ = '0.2.0'
 __author__ = 'Data Engineering Team'
@@ -25,5 +27,7 @@ __all__ = [
     'ProductGrouper',
     'group_products',
     'ReviewFormatter',
-    'generate_master_format'
+    'generate_master_format',
+    'NameMemo',
+    'CompiledRules'
 ]
@@ -10,9 +10,10 @@ import re
 import logging
 from typing import Dict, List, Tuple, Optional, Set
 from dataclasses import dataclass
-import yaml
 from fractions import Fraction
 
+from src.rules import CompiledRules
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,36 +37,35 @@ class AttributeValidator:
     - Marca confianza de validación
     """
     
-    def __init__(self, rules_path: str = 'config/rules.yaml'):
+    def __init__(self, rules_path: str = 'config/rules.yaml',
+                 compiled_rules: Optional[CompiledRules] = None):
         """
         Inicializa validador.
         
         Args:
             rules_path: Path a archivo de reglas
+            compiled_rules: Reglas ya compiladas (por defecto, las compartidas
+                del proceso para rules_path)
         """
-        self.rules = self._load_rules(rules_path)
-        self._build_lookup_tables()
+        self.compiled_rules = compiled_rules if compiled_rules is not None else CompiledRules.load(rules_path)
+        self.rules = self.compiled_rules.rules
+        tables = self.compiled_rules.artifact('attributes.lookup_tables', self._build_lookup_tables)
+        self.valid_diameters = tables['valid_diameters']
+        self.valid_lengths = tables['valid_lengths']
+        self.valid_materials = tables['valid_materials']
+        self.valid_finishes = tables['valid_finishes']
         logger.info("Validador de atributos inicializado")
     
-    def _load_rules(self, rules_path: str) -> Dict:
-        """Carga reglas desde YAML."""
-        try:
-            with open(rules_path, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
-        except FileNotFoundError:
-            logger.warning(f"Reglas no encontradas: {rules_path}")
-            return {}
-    
-    def _build_lookup_tables(self) -> None:
-        """Construye tablas de búsqueda para validación."""
+    def _build_lookup_tables(self) -> Dict[str, Set[str]]:
+        """Construye tablas de búsqueda para validación (una vez por YAML)."""
         
         # Diámetros comunes (en pulgadas y mm)
-        self.valid_diameters = set()
+        valid_diameters = set()
         if 'ranges' in self.rules and 'diametro_comun' in self.rules['ranges']:
-            self.valid_diameters.update(self.rules['ranges']['diametro_comun'])
+            valid_diameters.update(self.rules['ranges']['diametro_comun'])
         
         # Agregar estándares universales
-        self.valid_diameters.update([
+        valid_diameters.update([
             '1/4"', '5/16"', '3/8"', '7/16"', '1/2"', '5/8"', '3/4"', '7/8"',
             '1"', '1 1/8"', '1 1/4"', '1 3/8"', '1 1/2"', '2"',
             '3mm', '4mm', '5mm', '6mm', '8mm', '10mm', '12mm', '16mm', '20mm',
@@ -73,35 +73,42 @@ class AttributeValidator:
         ])
         
         # Largos comunes
-        self.valid_lengths = set()
+        valid_lengths = set()
         if 'ranges' in self.rules and 'largo_comun' in self.rules['ranges']:
-            self.valid_lengths.update(self.rules['ranges']['largo_comun'])
+            valid_lengths.update(self.rules['ranges']['largo_comun'])
         
-        self.valid_lengths.update([
+        valid_lengths.update([
             '5cm', '10cm', '15cm', '20cm', '25cm', '30cm', '40cm', '50cm',
             '60cm', '75cm', '100cm', '1m', '1.5m', '2m', '2.5m', '3m', '5m',
             '10m', '25m', '50m'
         ])
         
         # Materiales válidos
-        self.valid_materials = set()
+        valid_materials = set()
         if 'attributes' in self.rules and 'material' in self.rules['attributes']:
             if 'keywords' in self.rules['attributes']['material']:
-                self.valid_materials.update(
+                valid_materials.update(
                     [k.lower() for k in self.rules['attributes']['material']['keywords']]
                 )
         
-        self.valid_materials.update([
+        valid_materials.update([
             'acero', 'hierro', 'acero inoxidable', 'inox', 'cobre',
             'aluminio', 'bronce', 'latón', 'plástico', 'poliéster',
             'galvanizado', 'cromado', 'fosfatado', 'negro', 'blanco'
         ])
         
         # Acabados válidos
-        self.valid_finishes = {
+        valid_finishes = {
             'galvanizado', 'cromado', 'fosfatado', 'plateado', 'oxidado',
             'brillante', 'mate', 'satinado', 'natural'
         }
+        
+        return {
+            'valid_diameters': valid_diameters,
+            'valid_lengths': valid_lengths,
+            'valid_materials': valid_materials,
+            'valid_finishes': valid_finishes,
+        }
     
     def validate_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -457,18 +464,20 @@ class AttributeValidator:
 
 
 # Función de conveniencia
-def validate_attributes(df: pd.DataFrame, rules_path: str = 'config/rules.yaml') -> pd.DataFrame:
+def validate_attributes(df: pd.DataFrame, rules_path: str = 'config/rules.yaml',
+                        compiled_rules: Optional[CompiledRules] = None) -> pd.DataFrame:
     """
     Valida atributos del DataFrame.
     
     Args:
         df: DataFrame con atributos extraídos
         rules_path: Path a archivo de reglas
+        compiled_rules: Reglas compiladas compartidas (opcional)
     
     Returns:
         DataFrame con validaciones
     """
-    validator = AttributeValidator(rules_path)
+    validator = AttributeValidator(rules_path, compiled_rules=compiled_rules)
     df_validated = validator.validate_dataframe(df)
     print(validator.get_validation_summary(df_validated))
     return df_validated
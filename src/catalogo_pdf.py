@@ -6,14 +6,26 @@ Extracción del catálogo Mamut desde PDF.
 - Salida: JSON con estructura + productos para validar (aceptar / mantener anterior / borrar).
 
 Opcionalmente usa LLMWhisper para extraer el PDF (extracción espacial) y guarda el texto en .txt
-para no volver a llamar a la API si el archivo ya existe.
+para no volver a llamar a la API si el archivo ya existe. Sin LLMWhisper, la extracción local con
+PyMuPDF reconstruye el mismo formato (líneas con posiciones de columna y marcadores "<<<" por
+página) repartiendo las páginas entre varios procesos.
 """
 
+import os
 import re
 import json
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+# Marcador de fin de página, igual que el separador de LLMWhisper (<<< + salto de página)
+PAGE_SEPARATOR = "<<<\f"
+
+# Páginas por debajo de las cuales no compensa lanzar procesos
+MIN_PAGES_PER_WORKER = 4
+
 
 def _get_llmwhisper_extract():
     """Import perezoso del módulo LLMWhisper para no fallar si no está instalado."""
@@ -34,6 +46,7 @@ def get_catalog_text(
     txt_path: str | Path | None = None,
     use_llmwhisper: bool = True,
     force_extract: bool = False,
+    layout: bool = True,
 ) -> str:
     """
     Obtiene el texto del catálogo para extracción espacial.
@@ -43,6 +56,8 @@ def get_catalog_text(
     - txt_path: dónde guardar/leer el .txt (por defecto mismo nombre que el PDF con extensión .txt).
     - use_llmwhisper: si True y hace falta extraer, usar LLMWhisper; si False, usar PyMuPDF (no guarda .txt).
     - force_extract: si True, reextraer siempre con LLMWhisper y sobrescribir el .txt.
+    - layout: formato del fallback PyMuPDF; True conserva las columnas (back-end espacial),
+      False da una celda por línea (back-end de celdas). LLMWhisper siempre usa layout_preserving.
     """
     path = Path(pdf_or_txt_path).resolve()
     if path.suffix.lower() == ".txt":
@@ -70,9 +85,9 @@ def get_catalog_text(
             use_llmwhisper=True,
         )
 
-    # Fallback: PyMuPDF (no guarda .txt)
-    pages = extract_text_from_pdf(str(path))
-    all_text = "\n".join(t for _n, t in pages)
+    # Fallback: PyMuPDF local (con disposición espacial salvo que se pida texto plano)
+    pages = extract_text_from_pdf(str(path), layout=layout)
+    all_text = join_pages(pages)
     if not force_extract and all_text.strip():
         try:
             txt_path.parent.mkdir(parents=True, exist_ok=True)
@@ -82,22 +97,116 @@ def get_catalog_text(
     return all_text
 
 
-def extract_text_from_pdf(pdf_path: str) -> list[tuple[int, str]]:
-    """Extrae texto de cada página del PDF con PyMuPDF. Retorna lista de (número_página, texto)."""
+def extract_text_from_pdf(
+    pdf_path: str,
+    layout: bool = True,
+    workers: int | None = None,
+) -> list[tuple[int, str]]:
+    """
+    Extrae texto de cada página del PDF con PyMuPDF. Retorna lista de (número_página, texto).
+
+    - layout: si True, reconstruye las líneas desde las coordenadas de las palabras
+      (get_text("words")) conservando las columnas, como el modo layout_preserving;
+      si False, texto plano de page.get_text().
+    - workers: procesos a usar (por defecto, núcleos disponibles). Las páginas se reparten
+      en rangos contiguos y cada proceso abre su propio documento.
+    """
     try:
         import fitz  # PyMuPDF
     except ImportError:
         raise ImportError("Instala PyMuPDF: pip install pymupdf")
 
-    doc = fitz.open(pdf_path)
+    with fitz.open(pdf_path) as doc:
+        total_pages = len(doc)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, total_pages // MIN_PAGES_PER_WORKER))
+    if workers == 1:
+        return _extract_page_range(pdf_path, 0, total_pages, layout)
+
+    step = -(-total_pages // workers)
+    starts = range(0, total_pages, step)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunks = pool.map(
+            _extract_page_range,
+            [pdf_path] * len(starts),
+            starts,
+            [min(start + step, total_pages) for start in starts],
+            [layout] * len(starts),
+        )
+        return [page for chunk in chunks for page in chunk]
+
+
+def _extract_page_range(pdf_path: str, start: int, stop: int, layout: bool) -> list[tuple[int, str]]:
+    """Extrae las páginas [start, stop) con un documento propio (se ejecuta en un proceso aparte)."""
+    import fitz  # PyMuPDF
+
     pages = []
-    for i, page in enumerate(doc):
-        text = page.get_text()
-        pages.append((i + 1, text))
-    doc.close()
+    with fitz.open(pdf_path) as doc:
+        for i in range(start, stop):
+            page = doc[i]
+            if layout:
+                text = layout_text_from_words(page.get_text("words"))
+            else:
+                text = page.get_text()
+            pages.append((i + 1, text))
     return pages
 
 
+def layout_text_from_words(words: list[tuple], char_width: float | None = None) -> str:
+    """
+    Reconstruye el texto de una página conservando la disposición espacial.
+
+    words: tuplas de PyMuPDF (x0, y0, x1, y1, palabra, bloque, línea, n_palabra).
+    Las palabras se agrupan en filas por su centro vertical y cada una se coloca en la
+    columna x0 / char_width (ancho medio de carácter de la página si no se indica), con al
+    menos un espacio entre palabras. Los saltos verticales grandes dejan líneas en blanco.
+    """
+    words = [w for w in words if w[4].strip()]
+    if not words:
+        return ""
+
+    if char_width is None:
+        char_width = statistics.median((w[2] - w[0]) / len(w[4]) for w in words) or 1.0
+    word_height = statistics.median(w[3] - w[1] for w in words) or 1.0
+
+    # Filas: palabras cuyo centro vertical cae dentro de media altura del de la fila
+    rows: list[tuple[float, list[tuple]]] = []
+    for w in sorted(words, key=lambda w: ((w[1] + w[3]) / 2, w[0])):
+        center = (w[1] + w[3]) / 2
+        if rows and center - rows[-1][0] <= word_height / 2:
+            rows[-1][1].append(w)
+        else:
+            rows.append((center, [w]))
+
+    # Interlineado habitual de la página: separación más frecuente entre filas
+    spacings = [b[0] - a[0] for a, b in zip(rows, rows[1:])]
+    line_pitch = statistics.median(spacings) if spacings else word_height
+
+    lines = []
+    previous = None
+    for center, row in rows:
+        if previous is not None:
+            blanks = min(round((center - previous) / line_pitch) - 1, 2)
+            lines.extend([""] * max(blanks, 0))
+        previous = center
+
+        line = ""
+        for w in sorted(row, key=lambda w: w[0]):
+            col = round(w[0] / char_width)
+            if line:
+                col = max(col, len(line) + 1)
+            line = line.ljust(col) + w[4]
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def join_pages(pages: list[tuple[int, str]]) -> str:
+    """Une las páginas en un texto con el marcador "<<<" tras cada una (formato LLMWhisper)."""
+    return "\n".join(f"{text}\n{PAGE_SEPARATOR}" for _n, text in pages)
+
+
 def _split_columns(line: str) -> list[str]:
     """Separa una línea en columnas (tabs o múltiples espacios)."""
     line = line.strip()
@@ -151,7 +260,87 @@ def _is_data_row(tokens: list[str], attr_count: int) -> bool:
     return len(tokens) >= 1
 
 
-def parse_index_pages(lines: list[str]) -> dict[str, Any]:
+# Tipos de línea del lexer: cada línea se clasifica una sola vez
+LINE_BLANK = "blank"
+LINE_PAGE_NUMBER = "page_number"  # "Página 3 de 8"
+LINE_SECTION = "section"  # "FIJACIONES - Tornillos para Metalcon"
+LINE_CODIGO = "codigo"  # celda "CODIGO" sola (encabezado en celdas)
+LINE_SKU = "sku"
+LINE_TEXT = "text"
+
+# Layouts de texto y back-end que los parsea
+LAYOUT_AUTO = "auto"
+LAYOUT_CELLS = "cells"  # una celda por línea (PyMuPDF get_text() plano)
+LAYOUT_SPATIAL = "spatial"  # tablas lado a lado con columnas (LLMWhisper layout_preserving)
+
+
+@dataclass(slots=True)
+class CatalogLine:
+    """Línea del catálogo ya lexeada (texto normalizado + tipo)."""
+
+    raw: str
+    stripped: str
+    upper: str
+    kind: str
+    # Columna del segundo "CODIGO" (encabezado de dos tablas lado a lado); -1 si no hay
+    second_codigo: int = -1
+
+
+def lex_catalog_lines(lines: list[str]) -> list[CatalogLine]:
+    """
+    Única pasada sobre el texto: normaliza y clasifica cada línea.
+    El orden de las reglas es el que aplica parse_product_pages; además se guarda
+    la posición del segundo CODIGO, que el back-end espacial usa como gap central.
+    """
+    tokens = []
+    for raw in lines:
+        stripped = _normalize_line(raw)
+        upper = stripped.upper()
+        if not stripped:
+            kind = LINE_BLANK
+        elif "Página " in stripped and " de " in stripped:
+            kind = LINE_PAGE_NUMBER
+        elif " - " in stripped and not upper.startswith("CODIGO"):
+            kind = LINE_SECTION
+        elif upper in ("CODIGO", "CÓDIGO"):
+            kind = LINE_CODIGO
+        elif _looks_like_sku(stripped):
+            kind = LINE_SKU
+        else:
+            kind = LINE_TEXT
+
+        second_codigo = -1
+        if upper.count("CODIGO") >= 2:
+            # Posición en la línea original (con la sangría), como la mide el parser espacial
+            raw_upper = raw.upper()
+            second_codigo = raw_upper.find("CODIGO", raw_upper.find("CODIGO") + 6)
+        tokens.append(CatalogLine(raw, stripped, upper, kind, second_codigo))
+    return tokens
+
+
+def _as_tokens(lines: list[str] | list[CatalogLine]) -> list[CatalogLine]:
+    """Acepta líneas de texto o ya lexeadas."""
+    if lines and not isinstance(lines[0], CatalogLine):
+        return lex_catalog_lines(lines)
+    return lines
+
+
+def detect_layout(tokens: list[CatalogLine]) -> str:
+    """
+    Elige el back-end según cómo vienen los encabezados de tabla:
+    - CODIGO solo en su línea (celda por línea) → LAYOUT_CELLS
+    - CODIGO seguido de las columnas en la misma línea → LAYOUT_SPATIAL
+    """
+    cell_headers = inline_headers = 0
+    for token in tokens:
+        if token.kind == LINE_CODIGO:
+            cell_headers += 1
+        elif token.upper.startswith(("CODIGO ", "CÓDIGO ")):
+            inline_headers += 1
+    return LAYOUT_SPATIAL if inline_headers > cell_headers else LAYOUT_CELLS
+
+
+def parse_index_pages(lines: list[str] | list[CatalogLine]) -> dict[str, Any]:
     """
     Parsea las primeras páginas (índice) para construir el árbol de categorías.
     El índice tiene ramas en mayúsculas y números de categoría.
@@ -160,18 +349,17 @@ def parse_index_pages(lines: list[str]) -> dict[str, Any]:
     tree: dict[str, Any] = {}
     current_path: list[str] = []
     # Palabras que indican nueva rama principal (primera palabra de una línea en mayúsculas)
-    for i, line in enumerate(lines):
-        line = line.strip()
+    for token in _as_tokens(lines):
+        line = token.stripped
         if not line:
             continue
         # Saltar marcas de página
         if line.startswith("-- ") and " of " in line:
             continue
-        if "Página " in line and " de " in line:
+        if token.kind == LINE_PAGE_NUMBER:
             continue
         # Línea en mayúsculas puede ser categoría
-        upper = line.upper()
-        if line == upper and len(line) > 2:
+        if line == token.upper and len(line) > 2:
             tokens = line.split()
             if len(tokens) == 1:
                 # Rama de un solo nombre
@@ -192,40 +380,34 @@ _KNOWN_ATTR_HEADERS = frozenset({
     "DIÁMETRO", "ESPESOR", "ANCHO", "ALTO", "PTA TORX", "PTA POZI", "PTA PHILLIPS",
 })
 
+_ATTR_HEADER_PARTS = ("NOMINAL", "LARGO", "ENVASE", "ENTRE CARAS", "COD TECFI", "COLOR", "DESCRIPCIÓN", "ESPESOR", "ANCHO", "ALTO", "PTA ")
 
-def _find_header_block(lines: list[str], start: int) -> tuple[int, list[str]]:
+
+def _find_header_block(lines: list[str] | list[CatalogLine], start: int) -> tuple[int, list[str]]:
     """
     En el PDF de Mamut, el encabezado de tabla viene como líneas sueltas:
     CODIGO \\n NOMINAL \\n LARGO \\n ENVASE (o más columnas).
     Retorna (índice siguiente al header, lista de nombres de atributos).
     """
-    if start >= len(lines):
+    tokens = _as_tokens(lines)
+    if start >= len(tokens):
         return start, []
-    if _normalize_line(lines[start]).upper() not in ("CODIGO", "CÓDIGO"):
+    if tokens[start].kind != LINE_CODIGO:
         return start, []
     attr_names = []
     j = start + 1
-    while j < len(lines):
-        cell = _normalize_line(lines[j])
-        if not cell:
+    while j < len(tokens):
+        token = tokens[j]
+        if token.kind == LINE_BLANK or token.kind == LINE_CODIGO:
             j += 1
             continue
-        u2 = cell.upper()
-        if u2 in ("CODIGO", "CÓDIGO"):
-            j += 1
-            continue
-        if _looks_like_sku(cell):
+        if token.kind == LINE_SKU:
             break
-        added = False
-        if u2 in _KNOWN_ATTR_HEADERS:
-            attr_names.append(cell)
-            j += 1
-            added = True
-        elif any(h in u2 for h in ("NOMINAL", "LARGO", "ENVASE", "ENTRE CARAS", "COD TECFI", "COLOR", "DESCRIPCIÓN", "ESPESOR", "ANCHO", "ALTO", "PTA ")):
-            attr_names.append(cell)
+        u2 = token.upper
+        if u2 in _KNOWN_ATTR_HEADERS or any(h in u2 for h in _ATTR_HEADER_PARTS):
+            attr_names.append(token.stripped)
             j += 1
-            added = True
-        if not added:
+        else:
             break
     if not attr_names:
         attr_names = ["NOMINAL", "LARGO", "ENVASE"]
@@ -233,16 +415,18 @@ def _find_header_block(lines: list[str], start: int) -> tuple[int, list[str]]:
 
 
 def parse_product_pages(
-    lines: list[str],
+    lines: list[str] | list[CatalogLine],
 ) -> tuple[dict[str, Any], dict[str, dict[str, Any]]]:
     """
     Parsea páginas de productos. En el PDF Mamut cada celda viene en una línea;
     el encabezado es CODIGO \\n NOMINAL \\n LARGO \\n ENVASE y los datos en grupos de N líneas.
+    Acepta líneas de texto o ya lexeadas (lex_catalog_lines).
 
     Retorna:
     - tree: árbol categoría -> ... -> lista de SKUs (nodos finales).
     - products: { sku: { "category_path": [...], "attributes": [ {"name", "value"}, ... ] } }
     """
+    tokens = _as_tokens(lines)
     tree: dict[str, Any] = {}
     products: dict[str, dict[str, Any]] = {}
 
@@ -252,18 +436,16 @@ def parse_product_pages(
     n_cols = 0
     attr_names: list[str] = []
 
-    while i < len(lines):
-        line = lines[i]
-        stripped = _normalize_line(line)
-        if not stripped:
-            i += 1
-            continue
-        if "Página " in stripped and " de " in stripped:
+    while i < len(tokens):
+        token = tokens[i]
+        stripped = token.stripped
+        kind = token.kind
+        if kind == LINE_BLANK or kind == LINE_PAGE_NUMBER:
             i += 1
             continue
 
         # Sección "FIJACIONES - Tornillos para Metalcon"
-        if " - " in stripped and not stripped.upper().startswith("CODIGO"):
+        if kind == LINE_SECTION:
             parts = stripped.split(" - ", 1)
             if len(parts) == 2:
                 main, sub = parts[0].strip(), parts[1].strip()
@@ -273,24 +455,23 @@ def parse_product_pages(
             continue
 
         # Encabezado de tabla: línea "CODIGO"
-        if stripped.upper() in ("CODIGO", "CÓDIGO"):
-            next_i, attr_names = _find_header_block(lines, i)
+        if kind == LINE_CODIGO:
+            next_i, attr_names = _find_header_block(tokens, i)
             n_cols = 1 + len(attr_names)
             i = next_i
             continue
 
         # Título de subsección (FRAMER, PUNTA FINA, TORNILLO CABEZA LENTEJA, Zincado Brillante, BALDE)
-        if attr_names and _looks_like_sku(stripped):
+        if attr_names and kind == LINE_SKU:
             # Es un SKU: leer esta línea + (n_cols-1) siguientes = una fila
             sku = stripped
             values = []
             for k in range(1, n_cols):
                 idx = i + k
-                if idx < len(lines):
-                    val = _normalize_line(lines[idx])
-                    if val.upper() in ("CODIGO", "CÓDIGO"):
+                if idx < len(tokens):
+                    if tokens[idx].kind == LINE_CODIGO:
                         break
-                    values.append(val)
+                    values.append(tokens[idx].stripped)
                 else:
                     values.append("")
             # Avanzar hasta después de la fila
@@ -322,15 +503,15 @@ def parse_product_pages(
             continue
 
         # Subheader (Zincado Brillante, Fosfatizado, BALDE, etc.) antes de filas
-        if not _looks_like_sku(stripped) and stripped.upper() not in ("CODIGO", "CÓDIGO", "NOMINAL", "LARGO", "ENVASE"):
+        if kind != LINE_SKU and token.upper not in ("NOMINAL", "LARGO", "ENVASE"):
             if len(stripped) < 60 and "Página" not in stripped:
                 current_subheader = stripped
             i += 1
             continue
 
         # Título de subsección que empuja path (ej. FRAMER, PUNTA FINA, TORNILLO CABEZA LENTEJA)
-        if current_path and not _looks_like_sku(stripped) and " - " not in stripped:
-            if len(stripped) < 70 and stripped.upper() not in ("CODIGO", "NOMINAL", "LARGO", "ENVASE"):
+        if current_path and kind != LINE_SKU and " - " not in stripped:
+            if len(stripped) < 70 and token.upper not in ("CODIGO", "NOMINAL", "LARGO", "ENVASE"):
                 new_path = current_path + [stripped]
                 if len(new_path) <= 5:
                     current_path = new_path
@@ -352,11 +533,59 @@ def _tree_without_skus_key(node: dict) -> dict:
     return out
 
 
+def _get_spatial_parser():
+    """Import perezoso del back-end espacial (igual que LLMWhisper: src. o import directo)."""
+    try:
+        from src.catalogo_spatial_parser import parse_spatial_lines
+    except ImportError:
+        from catalogo_spatial_parser import parse_spatial_lines
+    return parse_spatial_lines
+
+
+def _parse_cells(tokens: list[CatalogLine]) -> tuple[dict[str, Any], dict[str, dict[str, Any]]]:
+    """Back-end de celda por línea."""
+    tree, products = parse_product_pages(tokens)
+    return _tree_without_skus_key(tree), products
+
+
+def _parse_spatial(tokens: list[CatalogLine]) -> tuple[dict[str, Any], dict[str, dict[str, Any]]]:
+    """Back-end de tablas lado a lado; el gap central sale de lo ya lexeado."""
+    gap_positions = [t.second_codigo for t in tokens if t.second_codigo > 0]
+    return _get_spatial_parser()([t.raw for t in tokens], gap_positions)
+
+
+# Back-ends por layout: reciben las líneas lexeadas y devuelven (structure, products)
+PARSER_BACKENDS = {
+    LAYOUT_CELLS: _parse_cells,
+    LAYOUT_SPATIAL: _parse_spatial,
+}
+
+
+def parse_catalog_text(text: str, layout: str = LAYOUT_AUTO) -> dict[str, Any]:
+    """
+    Parsea el texto del catálogo con un único lexeo.
+
+    - Las líneas se clasifican una sola vez (lex_catalog_lines) y ese resultado alimenta
+      tanto la detección de layout como el back-end elegido.
+    - layout: LAYOUT_AUTO (detectar), LAYOUT_CELLS o LAYOUT_SPATIAL (ver PARSER_BACKENDS).
+
+    Retorna {"layout": ..., "structure": ..., "products": ...}.
+    """
+    tokens = lex_catalog_lines(text.splitlines())
+    if layout == LAYOUT_AUTO:
+        layout = detect_layout(tokens)
+    if layout not in PARSER_BACKENDS:
+        raise ValueError(f"Layout desconocido: {layout} (opciones: {', '.join(PARSER_BACKENDS)})")
+    structure, products = PARSER_BACKENDS[layout](tokens)
+    return {"layout": layout, "structure": structure, "products": products}
+
+
 def extract_catalogo(
     pdf_path: str,
     txt_path: str | Path | None = None,
     use_llmwhisper: bool = True,
     force_extract: bool = False,
+    layout: str = LAYOUT_AUTO,
 ) -> dict[str, Any]:
     """
     Extrae del PDF (o del .txt ya generado) la estructura del catálogo y los productos con atributos.
@@ -369,6 +598,7 @@ def extract_catalogo(
     - txt_path: dónde guardar/leer el .txt (por defecto mismo que el PDF con .txt).
     - use_llmwhisper: si True, usar LLMWhisper cuando haga falta; si False, usar PyMuPDF.
     - force_extract: si True, reextraer con LLMWhisper y sobrescribir el .txt.
+    - layout: back-end de parseo; por defecto se detecta (ver parse_catalog_text).
 
     Retorna un diccionario con:
     - "catalog_name": nombre del catálogo
@@ -381,14 +611,12 @@ def extract_catalogo(
         txt_path=txt_path,
         use_llmwhisper=use_llmwhisper,
         force_extract=force_extract,
+        # El back-end de celdas necesita texto plano de PyMuPDF; auto y espacial, columnas
+        layout=layout != LAYOUT_CELLS,
     )
-    all_lines = text.splitlines()
-
-    # Índice: primeras páginas (hasta que aparezca "CODIGO" en una línea de tabla)
-    index_tree = parse_index_pages(all_lines)
-
-    # Productos: todas las líneas
-    structure_tree, products = parse_product_pages(all_lines)
+    # Un solo lexeo; el back-end (celdas o espacial) se elige según el layout
+    parsed = parse_catalog_text(text, layout=layout)
+    products = parsed["products"]
 
     # Formato WooCommerce: hasta 6 atributos (Nombre del atributo 1, Valor(es) del atributo 1, ...)
     attributes_woocommerce = {}
@@ -408,7 +636,8 @@ def extract_catalogo(
 
     return {
         "catalog_name": Path(pdf_path).stem,
-        "structure": _tree_without_skus_key(structure_tree),
+        "layout": parsed["layout"],
+        "structure": parsed["structure"],
         "products": products,
         "attributes_woocommerce": attributes_woocommerce,
     }
@@ -436,13 +665,14 @@ if __name__ == "__main__":
     out = pos[1] if len(pos) > 1 else "data/catalogo_mamut_2025_extracted.json"
     force_extract = "--force-extract" in args
     use_llmwhisper = "--no-llmwhisper" not in args
+    layout = next((a.split("=", 1)[1] for a in args if a.startswith("--layout=")), LAYOUT_AUTO)
 
     print(f"Extrayendo de {pdf} ...")
     if force_extract:
         print("(Forzando reextracción con LLMWhisper y sobrescribiendo .txt)")
     if not use_llmwhisper:
         print("(Usando PyMuPDF, no LLMWhisper)")
-    data = extract_catalogo(pdf, use_llmwhisper=use_llmwhisper, force_extract=force_extract)
+    data = extract_catalogo(pdf, use_llmwhisper=use_llmwhisper, force_extract=force_extract, layout=layout)
     save_catalogo_json(data, out)
     n_products = len(data.get("products", {}))
-    print(f"Guardado en {out}. Productos: {n_products}.")
+    print(f"Guardado en {out}. Productos: {n_products} (layout: {data['layout']}).")
@@ -11,8 +11,42 @@ El texto tiene DOS tablas lado a lado. Cada tabla tiene:
 La separación entre tablas izquierda/derecha es aproximadamente en la posición 52-56.
 """
 
+import hashlib
+import logging
+import os
+import pickle
 import re
-from typing import Any
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from itertools import chain, islice
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Subir si cambia el formato de la caché por página (además, cualquier
+# cambio en este archivo invalida la caché, ver _parser_fingerprint)
+SPATIAL_CACHE_VERSION = 1
+
+# Relativo a la raíz del repositorio, no al directorio de trabajo
+DEFAULT_PAGE_CACHE = str(Path(__file__).resolve().parents[1] / 'data' / 'cache' / 'spatial' / 'pages.pkl')
+
+# Líneas que el parser en streaming lee por adelantado para estimar el gap
+# central (en vez de recorrer todo el texto antes de empezar)
+GAP_LOOKAHEAD_LINES = 5000
+
+# Columna donde empieza la tabla derecha cuando no hay encabezado doble
+DEFAULT_GAP_END_POS = 56
+
+# Gutter central por página: se busca a ±GUTTER_WINDOW columnas del gap
+# estimado; una columna es "libre" si a lo sumo esta fracción de las líneas
+# que llegan hasta ella tiene texto ahí
+GUTTER_WINDOW = 15
+GUTTER_MAX_OCCUPANCY = 0.05
+GUTTER_MIN_WIDTH = 2
 
 # Logos/marcas que aparecen en el PDF pero NO son parte del texto del catálogo
 LOGO_BLACKLIST = frozenset({
@@ -35,6 +69,54 @@ SKU_BLACKLIST = frozenset({
     "T10", "T15", "T20", "T25", "T30", "T40", "T50", "T55", "T60",
 })
 
+# Palabras clave del encabezado de tabla
+HEADER_KEYWORDS = ("CODIGO", "CÓDIGO", "NOMINAL", "LARGO", "ENVASE", "ENTRE CARAS", "PTA TORX", "COD TECFI")
+
+# Acabados: la línea (en minúsculas) empieza con alguno
+FINISH_PREFIXES = (
+    "zincado", "fosfatizado", "ruspert", "dacromet", "iridiscente",
+    "balde", "envase pequeño", "acero inoxidable", "inox",
+    "acabado especial", "revestimiento", "bronce", "pavonado",
+)
+
+# Títulos típicos de producto
+TITLE_KEYWORDS = frozenset({
+    "TORNILLO", "PERNO", "TUERCA", "GOLILLA", "AUTOPERFORANTE",
+    "REMACHE", "ANCLAJE", "TARUGO", "CLAVO", "BROCA", "DISCO",
+    "CADENA", "CABLE", "FRAMER", "CONECTOR",
+})
+
+# Subtipos típicos
+SUBTYPE_KEYWORDS = frozenset({
+    "ROSCA", "PUNTA", "CABEZA", "C/GOLILLA", "SIN GOLILLA",
+    "HEXAGONAL", "PHILLIPS", "CONTINUACIÓN", "CONTINUACION",
+    "INOX", "PARA", "DOS CAPAS", "DENSIDAD", "MADERA", "METAL",
+})
+
+# Palabras que indican título incompleto
+INCOMPLETE_TITLE_ENDINGS = frozenset({"PARA", "DE", "CON", "EN", "A", "Y"})
+
+# Palabras que típicamente continúan títulos
+TITLE_CONTINUATIONS = frozenset({
+    "TERRAZAS", "DECK", "MADERA", "METALCON", "VOLCANITA",
+    "FACHADAS", "MOLDURAS", "AGLOMERADA", "DRYWALL",
+})
+
+
+def _keyword_regex(keywords) -> re.Pattern:
+    """Una sola alternancia para buscar cualquiera de las palabras (como subcadena)."""
+    return re.compile("|".join(re.escape(kw) for kw in sorted(keywords, key=len, reverse=True)))
+
+
+_TITLE_RE = _keyword_regex(TITLE_KEYWORDS)
+_SUBTYPE_RE = _keyword_regex(SUBTYPE_KEYWORDS)
+_DIGIT_RE = re.compile(r"\d")
+_LETTER_RE = re.compile(r"[A-Z]")
+_SKU_SHAPE_RE = re.compile(r"^[A-Z0-9][A-Z0-9\-\.\[\]\/]*$")
+_OCR_O_DIGIT_RE = re.compile(r'O([0-9])')
+_GAP_RE = re.compile(r' {4,}')
+_MULTISPACE_RE = re.compile(r"\s{2,}")
+
 
 def fix_ocr_errors(sku: str) -> str:
     """
@@ -49,7 +131,7 @@ def fix_ocr_errors(sku: str) -> str:
         return sku
     # Reemplazar O seguido de dígito por 0 seguido de dígito
     # Ejemplo: NO4 -> N04, O1ABC -> 01ABC
-    corrected = re.sub(r'O([0-9])', r'0\1', sku)
+    corrected = _OCR_O_DIGIT_RE.sub(r'0\1', sku)
     return corrected
 
 
@@ -63,16 +145,16 @@ def looks_like_sku(token: str) -> bool:
     if t in SKU_BLACKLIST:
         return False
     # Debe contener al menos un dígito
-    if not re.search(r"\d", t):
+    if not _DIGIT_RE.search(t):
         return False
     # No debe ser solo números
     if t.isdigit():
         return False
     # Patrón típico de SKU: comienza con letra o número, tiene letras y números
-    if not re.match(r"^[A-Z0-9][A-Z0-9\-\.\[\]\/]*$", t):
+    if not _SKU_SHAPE_RE.match(t):
         return False
     # Debe tener al menos una letra
-    if not re.search(r"[A-Z]", t):
+    if not _LETTER_RE.search(t):
         return False
     return True
 
@@ -90,18 +172,16 @@ def clean_logo_text(text: str) -> str:
     return " ".join(cleaned)
 
 
-def split_line_halves(line: str, gap_end_pos: int = 56) -> tuple[str, str]:
+def split_line_halves(line: str, gap_end_pos: int = DEFAULT_GAP_END_POS) -> tuple[str, str]:
     """
     Divide una línea en mitad izquierda y derecha.
     Usa gap_end_pos como referencia para la posición donde termina la tabla izquierda.
     """
-    import re
-    
     if len(line) <= gap_end_pos:
         return line.rstrip(), ""
     
     # Buscar el gap que termina cerca de gap_end_pos (tolerancia de ±10 caracteres)
-    gaps = list(re.finditer(r' {4,}', line))
+    gaps = _GAP_RE.finditer(line)
     
     # Buscar un gap cuyo final esté cerca de gap_end_pos
     best_gap = None
@@ -277,7 +357,7 @@ def parse_table_row(line: str, column_positions: list[tuple[int, int, str]] | No
         return None
     
     # Dividir por espacios múltiples
-    parts = re.split(r"\s{2,}", stripped)
+    parts = _MULTISPACE_RE.split(stripped)
     parts = [p.strip() for p in parts if p.strip()]
     
     if not parts:
@@ -293,11 +373,10 @@ def detect_column_positions(header_line: str) -> list[tuple[int, int, str]]:
     Ahora detecta TODAS las ocurrencias de cada columna (para headers con dos tablas).
     """
     # Buscar palabras clave y TODAS sus posiciones
-    keywords = ["CODIGO", "CÓDIGO", "NOMINAL", "LARGO", "ENVASE", "ENTRE CARAS", "PTA TORX", "COD TECFI"]
     upper = header_line.upper()
     
     positions = []
-    for kw in keywords:
+    for kw in HEADER_KEYWORDS:
         kw_upper = kw.upper()
         # Buscar todas las ocurrencias
         idx = 0
@@ -331,13 +410,7 @@ def is_header_line(line: str) -> bool:
 
 def is_finish_line(line: str) -> bool:
     """Detecta línea de acabado."""
-    stripped = line.strip().lower()
-    finishes = [
-        "zincado", "fosfatizado", "ruspert", "dacromet", "iridiscente",
-        "balde", "envase pequeño", "acero inoxidable", "inox",
-        "acabado especial", "revestimiento", "bronce", "pavonado",
-    ]
-    return any(stripped.startswith(f) for f in finishes)
+    return line.strip().lower().startswith(FINISH_PREFIXES)
 
 
 def is_title_line(line: str) -> bool:
@@ -349,15 +422,11 @@ def is_title_line(line: str) -> bool:
         return False
     if is_finish_line(line):
         return False
-    # Títulos típicos
-    keywords = ["TORNILLO", "PERNO", "TUERCA", "GOLILLA", "AUTOPERFORANTE", 
-                "REMACHE", "ANCLAJE", "TARUGO", "CLAVO", "BROCA", "DISCO",
-                "CADENA", "CABLE", "FRAMER", "CONECTOR"]
     upper = stripped.upper()
     # Ignorar líneas que son solo logos
     if upper in LOGO_BLACKLIST:
         return False
-    return any(kw in upper for kw in keywords)
+    return _TITLE_RE.search(upper) is not None
 
 
 def is_subtype_line(line: str) -> bool:
@@ -367,12 +436,7 @@ def is_subtype_line(line: str) -> bool:
         return False
     if is_header_line(line) or is_finish_line(line):
         return False
-    # Subtipos típicos
-    keywords = ["ROSCA", "PUNTA", "CABEZA", "C/GOLILLA", "SIN GOLILLA", 
-                "HEXAGONAL", "PHILLIPS", "CONTINUACIÓN", "CONTINUACION",
-                "INOX", "PARA", "DOS CAPAS", "DENSIDAD", "MADERA", "METAL"]
-    upper = stripped.upper()
-    return any(kw in upper for kw in keywords) and len(stripped) < 80
+    return _SUBTYPE_RE.search(stripped.upper()) is not None and len(stripped) < 80
 
 
 def is_incomplete_title(title: str) -> bool:
@@ -385,9 +449,7 @@ def is_incomplete_title(title: str) -> bool:
     words = title.strip().upper().split()
     if not words:
         return False
-    # Palabras que indican título incompleto
-    incomplete_endings = ["PARA", "DE", "CON", "EN", "A", "Y"]
-    return words[-1] in incomplete_endings
+    return words[-1] in INCOMPLETE_TITLE_ENDINGS
 
 
 def is_title_continuation(text: str) -> bool:
@@ -402,15 +464,12 @@ def is_title_continuation(text: str) -> bool:
     # No puede ser un header, acabado, o tener dígitos (sería datos)
     if is_header_line(text) or is_finish_line(text):
         return False
-    if re.search(r'\d', stripped):
+    if _DIGIT_RE.search(stripped):
         return False
     # No puede ser un logo
     if upper in LOGO_BLACKLIST:
         return False
-    # Palabras que típicamente continúan títulos
-    continuations = ["TERRAZAS", "DECK", "MADERA", "METALCON", "VOLCANITA",
-                     "FACHADAS", "MOLDURAS", "AGLOMERADA", "DRYWALL"]
-    return upper in continuations or (len(stripped) > 3 and stripped.isupper())
+    return upper in TITLE_CONTINUATIONS or (len(stripped) > 3 and stripped.isupper())
 
 
 def is_subtype_text(text: str) -> bool:
@@ -418,12 +477,61 @@ def is_subtype_text(text: str) -> bool:
     stripped = text.strip()
     if not stripped or len(stripped) < 3 or len(stripped) > 40:
         return False
-    # Subtipos típicos
-    keywords = ["ROSCA", "PUNTA", "CABEZA", "C/GOLILLA", "SIN GOLILLA", 
-                "HEXAGONAL", "PHILLIPS", "CONTINUACIÓN", "CONTINUACION",
-                "INOX", "PARA", "DOS CAPAS", "DENSIDAD", "MADERA", "METAL"]
+    return _SUBTYPE_RE.search(stripped.upper()) is not None
+
+
+# Tipos de línea (mitad izquierda o derecha) según classify_half
+LINE_HEADER = "header"
+LINE_FINISH = "finish"
+LINE_TITLE = "title"
+LINE_CONTINUATION = "continuation"
+LINE_SUBTYPE = "subtype"
+LINE_DATA = "data"
+
+
+def classify_half(part: str, pending_title: str = "") -> str:
+    """
+    Clasifica una mitad de línea en una sola pasada.
+    
+    Equivale a evaluar en orden is_header_line, is_finish_line,
+    is_title_line, continuación de título pendiente e is_subtype_text
+    (título y subtipo solo si la primera palabra no parece SKU), pero
+    normalizando el texto una sola vez.
+    
+    Returns:
+        LINE_HEADER, LINE_FINISH, LINE_TITLE, LINE_CONTINUATION,
+        LINE_SUBTYPE o LINE_DATA
+    """
+    stripped = part.strip()
     upper = stripped.upper()
-    return any(kw in upper for kw in keywords)
+    
+    if "CODIGO" in upper and ("NOMINAL" in upper or "LARGO" in upper):
+        return LINE_HEADER
+    if stripped.lower().startswith(FINISH_PREFIXES):
+        return LINE_FINISH
+    
+    length = len(stripped)
+    first_is_sku = None
+    
+    if length >= 5 and upper not in LOGO_BLACKLIST and _TITLE_RE.search(upper):
+        words = stripped.split()
+        first_is_sku = looks_like_sku(words[0] if words else "")
+        if not first_is_sku:
+            return LINE_TITLE
+    
+    if (pending_title and 3 <= length <= 30 and is_incomplete_title(pending_title)
+            and not _DIGIT_RE.search(stripped) and upper not in LOGO_BLACKLIST
+            and (upper in TITLE_CONTINUATIONS or (length > 3 and stripped.isupper()))):
+        return LINE_CONTINUATION
+    
+    if 3 <= length <= 40 and _SUBTYPE_RE.search(upper):
+        if first_is_sku is None:
+            words = stripped.split()
+            first_is_sku = looks_like_sku(words[0] if words else "")
+        if not first_is_sku:
+            return LINE_SUBTYPE
+    
+    return LINE_DATA
 
 
 def parse_half(
@@ -519,35 +627,214 @@ def parse_half(
     return products, current_product_type, current_finish
 
 
-def parse_spatial_catalog(text: str) -> tuple[dict[str, Any], dict[str, dict]]:
+# Secciones principales (página índice del catálogo) que pueden aparecer
+# solas después de un cambio de página
+KNOWN_MAIN_SECTIONS = (
+    "TORNILLOS PARA VOLCANITA",
+    "TORNILLOS PARA METALCON", 
+    "TORNILLOS PARA FIBROCEMENTO",
+    "TORNILLOS PARA DECK",
+    "TORNILLOS PARA VENTANAS DE PVC",
+    "TORNILLOS PARA MADERA",
+    "TORNILLOS PARA MADERAS",
+    "TORNILLOS WINGER",
+    "TORNILLOS PARA FACHADAS",
+    "TORNILLOS AUTOPERFORANTES",
+    "ROSCALATAS Y ATERRAJADORES",
+    "PUNTAS E INSERTOS",
+    "PUNTAS, INSERTOS Y DADOS",
+    "PERNOS HEXAGONALES",
+    "PRODUCTOS PARA TECHO",
+    "ANCLAJES",
+    "TARUGOS",
+    "CLAVOS",
+    "CABLES, CADENAS Y ACCESORIOS",
+    "BROCAS, DISCOS Y SOLDADURAS",
+    "HERRAMIENTAS",
+    "CONECTORES PARA MADERA",
+    "PERNOS MÁQUINA",
+    "COMPLEMENTOS DE LINEA",
+)
+
+
+@dataclass
+class ColumnState:
+    """Estado arrastrado de una de las dos tablas (izquierda o derecha)."""
+    product_type: str = ""
+    subtype: str = ""
+    finish: str = ""
+    last_nominal: str = ""
+    # Para acumular títulos de múltiples líneas
+    pending_title: str = ""
+    # Solo en pre-escaneo: filas de datos sin parsear desde el último reset
+    # de NOMINAL (se parsean al tomar una instantánea, ver resolve_nominal)
+    unparsed_rows: list[str] = field(default_factory=list)
+    
+    def reset_titles(self) -> None:
+        self.product_type = ""
+        self.subtype = ""
+        self.pending_title = ""
+    
+    def reset_nominal(self) -> None:
+        self.last_nominal = ""
+        self.unparsed_rows.clear()
+    
+    def resolve_nominal(self) -> None:
+        """Calcula last_nominal a partir de las filas pendientes (de atrás hacia adelante)."""
+        for part in reversed(self.unparsed_rows):
+            row = parse_table_row(part)
+            if row and row.get("CODIGO"):
+                nominal = row.get("NOMINAL", "").strip()
+                if nominal:
+                    self.last_nominal = nominal
+                    break
+        self.unparsed_rows.clear()
+    
+    def copy(self) -> "ColumnState":
+        return replace(self, unparsed_rows=list(self.unparsed_rows))
+
+
+@dataclass
+class SpatialState:
     """
-    Parsea el catálogo con dos columnas lado a lado.
-    Procesa línea por línea dividiendo en el gap central.
+    Estado que el parser arrastra de una línea a la siguiente.
+    Es todo lo que una página necesita saber de las anteriores.
     """
-    lines = text.splitlines()
+    category: str = "FIJACIONES"
+    subcategory: str = "Tornillos para Volcanita"
+    left: ColumnState = field(default_factory=ColumnState)
+    right: ColumnState = field(default_factory=ColumnState)
+    # Para detectar si acabamos de pasar un cambio de página
+    after_page_break: bool = False
     
-    structure: dict[str, Any] = {}
-    products: dict[str, dict] = {}
-    
-    # Estado actual - separado para izquierda y derecha
-    current_category = "FIJACIONES"
-    current_subcategory = "Tornillos para Volcanita"
-    # Tipo de producto separado para cada columna
-    product_type_left = ""
-    product_type_right = ""
-    subtype_left = ""
-    subtype_right = ""
-    finish_left = ""
-    finish_right = ""
-    last_nominal_left = ""
-    last_nominal_right = ""
+    def copy(self) -> "SpatialState":
+        return replace(self, left=self.left.copy(), right=self.right.copy())
+
+
+@dataclass(slots=True)
+class ProductRecord:
+    """Producto compacto: ruta y atributos como tuplas (compartidas vía SpatialCatalog)."""
+    category_path: tuple[str, ...]
+    # (nombre, valor) en el orden en que se serializan
+    attributes: tuple[tuple[str, str], ...]
     
-    # Para acumular títulos de múltiples líneas
-    pending_title_left = ""
-    pending_title_right = ""
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "category_path": list(self.category_path),
+            "attributes": [{"name": name, "value": value} for name, value in self.attributes],
+        }
+
+
+@dataclass(slots=True)
+class CategoryNode:
+    """Nodo del árbol de categorías."""
+    children: dict[str, "CategoryNode"] = field(default_factory=dict)
+    # Conjunto ordenado de SKUs (dict con valores None): pertenencia O(1)
+    skus: dict[str, None] | None = None
+    # Hijos que existían al llegar el primer SKU: ubica la clave "skus"
+    # entre las subcategorías al serializar
+    skus_index: int = 0
+    
+    def child(self, name: str) -> "CategoryNode":
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = CategoryNode()
+        return node
+    
+    def add_skus(self, skus: Iterable[str]) -> None:
+        if self.skus is None:
+            self.skus = {}
+            self.skus_index = len(self.children)
+        self.skus.update(dict.fromkeys(skus))
+    
+    def merge(self, other: "CategoryNode") -> None:
+        """Une `other` respetando el orden de aparición de claves y SKUs."""
+        for i, (name, node) in enumerate(other.children.items()):
+            if other.skus is not None and i == other.skus_index:
+                self.add_skus(other.skus)
+            self.child(name).merge(node)
+        if other.skus is not None and other.skus_index >= len(other.children):
+            self.add_skus(other.skus)
+    
+    def to_json(self) -> dict[str, Any]:
+        result: dict[str, Any] = {}
+        for i, (name, node) in enumerate(self.children.items()):
+            if self.skus is not None and i == self.skus_index:
+                result["skus"] = list(self.skus)
+            result[name] = node.to_json()
+        if self.skus is not None and self.skus_index >= len(self.children):
+            result["skus"] = list(self.skus)
+        return result
+
+
+@dataclass(slots=True)
+class SpatialCatalog:
+    """
+    Resultado compacto del parser.
+    - products: SKU -> ProductRecord (gana la primera aparición)
+    - root: árbol de categorías (None en streaming)
+    - Textos y rutas internados: cada nombre de atributo, valor repetido y
+      ruta de categoría se guarda una sola vez
+    - La forma JSON (dicts y listas) se arma solo al final con to_json()
+    """
+    products: dict[str, ProductRecord] = field(default_factory=dict)
+    root: CategoryNode | None = field(default_factory=CategoryNode)
+    _strings: dict[str, str] = field(default_factory=dict)
+    _paths: dict[tuple[str, ...], tuple[str, ...]] = field(default_factory=dict)
+    
+    def _intern(self, text: str) -> str:
+        return self._strings.setdefault(text, text)
+    
+    def _path(self, path: tuple[str, ...]) -> tuple[str, ...]:
+        interned = self._paths.get(path)
+        if interned is None:
+            interned = self._paths[path] = tuple(self._intern(p) for p in path)
+        return interned
     
-    # Posición del gap central (donde empieza la tabla derecha)
-    # Detectar desde headers con doble CODIGO
+    def add(self, sku: str, category_path: tuple[str, ...], attributes: Iterable[tuple[str, str]]) -> None:
+        """Registra una aparición de `sku` bajo `category_path`."""
+        if sku not in self.products:
+            self.products[sku] = ProductRecord(
+                self._path(category_path),
+                tuple((self._intern(name), self._intern(value)) for name, value in attributes),
+            )
+        if self.root is not None:
+            node = self.root
+            for name in category_path:
+                node = node.child(name)
+            node.add_skus((sku,))
+    
+    def merge(self, other: "SpatialCatalog") -> None:
+        """Agrega `other` a continuación (mismo resultado que parsear seguido)."""
+        for sku, record in other.products.items():
+            if sku not in self.products:
+                self.products[sku] = record
+        if self.root is not None and other.root is not None:
+            self.root.merge(other.root)
+    
+    def to_json(self) -> tuple[dict[str, Any], dict[str, dict]]:
+        """Forma original: (structure, products) con dicts y listas."""
+        structure = self.root.to_json() if self.root is not None else {}
+        products = {sku: record.to_json() for sku, record in self.products.items()}
+        return structure, products
+
+
+def table_gap_from_positions(gap_end_positions: list[int]) -> tuple[int, bool]:
+    """
+    Gap central a partir de las columnas del segundo CODIGO de cada header doble.
+    Retorna (gap_end_pos, has_two_tables); sin headers dobles usa DEFAULT_GAP_END_POS.
+    """
+    if not gap_end_positions:
+        return DEFAULT_GAP_END_POS, False
+    return int(sum(gap_end_positions) / len(gap_end_positions)), True
+
+
+def _detect_table_gap(lines: list[str]) -> tuple[int, bool]:
+    """
+    Posición del gap central (donde empieza la tabla derecha).
+    Se detecta desde headers con doble CODIGO.
+    Retorna (gap_end_pos, has_two_tables).
+    """
     gap_end_positions = []
     for line in lines:
         upper = line.upper()
@@ -557,220 +844,520 @@ def parse_spatial_catalog(text: str) -> tuple[dict[str, Any], dict[str, dict]]:
             if second > 0:
                 gap_end_positions.append(second)
     
-    gap_end_pos = int(sum(gap_end_positions) / len(gap_end_positions)) if gap_end_positions else 56
-    has_two_tables = len(gap_end_positions) > 0
+    return table_gap_from_positions(gap_end_positions)
+
+
+@dataclass(slots=True)
+class PageLayout:
+    """
+    Columnas de una página.
+    - gutter_start/gutter_end: columnas [inicio, fin) del espacio central,
+      libres en casi todas las líneas de la página (-1 si no se detectó)
+    - gap_end_pos: gap estimado para todo el texto (respaldo por línea)
+    - double_section: la sección en curso tiene encabezado doble (dos tablas);
+      bajo un encabezado simple (tabla + notas a la derecha) no se usa el
+      gutter aunque la página lo tenga
+    """
+    gap_end_pos: int = DEFAULT_GAP_END_POS
+    gutter_start: int = -1
+    gutter_end: int = -1
+    double_section: bool = True
+    
+    def start_section(self, header_line: str) -> None:
+        """Registra un encabezado de tabla: define si lo que sigue son dos tablas."""
+        self.double_section = _is_double_header(header_line)
     
-    # Variable para detectar si acabamos de pasar un cambio de página
-    after_page_break = False
+    def split(self, line: str) -> tuple[str, str]:
+        """Divide en mitad izquierda y derecha cortando en el gutter de la página."""
+        start = self.gutter_start
+        if start >= 0 and self.double_section:
+            if len(line) <= start:
+                return line.rstrip(), ""
+            if not line[start:self.gutter_end].strip(" "):
+                return line[:start].rstrip(), line[self.gutter_end:].strip()
+        # Línea que invade el gutter (o página sin gutter): búsqueda por línea
+        return split_line_halves(line, self.gap_end_pos)
+
+
+def detect_page_layout(lines: list[str], gap_end_pos: int) -> PageLayout:
+    """
+    Detecta el gutter central de una página con un perfil de ocupación.
+    
+    Arma una matriz de caracteres (líneas rellenadas con espacios) limitada a
+    la ventana gap_end_pos ± GUTTER_WINDOW, cuenta por columna cuántas líneas
+    tienen texto y elige el tramo libre más ancho (empate: el que termina más
+    cerca de gap_end_pos). Solo hay gutter si alguna línea de la página es un
+    encabezado doble cortado limpiamente por él.
+    """
+    layout = PageLayout(gap_end_pos)
+    lo = max(0, gap_end_pos - GUTTER_WINDOW)
+    hi = gap_end_pos + GUTTER_WINDOW
+    lengths = np.fromiter((len(line.rstrip()) for line in lines), dtype=np.int64, count=len(lines))
+    if not len(lines) or lengths.max() <= lo:
+        return layout
     
+    chars = np.array([line[:hi].ljust(hi) for line in lines], dtype=f"<U{hi}")
+    occupied = chars.view(np.uint32).reshape(len(lines), hi)[:, lo:] != ord(" ")
+    columns = np.arange(lo, hi)
+    reach = (lengths[:, None] > columns[None, :]).sum(axis=0)
+    limit = (reach * GUTTER_MAX_OCCUPANCY).astype(np.int64)
+    free = occupied.sum(axis=0) <= limit
+    
+    # Tramos de columnas libres: [inicio, fin)
+    edges = np.diff(np.concatenate(([0], free.astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1) + lo
+    run_ends = np.flatnonzero(edges == -1) + lo
+    best = None
+    for start, end in zip(run_starts.tolist(), run_ends.tolist()):
+        key = (end - start, -abs(end - gap_end_pos), -start)
+        if end - start >= GUTTER_MIN_WIDTH and (best is None or key > best[0]):
+            best = (key, start, end)
+    
+    if best is None:
+        return layout
+    
+    # Solo se confía en el gutter si separa dos tablas: alguna línea tiene
+    # encabezado a ambos lados (si no, a la derecha hay notas, no una tabla)
+    _, start, end = best
     for line in lines:
-        # Saltar marcadores de página
-        if "Página" in line and " de " in line:
-            continue
-        if line.strip() == "<<<" or line.strip().startswith("<<<"):
-            after_page_break = True
-            continue
-        
-        # Detectar cambio de sección (FIJACIONES - Tornillos para Volcanita)
-        # Excluir líneas con "Continuación" que son continuación de tipos de producto
-        if " - " in line and "CODIGO" not in line.upper() and "CONTINUACI" not in line.upper():
-            stripped = line.strip()
-            # Verificar que parece una sección real (empieza con categoría conocida)
-            if stripped.upper().startswith(("FIJACIONES", "ANCLAJES", "HERRAMIENTAS", "CADENAS")):
-                parts = stripped.split(" - ", 1)
-                if len(parts) == 2:
-                    current_category = parts[0].strip()
-                    current_subcategory = parts[1].strip()
-                    product_type_left = ""
-                    product_type_right = ""
-                    subtype_left = ""
-                    subtype_right = ""
-                    pending_title_left = ""
-                    pending_title_right = ""
-                    after_page_break = False
-                    continue
-        
-        # Detectar recordatorio de subcategoría o nueva sección principal después de cambio de página
-        # Ej: "TORNILLOS PARA MADERA" sola después de "<<<"
-        stripped = line.strip()
-        if stripped and after_page_break:
-            # Normalizar para comparación
-            stripped_upper = " ".join(stripped.upper().split())  # Normalizar espacios
-            
-            # Lista de secciones principales que pueden aparecer después de page breaks
-            # Estas son secciones de la página índice del catálogo
-            KNOWN_MAIN_SECTIONS = [
-                "TORNILLOS PARA VOLCANITA",
-                "TORNILLOS PARA METALCON", 
-                "TORNILLOS PARA FIBROCEMENTO",
-                "TORNILLOS PARA DECK",
-                "TORNILLOS PARA VENTANAS DE PVC",
-                "TORNILLOS PARA MADERA",
-                "TORNILLOS PARA MADERAS",
-                "TORNILLOS WINGER",
-                "TORNILLOS PARA FACHADAS",
-                "TORNILLOS AUTOPERFORANTES",
-                "ROSCALATAS Y ATERRAJADORES",
-                "PUNTAS E INSERTOS",
-                "PUNTAS, INSERTOS Y DADOS",
-                "PERNOS HEXAGONALES",
-                "PRODUCTOS PARA TECHO",
-                "ANCLAJES",
-                "TARUGOS",
-                "CLAVOS",
-                "CABLES, CADENAS Y ACCESORIOS",
-                "BROCAS, DISCOS Y SOLDADURAS",
-                "HERRAMIENTAS",
-                "CONECTORES PARA MADERA",
-                "PERNOS MÁQUINA",
-                "COMPLEMENTOS DE LINEA",
-            ]
-            
-            # Verificar si es una sección principal conocida
-            for section in KNOWN_MAIN_SECTIONS:
-                if section in stripped_upper or stripped_upper in section:
-                    # Actualizar subcategoría a esta sección
-                    current_subcategory = stripped.strip()
-                    product_type_left = ""
-                    product_type_right = ""
-                    subtype_left = ""
-                    subtype_right = ""
-                    pending_title_left = ""
-                    pending_title_right = ""
-                    after_page_break = False
-                    break
+        if _is_double_header(line) and not line[start:end].strip(" "):
+            if is_header_line(line[:start]) and is_header_line(line[end:]):
+                layout.gutter_start, layout.gutter_end = start, end
+                break
+    
+    # Filas al comienzo de la página: siguen la sección del primer encabezado
+    first_header = next((line for line in lines if is_header_line(line)), None)
+    if first_header is not None:
+        layout.start_section(first_header)
+    return layout
+
+
+def _is_double_header(line: str) -> bool:
+    """Encabezado de dos tablas lado a lado (dos columnas CODIGO)."""
+    return line.upper().count("CODIGO") >= 2
+
+
+def _iter_pages(lines: Iterable[str]) -> Iterator[list[str]]:
+    """Agrupa líneas por página (cada marcador "<<<" abre una nueva)."""
+    page: list[str] = []
+    for line in lines:
+        if page and _is_page_marker(line):
+            yield page
+            page = []
+        page.append(line)
+    if page:
+        yield page
+
+
+def _is_page_marker(line: str) -> bool:
+    """Marcador de cambio de página (<<<), tal como lo trata el parser."""
+    if "Página" in line and " de " in line:
+        return False
+    return line.strip().startswith("<<<")
+
+
+def _process_half(
+    part: str,
+    column: ColumnState,
+    state: SpatialState,
+    catalog: SpatialCatalog | None,
+) -> None:
+    """Procesa una mitad de línea de forma INDEPENDIENTE de la otra."""
+    stripped = part.strip()
+    kind = classify_half(part, column.pending_title)
+    
+    # Detectar header
+    if kind == LINE_HEADER:
+        if column.pending_title:
+            column.product_type = clean_logo_text(column.pending_title)
+            column.pending_title = ""
+        column.reset_nominal()
+        # Resetear subtipo cuando hay nueva tabla (nuevo header)
+        column.subtype = ""
+    # Detectar acabado
+    elif kind == LINE_FINISH:
+        column.finish = stripped
+        # Si el acabado NO es "continuación", resetear subtipo
+        # porque es una nueva sección de acabado
+        if "continuaci" not in stripped.lower():
+            column.subtype = ""
+    # Detectar título
+    elif kind == LINE_TITLE:
+        if column.pending_title:
+            column.pending_title += " " + stripped
+        else:
+            column.pending_title = stripped
+    # Detectar continuación de título incompleto (ej: "TERRAZAS" después de "TORNILLO PARA")
+    elif kind == LINE_CONTINUATION:
+        column.pending_title += " " + stripped
+    # Detectar subtipo
+    elif kind == LINE_SUBTYPE:
+        if column.pending_title:
+            column.pending_title += " " + stripped
+        else:
+            column.subtype = stripped
+    # Fila de datos
+    elif catalog is None:
+        # Pre-escaneo: solo importa para heredar NOMINAL, se parsea después
+        column.unparsed_rows.append(part)
+    else:
+        row = parse_table_row(part)
+        if row and row.get("CODIGO"):
+            sku = fix_ocr_errors(row["CODIGO"])
+            nominal = row.get("NOMINAL", "").strip()
+            if nominal:
+                column.last_nominal = nominal
             else:
-                # Si no matchea ninguna sección conocida, verificar si es recordatorio
-                subcat_upper = " ".join(current_subcategory.upper().split())
-                if stripped_upper in subcat_upper or subcat_upper in stripped_upper:
-                    # Es un recordatorio de subcategoría, ignorar
-                    pending_title_left = ""
-                    pending_title_right = ""
-                    after_page_break = False
-            if not after_page_break:
-                continue
-        
-        # Si ya procesamos una línea no vacía después del page break, desactivar flag
-        if stripped:
-            after_page_break = False
-        
-        # Detectar header de tabla en la línea COMPLETA
-        # NOTA: No resetear nominales aquí, hacerlo después del split para cada lado
-        if is_header_line(line):
-            # Consolidar títulos pendientes
-            if pending_title_left:
-                product_type_left = clean_logo_text(pending_title_left)
-                pending_title_left = ""
-            if pending_title_right:
-                product_type_right = clean_logo_text(pending_title_right)
-                pending_title_right = ""
-            # Solo continuar si la línea SOLO tiene header (no datos)
-            # Si hay datos en un lado, procesar normalmente
-            left_test, right_test = split_line_halves(line, gap_end_pos)
-            if is_header_line(left_test) and (not right_test or is_header_line(right_test)):
-                last_nominal_left = ""
-                last_nominal_right = ""
-                continue
+                row["NOMINAL"] = column.last_nominal
+            
+            _add_product(catalog, sku, row,
+                        state.category, state.subcategory,
+                        column.product_type, column.subtype, column.finish)
+
+
+def _process_line(
+    line: str,
+    state: SpatialState,
+    layout: PageLayout,
+    has_two_tables: bool,
+    catalog: SpatialCatalog | None,
+) -> None:
+    """
+    Procesa una línea del catálogo actualizando `state` y `catalog`.
+    Con catalog en None solo actualiza el estado (pre-escaneo).
+    """
+    # Saltar marcadores de página
+    if "Página" in line and " de " in line:
+        return
+    if line.strip() == "<<<" or line.strip().startswith("<<<"):
+        state.after_page_break = True
+        return
+    
+    # Detectar cambio de sección (FIJACIONES - Tornillos para Volcanita)
+    # Excluir líneas con "Continuación" que son continuación de tipos de producto
+    if " - " in line and "CODIGO" not in line.upper() and "CONTINUACI" not in line.upper():
+        stripped = line.strip()
+        # Verificar que parece una sección real (empieza con categoría conocida)
+        if stripped.upper().startswith(("FIJACIONES", "ANCLAJES", "HERRAMIENTAS", "CADENAS")):
+            parts = stripped.split(" - ", 1)
+            if len(parts) == 2:
+                state.category = parts[0].strip()
+                state.subcategory = parts[1].strip()
+                state.left.reset_titles()
+                state.right.reset_titles()
+                state.after_page_break = False
+                return
+    
+    # Detectar recordatorio de subcategoría o nueva sección principal después de cambio de página
+    # Ej: "TORNILLOS PARA MADERA" sola después de "<<<"
+    stripped = line.strip()
+    if stripped and state.after_page_break:
+        # Normalizar para comparación
+        stripped_upper = " ".join(stripped.upper().split())  # Normalizar espacios
         
-        # Dividir línea en mitades para procesamiento INDEPENDIENTE
-        left_part, right_part = split_line_halves(line, gap_end_pos)
-        left_stripped = left_part.strip()
-        right_stripped = right_part.strip()
+        # Verificar si es una sección principal conocida
+        for section in KNOWN_MAIN_SECTIONS:
+            if section in stripped_upper or stripped_upper in section:
+                # Actualizar subcategoría a esta sección
+                state.subcategory = stripped.strip()
+                state.left.reset_titles()
+                state.right.reset_titles()
+                state.after_page_break = False
+                break
+        else:
+            # Si no matchea ninguna sección conocida, verificar si es recordatorio
+            subcat_upper = " ".join(state.subcategory.upper().split())
+            if stripped_upper in subcat_upper or subcat_upper in stripped_upper:
+                # Es un recordatorio de subcategoría, ignorar
+                state.left.pending_title = ""
+                state.right.pending_title = ""
+                state.after_page_break = False
+        if not state.after_page_break:
+            return
+    
+    # Si ya procesamos una línea no vacía después del page break, desactivar flag
+    if stripped:
+        state.after_page_break = False
+    
+    # Detectar header de tabla en la línea COMPLETA
+    # NOTA: No resetear nominales aquí, hacerlo después del split para cada lado
+    if is_header_line(line):
+        layout.start_section(line)
+        # Consolidar títulos pendientes
+        for column in (state.left, state.right):
+            if column.pending_title:
+                column.product_type = clean_logo_text(column.pending_title)
+                column.pending_title = ""
+        # Solo continuar si la línea SOLO tiene header (no datos)
+        # Si hay datos en un lado, procesar normalmente
+        left_test, right_test = layout.split(line)
+        if is_header_line(left_test) and (not right_test or is_header_line(right_test)):
+            state.left.reset_nominal()
+            state.right.reset_nominal()
+            return
+    
+    # Dividir línea en mitades para procesamiento INDEPENDIENTE
+    left_part, right_part = layout.split(line)
+    
+    if left_part.strip():
+        _process_half(left_part, state.left, state, catalog)
+    if has_two_tables and right_part.strip():
+        _process_half(right_part, state.right, state, catalog)
+
+
+def _parse_chunk(
+    lines: list[str],
+    state: SpatialState,
+    gap_end_pos: int,
+    has_two_tables: bool,
+) -> SpatialCatalog:
+    """Parsea un bloque de páginas partiendo del estado arrastrado `state`."""
+    catalog = SpatialCatalog()
+    for page in _iter_pages(lines):
+        layout = detect_page_layout(page, gap_end_pos)
+        for line in page:
+            _process_line(line, state, layout, has_two_tables, catalog)
+    return catalog
+
+
+def iter_spatial_products(
+    lines: Iterable[str],
+    lookahead: int = GAP_LOOKAHEAD_LINES,
+    dedup: bool = True,
+) -> Iterator[dict[str, Any]]:
+    """
+    Parser en streaming: consume líneas y entrega los productos de cada
+    página al terminarla.
+    
+    - `lines` puede ser cualquier iterable de líneas (archivo abierto, mmap
+      decodificado, resultado de LLMWhisper); se quita el salto de línea final
+    - El gap central se estima con las primeras `lookahead` líneas (no se
+      hace una pasada previa por todo el texto). Si los encabezados dobles
+      de más adelante están en otra columna, el gap puede diferir del que
+      calcula extract_catalog_from_text con todo el texto, y con él la
+      división de algunas líneas
+    - Con `dedup` cada SKU se entrega una sola vez, con el primer
+      category_path con que aparece (igual que `products` en
+      parse_spatial_catalog); para eso se guardan los SKUs ya entregados,
+      así que la memoria es O(SKUs distintos)
+    - Con dedup=False la memoria no crece con el catálogo (ventana inicial
+      y página en curso), pero un SKU repetido en varias páginas se entrega
+      una vez por página; quien llama decide qué hacer con los repetidos
+    
+    Yields:
+        {"sku": ..., "category_path": [...], "attributes": [...]}
+    """
+    normalized = (line.rstrip("\r\n") for line in lines)
+    window = list(islice(normalized, lookahead))
+    gap_end_pos, has_two_tables = _detect_table_gap(window)
+    
+    state = SpatialState()
+    seen: set[str] = set()
+    line_catalog = SpatialCatalog(root=None)
+    
+    for page in _iter_pages(chain(window, normalized)):
+        layout = detect_page_layout(page, gap_end_pos)
+        for line in page:
+            _process_line(line, state, layout, has_two_tables, line_catalog)
+        for sku, record in line_catalog.products.items():
+            if dedup:
+                if sku in seen:
+                    continue
+                seen.add(sku)
+            yield {"sku": sku, **record.to_json()}
+        line_catalog.products.clear()
+
+
+def parse_spatial_catalog(text: str) -> tuple[dict[str, Any], dict[str, dict]]:
+    """
+    Parsea el catálogo con dos columnas lado a lado.
+    Procesa línea por línea dividiendo en el gap central.
+    """
+    return parse_spatial_lines(text.splitlines())
+
+
+def parse_spatial_lines(
+    lines: list[str],
+    gap_positions: list[int] | None = None,
+) -> tuple[dict[str, Any], dict[str, dict]]:
+    """
+    Igual que parse_spatial_catalog, sobre líneas ya separadas.
+    
+    `gap_positions` son las columnas del segundo CODIGO de los headers dobles
+    cuando quien llama ya las ubicó al leer las líneas (ver
+    catalogo_pdf.lex_catalog_lines); así no se recorre el texto una vez más
+    solo para ubicar el gap.
+    """
+    if gap_positions is None:
+        gap_end_pos, has_two_tables = _detect_table_gap(lines)
+    else:
+        gap_end_pos, has_two_tables = table_gap_from_positions(gap_positions)
+    return _parse_chunk(lines, SpatialState(), gap_end_pos, has_two_tables).to_json()
+
+
+def _page_starts(lines: list[str]) -> list[int]:
+    """Índices de línea donde empieza cada página (la primera y cada <<<)."""
+    return [0] + [i for i, line in enumerate(lines) if i and _is_page_marker(line)]
+
+
+def _chunk_starts(lines: list[str], chunks: int, min_pages_per_chunk: int) -> list[int]:
+    """Índices de línea donde empieza cada bloque (siempre en un marcador <<<)."""
+    page_starts = _page_starts(lines)
+    chunks = max(1, min(chunks, len(page_starts) // max(1, min_pages_per_chunk)))
+    return sorted({page_starts[len(page_starts) * k // chunks] for k in range(chunks)})
+
+
+def _prescan_states(
+    lines: list[str],
+    starts: list[int],
+    gap_end_pos: int,
+    has_two_tables: bool,
+) -> list[SpatialState]:
+    """
+    Estado arrastrado al inicio de cada bloque.
+    Recorre las líneas sin parsear filas ni construir productos; el NOMINAL
+    heredado se resuelve solo en los bordes de bloque.
+    """
+    state = SpatialState()
+    states = []
+    pos = 0
+    for start in starts:
+        for page in _iter_pages(lines[pos:start]):
+            layout = detect_page_layout(page, gap_end_pos)
+            for line in page:
+                _process_line(line, state, layout, has_two_tables, None)
+        pos = start
+        state.left.resolve_nominal()
+        state.right.resolve_nominal()
+        states.append(state.copy())
+    return states
+
+
+def parse_spatial_catalog_parallel(
+    text: str,
+    max_workers: int | None = None,
+    min_pages_per_chunk: int = 8,
+) -> tuple[dict[str, Any], dict[str, dict]]:
+    """
+    Igual que parse_spatial_catalog, pero repartiendo páginas entre procesos.
+    
+    - Divide el texto en bloques de páginas contiguas (cortes en "<<<")
+    - Un pre-escaneo barato calcula el estado arrastrado al inicio de cada
+      bloque (categoría, subcategoría, títulos, acabados, NOMINAL heredado)
+    - Los bloques se parsean en un ProcessPoolExecutor y se unen en orden,
+      así que el resultado es idéntico al del parser secuencial
+    """
+    lines = text.splitlines()
+    gap_end_pos, has_two_tables = _detect_table_gap(lines)
+    
+    workers = max_workers or os.cpu_count() or 1
+    starts = _chunk_starts(lines, workers * 4, min_pages_per_chunk)
+    if workers == 1 or len(starts) == 1:
+        return _parse_chunk(lines, SpatialState(), gap_end_pos, has_two_tables).to_json()
+    
+    states = _prescan_states(lines, starts, gap_end_pos, has_two_tables)
+    ends = starts[1:] + [len(lines)]
+    
+    with ProcessPoolExecutor(max_workers=min(workers, len(starts))) as pool:
+        futures = [
+            pool.submit(_parse_chunk, lines[start:end], state, gap_end_pos, has_two_tables)
+            for start, end, state in zip(starts, ends, states)
+        ]
+        results = [future.result() for future in futures]
+    
+    catalog = SpatialCatalog()
+    for chunk in results:
+        catalog.merge(chunk)
+    
+    return catalog.to_json()
+
+
+def _parser_fingerprint() -> str:
+    """Huella del parser: versión de la caché + código de este módulo."""
+    source = Path(__file__).read_bytes()
+    return hashlib.sha256(f"{SPATIAL_CACHE_VERSION}:".encode("utf-8") + source).hexdigest()
+
+
+def _load_page_cache(cache_path: Path, fingerprint: str) -> dict[str, tuple]:
+    """Lee la caché por página si existe y corresponde a este parser."""
+    if not cache_path.exists():
+        return {}
+    try:
+        with open(cache_path, "rb") as f:
+            payload = pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Caché de páginas inválida ({cache_path}): {e}")
+        return {}
+    if payload.get("fingerprint") != fingerprint:
+        return {}
+    return payload.get("pages", {})
+
+
+def _save_page_cache(cache_path: Path, fingerprint: str, pages: dict[str, tuple]) -> None:
+    """Persiste la caché por página (escritura atómica)."""
+    payload = {"fingerprint": fingerprint, "pages": pages}
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_name, cache_path)
+    except Exception as e:
+        # La caché es una optimización: nunca debe romper el parseo
+        logger.warning(f"No se pudo guardar caché de páginas: {e}")
+
+
+def parse_spatial_catalog_incremental(
+    text: str,
+    cache_path: str | Path = DEFAULT_PAGE_CACHE,
+) -> tuple[dict[str, Any], dict[str, dict]]:
+    """
+    Igual que parse_spatial_catalog, pero reutilizando páginas ya parseadas.
+    
+    - Cada página (cortes en "<<<") se guarda en disco con su resultado y el
+      estado con el que termina
+    - La clave es el hash del texto de la página + el estado con el que
+      empieza + el gap central; el archivo además guarda la huella del
+      parser (cualquier cambio de código invalida toda la caché)
+    - Solo se re-parsean las páginas cuya clave cambió; el resto se une
+      desde la caché en el mismo orden que el parser secuencial
+    """
+    cache_path = Path(cache_path)
+    fingerprint = _parser_fingerprint()
+    cached = _load_page_cache(cache_path, fingerprint)
+    
+    lines = text.splitlines()
+    gap_end_pos, has_two_tables = _detect_table_gap(lines)
+    starts = _page_starts(lines)
+    ends = starts[1:] + [len(lines)]
+    
+    catalog = SpatialCatalog()
+    pages: dict[str, tuple] = {}
+    state = SpatialState()
+    misses = 0
+    
+    for start, end in zip(starts, ends):
+        page_lines = lines[start:end]
+        digest = hashlib.sha256()
+        digest.update(f"{gap_end_pos}:{has_two_tables}:{state!r}\n".encode("utf-8"))
+        digest.update("\n".join(page_lines).encode("utf-8"))
+        key = digest.hexdigest()
         
-        # ========== PROCESAR MITAD IZQUIERDA ==========
-        if left_stripped:
-            # Detectar header en izquierda
-            if is_header_line(left_part):
-                if pending_title_left:
-                    product_type_left = clean_logo_text(pending_title_left)
-                    pending_title_left = ""
-                last_nominal_left = ""
-                # Resetear subtipo cuando hay nueva tabla (nuevo header)
-                subtype_left = ""
-            # Detectar acabado en izquierda
-            elif is_finish_line(left_part):
-                finish_left = left_stripped
-                # Si el acabado NO es "continuación", resetear subtipo
-                if "continuaci" not in left_stripped.lower():
-                    subtype_left = ""
-            # Detectar título en izquierda
-            elif is_title_line(left_part) and not looks_like_sku(left_stripped.split()[0] if left_stripped.split() else ""):
-                if pending_title_left:
-                    pending_title_left += " " + left_stripped
-                else:
-                    pending_title_left = left_stripped
-            # Detectar continuación de título incompleto (ej: "TERRAZAS" después de "TORNILLO PARA")
-            elif pending_title_left and is_incomplete_title(pending_title_left) and is_title_continuation(left_stripped):
-                pending_title_left += " " + left_stripped
-            # Detectar subtipo en izquierda
-            elif is_subtype_text(left_stripped) and not looks_like_sku(left_stripped.split()[0] if left_stripped.split() else ""):
-                if pending_title_left:
-                    pending_title_left += " " + left_stripped
-                else:
-                    subtype_left = left_stripped
-            # Fila de datos izquierda
-            else:
-                row_left = parse_table_row(left_part)
-                if row_left and row_left.get("CODIGO"):
-                    sku = fix_ocr_errors(row_left["CODIGO"])
-                    nominal = row_left.get("NOMINAL", "").strip()
-                    if nominal:
-                        last_nominal_left = nominal
-                    else:
-                        row_left["NOMINAL"] = last_nominal_left
-                    
-                    _add_product(products, structure, sku, row_left, 
-                                current_category, current_subcategory, 
-                                product_type_left, subtype_left, finish_left)
+        entry = pages.get(key) or cached.get(key)
+        if entry is None:
+            entry = (_parse_chunk(page_lines, state, gap_end_pos, has_two_tables), state.copy())
+            misses += 1
+        pages[key] = entry
         
-        # ========== PROCESAR MITAD DERECHA ==========
-        if has_two_tables and right_stripped:
-            # Detectar header en derecha
-            if is_header_line(right_part):
-                if pending_title_right:
-                    product_type_right = clean_logo_text(pending_title_right)
-                    pending_title_right = ""
-                last_nominal_right = ""
-                # Resetear subtipo cuando hay nueva tabla (nuevo header)
-                subtype_right = ""
-            # Detectar acabado en derecha
-            elif is_finish_line(right_part):
-                finish_right = right_stripped
-                # Si el acabado NO es "continuación", resetear subtipo
-                # porque es una nueva sección de acabado
-                if "continuaci" not in right_stripped.lower():
-                    subtype_right = ""
-            # Detectar título en derecha
-            elif is_title_line(right_part) and not looks_like_sku(right_stripped.split()[0] if right_stripped.split() else ""):
-                if pending_title_right:
-                    pending_title_right += " " + right_stripped
-                else:
-                    pending_title_right = right_stripped
-            # Detectar continuación de título incompleto (ej: "DECK DE MADERA" después de "TORNILLO PARA")
-            elif pending_title_right and is_incomplete_title(pending_title_right) and is_title_continuation(right_stripped):
-                pending_title_right += " " + right_stripped
-            # Detectar subtipo en derecha
-            elif is_subtype_text(right_stripped) and not looks_like_sku(right_stripped.split()[0] if right_stripped.split() else ""):
-                if pending_title_right:
-                    pending_title_right += " " + right_stripped
-                else:
-                    subtype_right = right_stripped
-            # Fila de datos derecha
-            else:
-                row_right = parse_table_row(right_part)
-                if row_right and row_right.get("CODIGO"):
-                    sku = fix_ocr_errors(row_right["CODIGO"])
-                    nominal = row_right.get("NOMINAL", "").strip()
-                    if nominal:
-                        last_nominal_right = nominal
-                    else:
-                        row_right["NOMINAL"] = last_nominal_right
-                    
-                    _add_product(products, structure, sku, row_right,
-                                current_category, current_subcategory,
-                                product_type_right, subtype_right, finish_right)
-    
-    return structure, products
+        page_catalog, end_state = entry
+        catalog.merge(page_catalog)
+        state = end_state.copy()
+    
+    logger.info(f"Páginas: {len(starts)} ({len(starts) - misses} desde caché, {misses} parseadas)")
+    if misses or len(pages) != len(cached):
+        _save_page_cache(cache_path, fingerprint, pages)
+    
+    return catalog.to_json()
 
 
 def _extract_row_by_columns(line: str, columns: list[tuple[int, int, str]]) -> dict[str, str] | None:
@@ -791,8 +1378,8 @@ def _extract_row_by_columns(line: str, columns: list[tuple[int, int, str]]) -> d
     return result
 
 
-def _add_product(products, structure, sku, row, category, subcategory, product_type, subtype, finish):
-    """Agrega un producto al diccionario y estructura."""
+def _add_product(catalog, sku, row, category, subcategory, product_type, subtype, finish):
+    """Agrega un producto al catálogo (productos y estructura)."""
     # Normalizar y limpiar tipo de producto
     clean_product_type = product_type
     if clean_product_type:
@@ -810,10 +1397,10 @@ def _add_product(products, structure, sku, row, category, subcategory, product_t
     attrs = []
     for key in ["NOMINAL", "LARGO", "ENVASE", "ENTRE CARAS", "PTA TORX", "COD TECFI"]:
         if key in row and row[key]:
-            attrs.append({"name": key, "value": row[key]})
+            attrs.append((key, row[key]))
     
     if finish:
-        attrs.append({"name": "Acabado", "value": finish})
+        attrs.append(("Acabado", finish))
     
     # Construir path de categoría
     cat_path = []
@@ -826,23 +1413,7 @@ def _add_product(products, structure, sku, row, category, subcategory, product_t
     if subtype:
         cat_path.append(subtype)
     
-    # Guardar producto
-    if sku not in products:
-        products[sku] = {
-            "category_path": cat_path,
-            "attributes": attrs,
-        }
-    
-    # Agregar a estructura
-    node = structure
-    for p in cat_path:
-        if p not in node:
-            node[p] = {}
-        node = node[p]
-    if "skus" not in node:
-        node["skus"] = []
-    if sku not in node["skus"]:
-        node["skus"].append(sku)
+    catalog.add(sku, tuple(cat_path), attrs)
 
 
 def to_woocommerce_format(products: dict[str, dict]) -> dict[str, dict[str, str]]:
@@ -858,9 +1429,22 @@ def to_woocommerce_format(products: dict[str, dict]) -> dict[str, dict[str, str]
     return woo
 
 
-def extract_catalog_from_text(text: str) -> dict[str, Any]:
-    """Extrae el catálogo completo."""
-    structure, products = parse_spatial_catalog(text)
+def extract_catalog_from_text(
+    text: str,
+    workers: int = 1,
+    cache_path: str | Path | None = None,
+) -> dict[str, Any]:
+    """
+    Extrae el catálogo completo.
+    Con cache_path solo se re-parsean las páginas que cambiaron; con
+    workers > 1 las páginas se parsean en paralelo (mismo resultado).
+    """
+    if cache_path is not None:
+        structure, products = parse_spatial_catalog_incremental(text, cache_path)
+    elif workers > 1:
+        structure, products = parse_spatial_catalog_parallel(text, max_workers=workers)
+    else:
+        structure, products = parse_spatial_catalog(text)
     woo = to_woocommerce_format(products)
     
     return {
@@ -877,12 +1461,23 @@ if __name__ == "__main__":
     import json
     
     if len(sys.argv) < 2:
-        print("Uso: python catalogo_spatial_parser.py <archivo.txt> [salida.json]")
+        print("Uso: python catalogo_spatial_parser.py <archivo.txt> [salida.json|salida.jsonl]")
         sys.exit(1)
     
     txt_path = sys.argv[1]
     out_path = sys.argv[2] if len(sys.argv) > 2 else "data/catalogo_extracted.json"
     
+    if out_path.endswith(".jsonl"):
+        # Streaming: un producto por línea; la memoria solo crece con los SKUs ya entregados (dedup)
+        total = 0
+        with open(txt_path, "r", encoding="utf-8") as f_in, open(out_path, "w", encoding="utf-8") as f_out:
+            for record in iter_spatial_products(f_in):
+                f_out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                total += 1
+        print(f"Extraídos {total} productos")
+        print(f"Guardado en: {out_path}")
+        sys.exit(0)
+    
     with open(txt_path, "r", encoding="utf-8") as f:
         text = f.read()
     
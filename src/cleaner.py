@@ -10,7 +10,9 @@ import re
 import logging
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass, asdict
-import yaml
+from src.memo import NameMemo
+from src.keywords import KeywordMatcher
+from src.rules import CompiledRules
 
 logger = logging.getLogger(__name__)
 
@@ -33,33 +35,44 @@ class DataCleaner:
     - Extrae patrones básicos (marca, medidas, material)
     """
     
-    def __init__(self, rules_path: str = 'config/rules.yaml'):
+    # Ruido explícito eliminado del nombre (en este orden)
+    NOISE_WORDS = ['STOCK', 'DISPONIBLE', 'OFERTA', 'PROMO', 'DESCUENTO',
+                   'CONSULTE', 'PRECIO ESPECIAL', 'BAJO PEDIDO']
+    
+    def __init__(self, rules_path: str = 'config/rules.yaml', memo: Optional[NameMemo] = None,
+                 compiled_rules: Optional[CompiledRules] = None):
         """
         Inicializa el cleaner con reglas deterministas.
         
         Args:
             rules_path: Path a archivo de reglas YAML
+            memo: Memoización por nombre compartida entre etapas (opcional)
+            compiled_rules: Reglas ya compiladas (por defecto, las compartidas
+                del proceso para rules_path)
         """
-        self.rules = self._load_rules(rules_path)
+        self.compiled_rules = compiled_rules if compiled_rules is not None else CompiledRules.load(rules_path)
+        self.rules = self._load_rules(self.compiled_rules)
+        self.memo = memo if memo is not None else NameMemo()
+        self._memo_namespace = f"DataCleaner[{rules_path}]"
+        self.family_matcher, self.noise_matcher = self.compiled_rules.artifact(
+            'cleaner.keyword_matchers', self._build_keyword_matchers, fingerprint=self.NOISE_WORDS
+        )
         logger.info(f"Reglas cargadas desde: {rules_path}")
     
-    def _load_rules(self, rules_path: str) -> Dict:
+    def _load_rules(self, compiled_rules: CompiledRules) -> Dict:
         """
-        Carga reglas desde YAML.
+        Obtiene las reglas ya parseadas.
         
         Args:
-            rules_path: Path al archivo de reglas
+            compiled_rules: Reglas compiladas compartidas
         
         Returns:
             Diccionario con reglas
         """
-        try:
-            with open(rules_path, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
-        except FileNotFoundError:
-            logger.warning(f"Archivo de reglas no encontrado: {rules_path}")
+        if not compiled_rules.found:
             logger.warning("Usando reglas por defecto (mínimas)")
             return self._get_default_rules()
+        return compiled_rules.rules
     
     def _get_default_rules(self) -> Dict:
         """Reglas por defecto si no se puede cargar config."""
@@ -70,6 +83,18 @@ class DataCleaner:
             'variation_keywords': {}
         }
     
+    def _build_keyword_matchers(self) -> Tuple[KeywordMatcher, KeywordMatcher]:
+        """Construye los autómatas de familias y de ruido (una vez por YAML)."""
+        # (keyword, familia) en orden de declaración: la prioridad conserva
+        # "primera familia que tenga alguna keyword en el nombre"
+        family_matcher = KeywordMatcher(
+            (keyword, family_name)
+            for family_name, family_config in (self.rules.get('families') or {}).items()
+            for keyword in (family_config or {}).get('keywords', [])
+        )
+        noise_matcher = KeywordMatcher(self.NOISE_WORDS)
+        return family_matcher, noise_matcher
+    
     def clean_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Limpia todo el DataFrame.
@@ -86,18 +111,19 @@ class DataCleaner:
         df_clean = df.copy()
         
         # Aplicar limpieza a columna Nombre (crítica)
+        # Cada función se calcula una vez por nombre único y se difunde
         df_clean['Nombre_Original'] = df_clean['Nombre'].copy()
-        df_clean['Nombre_Limpio'] = df_clean['Nombre'].apply(self.clean_name)
-        df_clean['Limpieza_Notas'] = df_clean['Nombre'].apply(self._get_cleaning_notes)
+        df_clean['Nombre_Limpio'] = self._map_names(df_clean['Nombre'], self.clean_name)
+        df_clean['Limpieza_Notas'] = self._map_names(df_clean['Nombre'], self._get_cleaning_notes)
         
         # Detectar palabras clave principales
-        df_clean['Familia_Detectada'] = df_clean['Nombre_Limpio'].apply(self._detect_family)
+        df_clean['Familia_Detectada'] = self._map_names(df_clean['Nombre_Limpio'], self._detect_family)
         
         # Extraer marca (si existe)
-        df_clean['Marca_Detectada'] = df_clean['Nombre'].apply(self._extract_brand)
+        df_clean['Marca_Detectada'] = self._map_names(df_clean['Nombre'], self._extract_brand)
         
         # Detectar si tiene potencial de variaciones
-        df_clean['Tiene_Medidas'] = df_clean['Nombre'].apply(self._has_measurements)
+        df_clean['Tiene_Medidas'] = self._map_names(df_clean['Nombre'], self._has_measurements)
         
         logger.info("✓ Limpieza completada")
         logger.info(f"  • Nombres únicos detectados: {df_clean['Nombre_Limpio'].nunique()}")
@@ -105,6 +131,10 @@ class DataCleaner:
         
         return df_clean
     
+    def _map_names(self, names: pd.Series, func) -> pd.Series:
+        """Aplica func por nombre único usando la memoización compartida."""
+        return self.memo.map(names, func, f"{self._memo_namespace}.{func.__name__}")
+    
     def clean_name(self, name: str) -> str:
         """
         Limpia nombre del producto eliminando ruido.
@@ -144,10 +174,11 @@ class DataCleaner:
         clean = re.sub(r'mm\.', 'mm', clean, flags=re.IGNORECASE)
         
         # 6. Remover ruido explícito
-        noise_words = ['STOCK', 'DISPONIBLE', 'OFERTA', 'PROMO', 'DESCUENTO', 
-                      'CONSULTE', 'PRECIO ESPECIAL', 'BAJO PEDIDO']
-        for word in noise_words:
-            clean = re.sub(f'(?i){word}[\\s]?', '', clean)
+        # Una pasada del autómata descarta el caso común (sin ruido); si hay
+        # ruido se aplican las sustituciones en orden, como siempre
+        if self.noise_matcher.contains_any(clean):
+            for word in self.NOISE_WORDS:
+                clean = re.sub(f'(?i){word}[\\s]?', '', clean)
         
         # 7. Trim final
         clean = clean.strip()
@@ -201,15 +232,8 @@ class DataCleaner:
         if not clean_name:
             return None
         
-        name_lower = clean_name.lower()
-        
-        for family_name, family_config in self.rules.get('families', {}).items():
-            keywords = family_config.get('keywords', [])
-            for keyword in keywords:
-                if keyword.lower() in name_lower:
-                    return family_name
-        
-        return None
+        # Todas las keywords en una pasada; gana la primera familia declarada
+        return self.family_matcher.first_by_priority(clean_name)
     
     def _extract_brand(self, name: str) -> Optional[str]:
         """
@@ -320,18 +344,22 @@ class DataCleaner:
 
 
 # Función de conveniencia
-def clean_products(df: pd.DataFrame, rules_path: str = 'config/rules.yaml') -> pd.DataFrame:
+def clean_products(df: pd.DataFrame, rules_path: str = 'config/rules.yaml',
+                   memo: Optional[NameMemo] = None,
+                   compiled_rules: Optional[CompiledRules] = None) -> pd.DataFrame:
     """
     Limpia DataFrame de productos.
     
     Args:
         df: DataFrame original
         rules_path: Path a archivo de reglas
+        memo: Memoización por nombre compartida entre etapas (opcional)
+        compiled_rules: Reglas compiladas compartidas (opcional)
     
     Returns:
         DataFrame limpiado
     """
-    cleaner = DataCleaner(rules_path)
+    cleaner = DataCleaner(rules_path, memo=memo, compiled_rules=compiled_rules)
     df_clean = cleaner.clean_dataframe(df)
     print(cleaner.get_cleaning_summary(df_clean))
     return df_clean
@@ -6,12 +6,16 @@ Salida: DataFrame estructurado con Tipo, SKU, SKU Parent
 """
 
 import pandas as pd
+import numpy as np
 import re
 import logging
 from typing import Dict, List, Tuple, Optional, Set
 from dataclasses import dataclass
 from collections import defaultdict
-import yaml
+
+from src.memo import NameMemo
+from src.keywords import KeywordMatcher
+from src.rules import CompiledRules
 
 logger = logging.getLogger(__name__)
 
@@ -34,47 +38,49 @@ class ProductGrouper:
     - Valida estructura de variaciones
     """
     
-    def __init__(self, rules_path: str = 'config/rules.yaml'):
+    def __init__(self, rules_path: str = 'config/rules.yaml', memo: Optional[NameMemo] = None,
+                 compiled_rules: Optional[CompiledRules] = None):
         """
         Inicializa agrupador.
         
         Args:
             rules_path: Path a archivo de reglas
+            memo: Memoización por nombre compartida entre etapas (opcional)
+            compiled_rules: Reglas ya compiladas (por defecto, las compartidas
+                del proceso para rules_path)
         """
-        self.rules = self._load_rules(rules_path)
-        self._build_grouping_config()
+        self.memo = memo if memo is not None else NameMemo()
+        self._memo_namespace = f"ProductGrouper[{rules_path}]"
+        self.compiled_rules = compiled_rules if compiled_rules is not None else CompiledRules.load(rules_path)
+        self.rules = self.compiled_rules.rules
+        self.parent_keywords, self.parent_matcher, self.variation_attributes = \
+            self.compiled_rules.artifact('grouping.config', self._build_grouping_config)
         logger.info("Agrupador de productos inicializado")
     
-    def _load_rules(self, rules_path: str) -> Dict:
-        """Carga reglas desde YAML."""
-        try:
-            with open(rules_path, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
-        except FileNotFoundError:
-            logger.warning(f"Reglas no encontradas: {rules_path}")
-            return {}
-    
-    def _build_grouping_config(self) -> None:
-        """Construye configuración de agrupación."""
+    def _build_grouping_config(self) -> Tuple[Set[str], KeywordMatcher, Set[str]]:
+        """Construye configuración de agrupación (una vez por YAML)."""
         
         # Keywords para detectar producto padre
-        self.parent_keywords = set()
+        parent_keywords = set()
         if 'parent_product' in self.rules:
             for pattern in self.rules['parent_product'].get('patterns', []):
                 # Extraer palabras de los patrones
                 words = re.findall(r'\w+', pattern.lower())
-                self.parent_keywords.update(words)
+                parent_keywords.update(words)
         
-        self.parent_keywords.update([
+        parent_keywords.update([
             'kit', 'pack', 'surtido', 'variado', 'completo',
             'set', 'incluye', 'varios', 'mix'
         ])
+        parent_matcher = KeywordMatcher(sorted(parent_keywords))
         
         # Atributos que definen variaciones
-        self.variation_attributes = set()
+        variation_attributes = set()
         if 'variation_keywords' in self.rules:
             for attr, keywords in self.rules['variation_keywords'].items():
-                self.variation_attributes.add(attr)
+                variation_attributes.add(attr)
+        
+        return parent_keywords, parent_matcher, variation_attributes
     
     def group_products(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -95,7 +101,7 @@ class ProductGrouper:
             df['SKU_Origen'] = df['SKU'].copy()
         
         # 1. Detectar productos padre
-        df['Es_Padre_Potencial'] = df['Nombre_Limpio'].apply(self._is_potential_parent)
+        df['Es_Padre_Potencial'] = self._map_names(df['Nombre_Limpio'], self._is_potential_parent)
         
         # 2. Inicializar columnas de resultado
         df['Tipo'] = 'simple'  # Por defecto
@@ -103,78 +109,18 @@ class ProductGrouper:
         df['SKU_Parent'] = None
         
         # 3. Agrupar nombres similares
-        df['Nombre_Base'] = df['Nombre_Limpio'].apply(self._extract_base_name)
+        df['Nombre_Base'] = self._map_names(df['Nombre_Limpio'], self._extract_base_name)
         
         # 4. Procesar grupos - Detectar variaciones (múltiples productos con mismo nombre base)
-        grouped = df.groupby('Nombre_Base')
-        
-        for base_name, group_df in grouped:
-            group_indices = group_df.index.tolist()
-            
-            # Debug: mostrar lo que se encontró
-            if len(group_df) > 1:
-                logger.info(f"🔍 Grupo encontrado '{base_name}' con {len(group_df)} productos:")
-                for idx in group_indices:
-                    logger.info(f"   - {df.loc[idx, 'Nombre_Limpio']} (SKU: {df.loc[idx].get('SKU', '?')})")
-            
-            if len(group_df) > 1:
-                # VARIACIONES DETECTADAS: Crear estructura padre-hijo
-                # El primer producto es el padre (o el más genérico)
-                parent_idx = group_indices[0]
-                
-                # Marcar padre como variable
-                df.loc[parent_idx, 'Tipo'] = 'variable'
-                
-                # Generar SKU para padre (basado en nombre base sin medidas)
-                parent_name = df.loc[parent_idx, 'Nombre_Limpio']
-                
-                # Usar SKU original si existe
-                if 'SKU_Origen' in df.columns and pd.notna(df.loc[parent_idx, 'SKU_Origen']):
-                    # Simplificar SKU original para usarlo como padre
-                    parent_sku = str(df.loc[parent_idx, 'SKU_Origen']).strip()
-                    # Remover sufijos que indiquen medidas
-                    parent_sku = re.sub(r'-[A-Z0-9]+$', '', parent_sku)
-                else:
-                    parent_sku = self._generate_parent_sku(parent_name)
-                
-                df.loc[parent_idx, 'SKU_WooCommerce'] = parent_sku
-                df.loc[parent_idx, 'SKU_Parent'] = None  # Padre no tiene padre
-                
-                # Procesar variaciones
-                for i, var_idx in enumerate(group_indices[1:], start=1):
-                    df.loc[var_idx, 'Tipo'] = 'variable'
-                    df.loc[var_idx, 'SKU_Parent'] = parent_sku
-                    
-                    # Generar SKU único para variación usando SKU original
-                    if 'SKU_Origen' in df.columns and pd.notna(df.loc[var_idx, 'SKU_Origen']):
-                        var_sku = str(df.loc[var_idx, 'SKU_Origen']).strip()
-                    else:
-                        # Generar basado en atributos diferenciales
-                        var_sku = self._generate_variation_sku(
-                            parent_sku,
-                            df.loc[var_idx, 'Nombre_Limpio'],
-                            df.loc[var_idx]
-                        )
-                    
-                    df.loc[var_idx, 'SKU_WooCommerce'] = var_sku
-            
-            else:
-                # PRODUCTO SIMPLE
-                idx = group_indices[0]
-                df.loc[idx, 'Tipo'] = 'simple'
-                
-                # Usar SKU original si existe
-                if 'SKU_Origen' in df.columns and pd.notna(df.loc[idx, 'SKU_Origen']):
-                    df.loc[idx, 'SKU_WooCommerce'] = str(df.loc[idx, 'SKU_Origen']).strip()
-                else:
-                    df.loc[idx, 'SKU_WooCommerce'] = self._generate_simple_sku(
-                        df.loc[idx, 'Nombre_Limpio']
-                    )
+        #    Por columnas: Tipo / SKU_WooCommerce / SKU_Parent en bloque
+        self._assign_group_structure(df)
         
         # 5. Asegurarse que cada producto tenga SKU_WooCommerce
-        df.loc[df['SKU_WooCommerce'].isna() | (df['SKU_WooCommerce'] == ''), 'SKU_WooCommerce'] = df['Nombre_Limpio'].apply(
-            self._generate_simple_sku
-        )
+        missing = df['SKU_WooCommerce'].isna() | (df['SKU_WooCommerce'] == '')
+        if missing.any():
+            df.loc[missing, 'SKU_WooCommerce'] = self._map_names(
+                df.loc[missing, 'Nombre_Limpio'], self._generate_simple_sku
+            )
         
         # Copiar SKU_WooCommerce a SKU para mantener compatibilidad
         df['SKU'] = df['SKU_WooCommerce']
@@ -186,6 +132,108 @@ class ProductGrouper:
         
         return df
     
+    def _assign_group_structure(self, df: pd.DataFrame) -> None:
+        """
+        Calcula Tipo, SKU_WooCommerce y SKU_Parent para todo el DataFrame.
+        
+        Reglas (por grupo de Nombre_Base, en orden de aparición):
+        - Grupo de 1 fila → simple, SKU = SKU_Origen o SKU generado
+        - Grupo de N filas → la primera es el padre (SKU_Origen sin sufijo
+          de medida, o SKU generado); el resto son variaciones con
+          SKU_Parent = SKU del padre
+        - Filas sin Nombre_Base quedan sin SKU (se completan después)
+        
+        Todo se resuelve con operaciones de columna (groupby/cumcount/
+        np.where); los SKU generados solo se calculan para las filas que
+        no traen SKU_Origen.
+        
+        Args:
+            df: DataFrame con Nombre_Limpio y Nombre_Base (se modifica)
+        """
+        n = len(df)
+        names = df['Nombre_Limpio'].to_numpy(dtype=object)
+        codes, uniques = pd.factorize(df['Nombre_Base'])
+        in_group = codes >= 0
+        
+        by_group = pd.Series(codes).groupby(codes)
+        sizes = by_group.transform('size').to_numpy()
+        position = by_group.cumcount().to_numpy()
+        
+        is_multi = in_group & (sizes > 1)
+        is_parent = is_multi & (position == 0)
+        is_child = is_multi & (position > 0)
+        is_single = in_group & (sizes == 1)
+        
+        # SKU original normalizado (str + strip), solo donde existe
+        if 'SKU_Origen' in df.columns:
+            origin = df['SKU_Origen']
+            has_origin = origin.notna().to_numpy()
+            origin_sku = np.empty(n, dtype=object)
+            origin_sku[has_origin] = [str(v).strip() for v in origin.to_numpy(dtype=object)[has_origin]]
+        else:
+            has_origin = np.zeros(n, dtype=bool)
+            origin_sku = np.empty(n, dtype=object)
+        
+        # SKU del padre: una vez por grupo, difundido a sus variaciones
+        group_parent_sku = np.empty(len(uniques), dtype=object)
+        parent_rows = np.flatnonzero(is_parent)
+        for row in parent_rows:
+            if has_origin[row]:
+                # Simplificar SKU original: remover sufijos que indiquen medidas
+                group_parent_sku[codes[row]] = re.sub(r'-[A-Z0-9]+$', '', origin_sku[row])
+            else:
+                group_parent_sku[codes[row]] = self._generate_parent_sku(names[row])
+        row_parent_sku = np.where(in_group, group_parent_sku[np.maximum(codes, 0)], None)
+        
+        sku = np.full(n, '', dtype=object)
+        
+        # Padres: SKU simplificado del grupo
+        sku[is_parent] = row_parent_sku[is_parent]
+        
+        # Variaciones y simples: SKU original si existe
+        keep_origin = (is_child | is_single) & has_origin
+        sku[keep_origin] = origin_sku[keep_origin]
+        
+        # Variaciones sin SKU original: padre + atributos diferenciales
+        generate_variation = np.flatnonzero(is_child & ~has_origin)
+        if len(generate_variation):
+            attr_cols = self._variation_attribute_columns(df.columns)
+            attr_values = df[attr_cols].to_numpy(dtype=object)
+            for row in generate_variation:
+                sku[row] = self._variation_sku_from_values(row_parent_sku[row], attr_values[row])
+        
+        # Simples sin SKU original: SKU generado desde el nombre
+        generate_simple = is_single & ~has_origin
+        if generate_simple.any():
+            sku[generate_simple] = self._map_names(
+                df['Nombre_Limpio'][generate_simple], self._generate_simple_sku
+            ).to_numpy(dtype=object)
+        
+        df['Tipo'] = np.where(is_multi, 'variable', 'simple')
+        df['SKU_WooCommerce'] = sku
+        df['SKU_Parent'] = pd.Series(np.where(is_child, row_parent_sku, None), index=df.index, dtype=object)
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            self._log_groups(df, codes, uniques, is_multi)
+    
+    def _log_groups(self, df: pd.DataFrame, codes: np.ndarray, uniques: pd.Index,
+                    is_multi: np.ndarray) -> None:
+        """Detalle de cada grupo con variaciones (solo con logging DEBUG)."""
+        skus = df['SKU'] if 'SKU' in df.columns else pd.Series('?', index=df.index)
+        members = pd.DataFrame({
+            'code': codes[is_multi],
+            'name': df['Nombre_Limpio'].to_numpy(dtype=object)[is_multi],
+            'sku': skus.to_numpy(dtype=object)[is_multi],
+        })
+        for code, group in members.groupby('code', sort=False):
+            logger.debug(f"🔍 Grupo encontrado '{uniques[code]}' con {len(group)} productos:")
+            for name, sku in zip(group['name'], group['sku']):
+                logger.debug(f"   - {name} (SKU: {sku})")
+    
+    def _map_names(self, names: pd.Series, func) -> pd.Series:
+        """Aplica func por nombre único usando la memoización compartida."""
+        return self.memo.map(names, func, f"{self._memo_namespace}.{func.__name__}")
+    
     def _is_potential_parent(self, name: str) -> bool:
         """
         Detecta si nombre sugiere ser producto padre.
@@ -199,14 +247,8 @@ class ProductGrouper:
         if not isinstance(name, str):
             return False
         
-        name_lower = name.lower()
-        
-        # Buscar palabras clave de padre
-        for keyword in self.parent_keywords:
-            if keyword in name_lower:
-                return True
-        
-        return False
+        # Buscar palabras clave de padre (una pasada del autómata)
+        return self.parent_matcher.contains_any(name)
     
     def _extract_base_name(self, name: str) -> str:
         """
@@ -333,15 +375,31 @@ class ProductGrouper:
         Returns:
             SKU generado
         """
-        sku_parts = [parent_sku]
+        attr_cols = self._variation_attribute_columns(row.index)
+        return self._variation_sku_from_values(parent_sku, [row[col] for col in attr_cols])
+    
+    @staticmethod
+    def _variation_attribute_columns(columns) -> List[str]:
+        """Columnas de atributos usadas para diferenciar variaciones."""
+        return [col for col in columns if col.startswith('Atributo_')
+                and not col.endswith('_confianza') and not col.endswith('_cantidad')]
+    
+    def _variation_sku_from_values(self, parent_sku: str, attr_values) -> str:
+        """
+        Arma el SKU de variación desde los valores de atributos.
+        
+        Args:
+            parent_sku: SKU del padre
+            attr_values: Valores de atributos (en orden de columnas)
         
-        # Extraer atributos de variación
-        attr_cols = [col for col in row.index if col.startswith('Atributo_')
-                    and not col.endswith('_confianza') and not col.endswith('_cantidad')]
+        Returns:
+            SKU generado
+        """
+        sku_parts = [parent_sku]
         
-        for col in attr_cols:
-            if pd.notna(row[col]):
-                value = str(row[col]).upper()
+        for attr_value in attr_values:
+            if pd.notna(attr_value):
+                value = str(attr_value).upper()
                 
                 # Simplificar valor
                 # 1/4" → 1-4, 10mm → 10, etc.
@@ -461,18 +519,22 @@ class ProductGrouper:
 
 
 # Función de conveniencia
-def group_products(df: pd.DataFrame, rules_path: str = 'config/rules.yaml') -> pd.DataFrame:
+def group_products(df: pd.DataFrame, rules_path: str = 'config/rules.yaml',
+                   memo: Optional[NameMemo] = None,
+                   compiled_rules: Optional[CompiledRules] = None) -> pd.DataFrame:
     """
     Agrupa productos en padre + variaciones.
     
     Args:
         df: DataFrame con productos
         rules_path: Path a archivo de reglas
+        memo: Memoización por nombre compartida entre etapas (opcional)
+        compiled_rules: Reglas compiladas compartidas (opcional)
     
     Returns:
         DataFrame agrupado
     """
-    grouper = ProductGrouper(rules_path)
+    grouper = ProductGrouper(rules_path, memo=memo, compiled_rules=compiled_rules)
     df_grouped = grouper.group_products(df)
     print(grouper.get_grouping_summary(df_grouped))
     
@@ -0,0 +1,146 @@
+"""
+KEYWORDS.PY - Búsqueda de múltiples palabras clave en una pasada
+Responsabilidad: Detectar familias, palabras de producto padre y ruido
+Método: Autómata Aho-Corasick construido una vez desde rules.yaml
+Salida: Coincidencias (posición, palabra) y consultas por prioridad
+"""
+
+import logging
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordMatcher:
+    """
+    Autómata Aho-Corasick para búsqueda de subcadenas.
+    - Se construye una vez con todas las palabras clave
+    - Encuentra todas las apariciones en una sola pasada del texto,
+      sin importar cuántas palabras haya (miles de keywords de familias)
+    - Cada palabra puede llevar un valor asociado (p. ej. su familia) y una
+      prioridad (orden de declaración) para resolver la primera coincidencia
+    
+    Semántica equivalente a `keyword in text` para cada palabra.
+    """
+    
+    def __init__(self, keywords: Iterable, lowercase: bool = True):
+        """
+        Construye el autómata.
+        
+        Args:
+            keywords: Palabras clave, o pares (palabra, valor). La prioridad
+                es el orden de aparición (menor = más prioritaria)
+            lowercase: Si True, palabras y textos se comparan en minúsculas
+        """
+        self.lowercase = lowercase
+        # Trie: transiciones por estado, enlaces de fallo y salidas
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Salidas por estado: [(prioridad, palabra, valor)]
+        self._output: List[List[Tuple[int, str, object]]] = [[]]
+        # Palabras vacías: como `'' in text`, aparecen en cualquier texto
+        self._empty: List[Tuple[int, str, object]] = []
+        self._size = 0
+        
+        for priority, item in enumerate(keywords):
+            if isinstance(item, tuple):
+                word, value = item
+            else:
+                word, value = item, item
+            self._add(str(word), value, priority)
+        
+        self._build_failure_links()
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def _normalize(self, text: str) -> str:
+        return text.lower() if self.lowercase else text
+    
+    def _add(self, word: str, value: object, priority: int) -> None:
+        """Agrega una palabra al trie."""
+        word = self._normalize(word)
+        self._size += 1
+        if not word:
+            self._empty.append((priority, word, value))
+            return
+        state = 0
+        for ch in word:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = nxt
+        self._output[state].append((priority, word, value))
+    
+    def _build_failure_links(self) -> None:
+        """Calcula enlaces de fallo (BFS) y propaga salidas por sufijo."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+    
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str, object, int]]:
+        """
+        Recorre el texto una vez y emite todas las apariciones.
+        
+        Args:
+            text: Texto donde buscar
+        
+        Yields:
+            (posición inicial, palabra, valor, prioridad)
+        """
+        if not isinstance(text, str) or not self._size:
+            return
+        for priority, word, value in self._empty:
+            yield 0, word, value, priority
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for i, ch in enumerate(self._normalize(text)):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for priority, word, value in output[state]:
+                yield i - len(word) + 1, word, value, priority
+    
+    def contains_any(self, text: str) -> bool:
+        """Indica si alguna palabra aparece en el texto."""
+        for _ in self.iter_matches(text):
+            return True
+        return False
+    
+    def find_all(self, text: str) -> List[str]:
+        """Palabras encontradas (sin repetir, en orden de aparición)."""
+        return list(dict.fromkeys(word for _, word, _, _ in self.iter_matches(text)))
+    
+    def first_by_priority(self, text: str) -> Optional[object]:
+        """
+        Valor de la palabra más prioritaria presente en el texto.
+        
+        Equivale a recorrer las palabras en orden de declaración y devolver
+        la primera que aparezca (`for kw in keywords: if kw in text`).
+        
+        Args:
+            text: Texto donde buscar
+        
+        Returns:
+            Valor asociado o None
+        """
+        best = None
+        for _, _, value, priority in self.iter_matches(text):
+            if best is None or priority < best[0]:
+                best = (priority, value)
+                if priority == 0:
+                    break
+        return best[1] if best is not None else None
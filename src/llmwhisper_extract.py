@@ -4,6 +4,13 @@ Extracción de texto desde PDF usando LLMWhisper (Unstract).
 - Si ya existe un .txt asociado al PDF, se usa ese archivo y no se llama a LLMWhisper.
 - Si no existe, se extrae con LLMWhisper (modo layout_preserving para extracción espacial) y se guarda el .txt.
 
+- Los lotes de páginas se envían en paralelo (max_workers) y se sondea su estado; los errores
+  transitorios (red, 429, 5xx) se reintentan con espera exponencial sin volver a enviar un lote
+  ya aceptado, y el texto se reensambla en orden de páginas.
+- Cada lote terminado se guarda en data/cache/llmwhisper (clave: hash del PDF + rango de
+  páginas + output_mode): si la extracción se interrumpe, al repetirla solo se piden los
+  rangos que faltan y el .txt final se arma desde la caché.
+
 Uso:
   from src.llmwhisper_extract import get_pdf_text_as_txt
   text = get_pdf_text_as_txt("pdf/Catalogo_Mamut_2025.pdf")
@@ -11,6 +18,14 @@ Uso:
 
 import os
 import sys
+import json
+import time
+import hashlib
+import tempfile
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Cliente LLMWhisperer: opcional
@@ -27,9 +42,89 @@ except (ModuleNotFoundError, ImportError):
 DEFAULT_BASE_URL = "https://llmwhisperer-api.us-central.unstract.com/api/v2"
 DEFAULT_API_KEY = os.environ.get("LLMWHISPERER_API_KEY", "HjCYwtq5w6-wIdCPWXPocgmdqt-uV-gEWy-9dtUQsIw")
 
+# Lotes en paralelo: solicitudes simultáneas, reintentos por lote y sondeo de estado
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_BACKOFF = 2.0
+DEFAULT_POLL_INTERVAL = 3.0
+
+# Texto por lote ya extraído (se paga por página: no repetir lotes terminados)
+DEFAULT_BATCH_CACHE_DIR = "data/cache/llmwhisper"
+
 _client = None
 
 
+class WhisperApiError(RuntimeError):
+    """Error devuelto por la API de LLMWhisperer (o lote que terminó en error)."""
+
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class WhisperBatchError(WhisperApiError):
+    """El lote terminó en estado de error: hay que volver a enviarlo."""
+
+
+class WhisperHttpClient:
+    """
+    Cliente mínimo de la API v2 de LLMWhisperer (solo biblioteca estándar).
+
+    Implementa lo que usa el modo en paralelo, con las mismas respuestas que
+    LLMWhispererClientV2: whisper() sin esperar (devuelve whisper_hash),
+    whisper_status() y whisper_retrieve(). Sirve cuando el cliente oficial no
+    está instalado y para probar contra un servidor local.
+    """
+
+    def __init__(self, base_url: str | None = None, api_key: str | None = None, api_timeout: int = 120):
+        self.base_url = (base_url or os.environ.get("LLMWHISPERER_BASE_URL_V2", DEFAULT_BASE_URL)).rstrip("/")
+        self.api_key = api_key or os.environ.get("LLMWHISPERER_API_KEY", DEFAULT_API_KEY)
+        self.api_timeout = api_timeout
+
+    def _request(self, method: str, endpoint: str, params: dict, data: bytes | None = None, timeout: float | None = None) -> dict:
+        url = f"{self.base_url}/{endpoint}?{urllib.parse.urlencode(params)}"
+        req = urllib.request.Request(url, data=data, method=method, headers={"unstract-key": self.api_key})
+        try:
+            with urllib.request.urlopen(req, timeout=timeout or self.api_timeout) as resp:
+                status, body = resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            status, body = e.code, e.read()
+        try:
+            message = json.loads(body.decode("utf-8")) if body else {}
+        except ValueError:
+            message = {"message": body.decode("utf-8", errors="replace")}
+        if status not in (200, 202):
+            raise WhisperApiError(f"{endpoint}: HTTP {status} {message.get('message', '')}".strip(), status)
+        message["status_code"] = status
+        return message
+
+    def whisper(
+        self,
+        file_path: str = "",
+        mode: str = "form",
+        output_mode: str = "layout_preserving",
+        pages_to_extract: str = "",
+        wait_for_completion: bool = False,
+        wait_timeout: int = 180,
+        encoding: str = "utf-8",
+        **_,
+    ) -> dict:
+        """Envía el PDF y devuelve la respuesta 202 con whisper_hash (no espera el resultado)."""
+        if wait_for_completion:
+            raise ValueError("WhisperHttpClient solo envía sin esperar: usa whisper_status/whisper_retrieve")
+        params = {"mode": mode, "output_mode": output_mode, "pages_to_extract": pages_to_extract}
+        data = Path(file_path).read_bytes()
+        return self._request("POST", "whisper", params, data=data, timeout=wait_timeout)
+
+    def whisper_status(self, whisper_hash: str) -> dict:
+        return self._request("GET", "whisper-status", {"whisper_hash": whisper_hash})
+
+    def whisper_retrieve(self, whisper_hash: str, encoding: str = "utf-8") -> dict:
+        extraction = self._request("GET", "whisper-retrieve", {"whisper_hash": whisper_hash})
+        status_code = extraction.pop("status_code")
+        return {"status_code": status_code, "extraction": extraction}
+
+
 def get_client():
     """Devuelve el cliente LLMWhisperer si está disponible."""
     global _client
@@ -57,13 +152,30 @@ def get_pdf_text_via_llmwhisper(
     output_mode: str = "layout_preserving",
     wait_timeout: int = 300,
     pages_per_batch: int = 20,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    total_pages: int | None = None,
+    client=None,
+    cache_dir: str | Path | None = DEFAULT_BATCH_CACHE_DIR,
 ) -> str:
     """
     Extrae texto del PDF usando LLMWhisper (modo layout_preserving por defecto para extracción espacial).
     Procesa en lotes de páginas para evitar límites de la API.
+    Con max_workers > 1 los lotes se envían a la vez (como mucho max_workers en curso),
+    se sondea su estado y los errores transitorios de cada lote se reintentan hasta
+    max_retries veces con espera exponencial (retry_backoff, 2*retry_backoff, ...); un
+    4xx falla de inmediato. El texto se une en orden de páginas.
     Guarda el resultado en txt_path si se indica.
+
+    total_pages: número de páginas si ya se conoce (si no, se cuenta con PyMuPDF).
+    client: cliente LLMWhisperer a usar (por defecto get_client()).
+    cache_dir: directorio donde se guarda el texto de cada lote al terminar; los lotes
+        ya presentes no se vuelven a pedir a la API (None = sin caché).
     """
-    client = get_client()
+    if client is None:
+        client = get_client()
     if client is None:
         raise ImportError(
             "LLMWhisperer no disponible. Instala: pip install llmwhisperer-client "
@@ -75,26 +187,56 @@ def get_pdf_text_via_llmwhisper(
         raise FileNotFoundError(f"PDF no encontrado: {pdf_path}")
 
     # Obtener número total de páginas del PDF
-    try:
-        import fitz  # PyMuPDF
-        doc = fitz.open(str(pdf_path))
-        total_pages = len(doc)
-        doc.close()
-        print(f"PDF tiene {total_pages} páginas")
-    except ImportError:
-        print("PyMuPDF no disponible, extrayendo todo el PDF en una sola llamada...")
-        total_pages = None
+    if total_pages is None:
+        try:
+            import fitz  # PyMuPDF
+            doc = fitz.open(str(pdf_path))
+            total_pages = len(doc)
+            doc.close()
+            print(f"PDF tiene {total_pages} páginas")
+        except ImportError:
+            print("PyMuPDF no disponible, extrayendo todo el PDF en una sola llamada...")
+    
+    pdf_hash = _file_hash(pdf_path) if cache_dir is not None else None
+    
+    def cache_file(page_range):
+        if pdf_hash is None:
+            return None
+        return Path(cache_dir) / pdf_hash[:16] / f"{output_mode}_{page_range}.txt"
     
     all_text = []
     
-    if total_pages and total_pages > pages_per_batch:
+    if total_pages and total_pages > pages_per_batch and max_workers > 1:
+        page_ranges = [
+            f"{start}-{min(start + pages_per_batch - 1, total_pages)}"
+            for start in range(1, total_pages + 1, pages_per_batch)
+        ]
+        print(f"  Extrayendo {len(page_ranges)} lotes de páginas en paralelo ({max_workers} a la vez)...")
+        
+        def run(page_range):
+            return _cached_batch(cache_file(page_range), lambda: _whisper_batch_with_retries(
+                client, pdf_path, page_range, output_mode, wait_timeout,
+                max_retries, retry_backoff, poll_interval,
+            ))
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # map conserva el orden de entrada: el texto queda en orden de páginas
+            batch_texts = list(pool.map(run, page_ranges))
+        
+        for page_range, batch_text in zip(page_ranges, batch_texts):
+            if batch_text:
+                all_text.append(f"<<< Páginas {page_range} >>>")
+                all_text.append(batch_text)
+        
+        text = "\n".join(all_text)
+    elif total_pages and total_pages > pages_per_batch:
         # Procesar en lotes
         for start_page in range(1, total_pages + 1, pages_per_batch):
             end_page = min(start_page + pages_per_batch - 1, total_pages)
             page_range = f"{start_page}-{end_page}"
             print(f"  Extrayendo páginas {page_range} de {total_pages}...")
             
-            result = client.whisper(
+            batch_text = _cached_batch(cache_file(page_range), lambda: _extract_text_from_result(client.whisper(
                 file_path=str(pdf_path),
                 mode="high_quality",
                 output_mode=output_mode,
@@ -102,9 +244,7 @@ def get_pdf_text_via_llmwhisper(
                 wait_timeout=wait_timeout,
                 encoding="utf-8",
                 pages_to_extract=page_range,
-            )
-            
-            batch_text = _extract_text_from_result(result)
+            )))
             if batch_text:
                 all_text.append(f"<<< Páginas {page_range} >>>")
                 all_text.append(batch_text)
@@ -112,15 +252,14 @@ def get_pdf_text_via_llmwhisper(
         text = "\n".join(all_text)
     else:
         # Procesar todo de una vez
-        result = client.whisper(
+        text = _cached_batch(cache_file("all"), lambda: _extract_text_from_result(client.whisper(
             file_path=str(pdf_path),
             mode="high_quality",
             output_mode=output_mode,
             wait_for_completion=True,
             wait_timeout=wait_timeout,
             encoding="utf-8",
-        )
-        text = _extract_text_from_result(result)
+        )))
 
     if txt_path is not None:
         txt_path = Path(txt_path)
@@ -131,6 +270,117 @@ def get_pdf_text_via_llmwhisper(
     return text
 
 
+def _file_hash(path: Path) -> str:
+    """SHA-256 del contenido del archivo (leído por bloques)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cached_batch(cache_file: Path | None, fetch) -> str:
+    """
+    Devuelve el texto del lote desde la caché o llamando a fetch().
+    El resultado nuevo se guarda apenas termina (escritura atómica), antes de
+    que acaben los demás lotes.
+    """
+    if cache_file is not None and cache_file.exists():
+        return cache_file.read_text(encoding="utf-8")
+    
+    text = fetch()
+    if cache_file is not None:
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=cache_file.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_name, cache_file)
+        except OSError as e:
+            # La caché es una optimización: el texto ya está en memoria
+            print(f"No se pudo guardar el lote en caché ({cache_file}): {e}", file=sys.stderr)
+    return text
+
+
+def _submit_batch(client, pdf_path: Path, page_range: str, output_mode: str, wait_timeout: int) -> tuple[str | None, str]:
+    """
+    Envía un lote sin bloquear. Devuelve (whisper_hash, "") o, si la API
+    respondió de forma síncrona, (None, texto).
+    """
+    submitted = client.whisper(
+        file_path=str(pdf_path),
+        mode="high_quality",
+        output_mode=output_mode,
+        wait_for_completion=False,
+        wait_timeout=wait_timeout,
+        encoding="utf-8",
+        pages_to_extract=page_range,
+    )
+    whisper_hash = submitted.get("whisper_hash")
+    if not whisper_hash:
+        # Respuesta síncrona (200): el resultado ya viene en la respuesta
+        return None, _extract_text_from_result(submitted)
+    return whisper_hash, ""
+
+
+def _wait_batch(client, whisper_hash: str, page_range: str, wait_timeout: int, poll_interval: float) -> str:
+    """Sondea el estado de un lote ya enviado hasta 'processed' y devuelve su texto."""
+    deadline = time.monotonic() + wait_timeout
+    while True:
+        status = client.whisper_status(whisper_hash=whisper_hash).get("status", "")
+        if status == "processed":
+            break
+        if "error" in status:
+            raise WhisperBatchError(f"Lote {page_range} terminó con estado '{status}'")
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Lote {page_range} sin terminar tras {wait_timeout}s")
+        time.sleep(poll_interval)
+    
+    return _extract_text_from_result(client.whisper_retrieve(whisper_hash=whisper_hash))
+
+
+def _is_transient(error: Exception) -> bool:
+    """
+    Errores que vale la pena reintentar: tiempo agotado, red, 429, 5xx y lotes
+    en estado de error. Un 4xx (clave inválida, rango de páginas mal formado)
+    no cambia al repetir.
+    """
+    status_code = getattr(error, "status_code", None)
+    if isinstance(status_code, int):
+        return status_code == 429 or status_code >= 500
+    # TimeoutError, URLError y errores de conexión son OSError
+    return isinstance(error, (OSError, WhisperApiError))
+
+
+def _whisper_batch_with_retries(
+    client, pdf_path: Path, page_range: str, output_mode: str, wait_timeout: int,
+    max_retries: int, retry_backoff: float, poll_interval: float,
+) -> str:
+    """
+    Ejecuta un lote reintentando con espera exponencial; relanza el último error.
+    
+    El lote se envía una sola vez: si falla el sondeo o la descarga se vuelve a
+    consultar el mismo whisper_hash (cada envío se cobra por página). Solo se
+    reenvía si el envío no llegó a aceptarse o si el lote terminó en error.
+    """
+    whisper_hash = None
+    for attempt in range(max_retries + 1):
+        try:
+            if whisper_hash is None:
+                whisper_hash, text = _submit_batch(client, pdf_path, page_range, output_mode, wait_timeout)
+                if whisper_hash is None:
+                    return text
+            return _wait_batch(client, whisper_hash, page_range, wait_timeout, poll_interval)
+        except Exception as e:
+            if attempt == max_retries or not _is_transient(e):
+                raise
+            if isinstance(e, WhisperBatchError):
+                whisper_hash = None
+            delay = retry_backoff * (2 ** attempt)
+            print(f"  Lote {page_range} falló ({e}); reintento {attempt + 1}/{max_retries} en {delay:.1f}s", file=sys.stderr)
+            time.sleep(delay)
+
+
 def _extract_text_from_result(result) -> str:
     """Extrae el texto del resultado de LLMWhisper."""
     text = ""
@@ -0,0 +1,142 @@
+"""
+MEMO.PY - Memoización de resultados por nombre de producto
+Responsabilidad: Calcular cada transformación una sola vez por nombre único
+Método: LRU acotado por etapa + factorize/broadcast sobre columnas
+Salida: Series con el mismo índice que la entrada + contadores de aciertos
+"""
+
+import pandas as pd
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MemoStats:
+    """Contadores de una función memoizada"""
+    hits: int = 0
+    misses: int = 0
+    
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class NameMemo:
+    """
+    Memoización compartida entre etapas del pipeline.
+    - Un LRU acotado por función (namespace), clave = nombre crudo o limpio
+    - `map` calcula una vez por valor único y difunde el resultado a todas
+      las filas (los catálogos repiten el mismo nombre en bodegas y lotes)
+    - Contadores hit/miss por función para auditar el ahorro
+    """
+    
+    def __init__(self, maxsize: int = 100_000):
+        """
+        Inicializa la memoización.
+        
+        Args:
+            maxsize: Máximo de entradas por función (LRU)
+        """
+        self.maxsize = maxsize
+        self._caches: Dict[str, OrderedDict] = {}
+        self.stats: Dict[str, MemoStats] = {}
+    
+    def _cache(self, namespace: str) -> OrderedDict:
+        cache = self._caches.get(namespace)
+        if cache is None:
+            cache = self._caches[namespace] = OrderedDict()
+            self.stats[namespace] = MemoStats()
+        return cache
+    
+    def get(self, namespace: str, key: Hashable, func: Callable[[Any], Any]) -> Any:
+        """
+        Devuelve func(key) desde el LRU o lo calcula y lo guarda.
+        
+        Solo se memoizan claves str (NaN/None no son claves estables).
+        
+        Args:
+            namespace: Identificador de la función/etapa
+            key: Nombre (crudo o limpio)
+            func: Función a memoizar
+        
+        Returns:
+            Resultado de func(key)
+        """
+        cache = self._cache(namespace)
+        stats = self.stats[namespace]
+        if not isinstance(key, str):
+            stats.misses += 1
+            return func(key)
+        
+        try:
+            value = cache[key]
+        except KeyError:
+            stats.misses += 1
+            value = cache[key] = func(key)
+            if len(cache) > self.maxsize:
+                cache.popitem(last=False)
+            return value
+        
+        stats.hits += 1
+        cache.move_to_end(key)
+        return value
+    
+    def map(self, series: pd.Series, func: Callable[[Any], Any], namespace: str) -> pd.Series:
+        """
+        Aplica func una vez por valor único de la serie y difunde el resultado.
+        
+        Equivalente a `series.apply(func)` (mismo índice y mismo dtype
+        inferido), pero con costo proporcional a los nombres únicos.
+        
+        Args:
+            series: Columna de nombres
+            func: Función a aplicar por valor
+            namespace: Identificador de la función/etapa
+        
+        Returns:
+            Serie resultado alineada con `series`
+        """
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+        unique_series = pd.Series(uniques, dtype=object)
+        computed = unique_series.map(lambda value: self.get(namespace, value, func))
+        
+        # Las filas repetidas se sirven sin recalcular
+        self.record(namespace, hits=len(series) - len(unique_series))
+        
+        result = computed.take(codes)
+        result.index = series.index
+        result.name = series.name
+        return result
+    
+    def record(self, namespace: str, hits: int = 0, misses: int = 0) -> None:
+        """
+        Suma contadores calculados fuera del LRU (p. ej. extracción por columnas).
+        
+        Args:
+            namespace: Identificador de la función/etapa
+            hits: Filas servidas sin recalcular
+            misses: Valores calculados
+        """
+        self._cache(namespace)
+        self.stats[namespace].hits += hits
+        self.stats[namespace].misses += misses
+    
+    def clear(self) -> None:
+        """Vacía todos los LRU (los contadores se conservan)."""
+        for cache in self._caches.values():
+            cache.clear()
+    
+    def get_summary(self) -> str:
+        """Genera resumen de aciertos por función."""
+        lines = ["Memoización por nombre:"]
+        for namespace, stats in self.stats.items():
+            lines.append(
+                f"  • {namespace}: {stats.hits} hits / {stats.misses} misses "
+                f"({stats.hit_rate * 100:.1f}%)"
+            )
+        return "\n".join(lines)
@@ -6,11 +6,14 @@ Salida: Columnas con atributos extraídos + confianza de extracción
 """
 
 import pandas as pd
+import numpy as np
 import re
 import logging
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Pattern
 from dataclasses import dataclass
-import yaml
+
+from src.memo import NameMemo
+from src.rules import CompiledRules
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +28,106 @@ class ExtractedAttribute:
     confidence: float = 1.0  # 0-1
 
 
+# Flags globales al inicio de un patrón: "(?i)acero" → se convierten en
+# flags de alcance "(?i:acero)" para poder fusionarlo en una alternancia
+_LEADING_FLAGS_RE = re.compile(r'^\(\?([aiLmsux]+)\)')
+
+
+def _has_nested_groups(pattern: str) -> bool:
+    """
+    Indica si un patrón tiene grupos de captura anidados.
+    
+    Con grupos planos, `match.lastindex` es el último grupo que participó;
+    eso permite reconstruirlo desde `str.extractall` (modo vectorizado).
+    """
+    stack = []  # True = grupo de captura abierto
+    i = 0
+    in_class = False
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if in_class:
+            if ch == ']':
+                in_class = False
+        elif ch == '[':
+            in_class = True
+            # "]" inmediatamente después de "[" o "[^" es literal
+            if pattern[i + 1:i + 2] == '^':
+                i += 1
+            if pattern[i + 1:i + 2] == ']':
+                i += 1
+        elif ch == '(':
+            capturing = not pattern.startswith('(?', i) or pattern.startswith('(?P<', i)
+            if capturing and any(stack):
+                return True
+            stack.append(capturing)
+        elif ch == ')' and stack:
+            stack.pop()
+        i += 1
+    return False
+
+
+@dataclass
+class CompiledAttributePatterns:
+    """
+    Patrones de un atributo compilados una sola vez.
+    
+    - patterns: (patrón fuente, regex compilado) en el orden original
+    - combined: alternancia de todos los patrones con grupos nombrados
+      (?P<_p0>...)|(?P<_p1>...) que permite descartar el atributo con un
+      único escaneo del nombre
+    """
+    name: str
+    patterns: List[Tuple[str, Pattern]]
+    combined: Optional[Pattern] = None
+
+
+def compile_attribute_patterns(attr_name: str, patterns: List[str]) -> CompiledAttributePatterns:
+    """
+    Compila los patrones de un atributo y su alternancia fusionada.
+    
+    Los patrones inválidos se registran y se descartan aquí (una sola vez)
+    en lugar de fallar en cada producto.
+    
+    Args:
+        attr_name: Nombre del atributo
+        patterns: Lista de regexes fuente
+    
+    Returns:
+        CompiledAttributePatterns listo para escanear
+    """
+    compiled = []
+    branches = []
+    for pattern in patterns:
+        try:
+            regex = re.compile(pattern, re.IGNORECASE)
+        except re.error as e:
+            logger.warning(f"Error en regex para {attr_name}: {str(e)}")
+            continue
+        
+        body = pattern
+        flags_match = _LEADING_FLAGS_RE.match(body)
+        if flags_match:
+            body = f"(?{flags_match.group(1)}:{body[flags_match.end():]})"
+        
+        branches.append(f"(?P<_p{len(compiled)}>{body})")
+        compiled.append((pattern, regex))
+    
+    # Con un solo patrón el escaneo ya es único: no hace falta alternancia
+    combined = None
+    if len(branches) > 1:
+        try:
+            combined = re.compile('|'.join(branches), re.IGNORECASE)
+        except re.error:
+            # Patrones no fusionables (p. ej. backreferences numéricas):
+            # se escanean por separado
+            combined = None
+    
+    return CompiledAttributePatterns(name=attr_name, patterns=compiled, combined=combined)
+
+
 class PatternExtractor:
     """
     Extrae atributos técnicos de nombres de productos.
@@ -59,41 +162,60 @@ class PatternExtractor:
         ]
     }
     
-    def __init__(self, rules_path: str = 'config/rules.yaml'):
+    # Unidad estándar por atributo
+    UNIT_MAP = {
+        'diametro': 'pulgada/mm',
+        'largo': 'cm/m',
+        'grosor': 'mm',
+        'peso': 'kg/g',
+        'cantidad': 'unidades'
+    }
+    
+    def __init__(self, rules_path: str = 'config/rules.yaml', memo: Optional[NameMemo] = None,
+                 compiled_rules: Optional[CompiledRules] = None):
         """
         Inicializa extractor de patrones.
         
         Args:
             rules_path: Path al archivo de reglas
+            memo: Memoización por nombre compartida entre etapas (opcional)
+            compiled_rules: Reglas ya compiladas (por defecto, las compartidas
+                del proceso para rules_path)
         """
-        self.rules = self._load_rules(rules_path)
-        self._merge_patterns()
+        self.memo = memo if memo is not None else NameMemo()
+        self._memo_namespace = f"PatternExtractor[{rules_path}]"
+        self.compiled_rules = compiled_rules if compiled_rules is not None else CompiledRules.load(rules_path)
+        self.rules = self.compiled_rules.rules
+        self.patterns, self.compiled_patterns = self.compiled_rules.artifact(
+            'patterns.compiled', self._compile_patterns, fingerprint=self.UNIVERSAL_PATTERNS
+        )
         logger.info("Extractor de patrones inicializado")
     
-    def _load_rules(self, rules_path: str) -> Dict:
-        """Carga reglas desde YAML."""
-        try:
-            with open(rules_path, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
-        except FileNotFoundError:
-            logger.warning(f"Reglas no encontradas: {rules_path}")
-            return {}
-    
-    def _merge_patterns(self) -> None:
+    def _merge_patterns(self) -> Dict[str, List[str]]:
         """Fusiona patrones de config con patrones universales."""
-        self.patterns = {}
+        patterns = {}
         
         # Primero agregar patrones universales
         for attr, regex_list in self.UNIVERSAL_PATTERNS.items():
-            self.patterns[attr] = regex_list.copy()
+            patterns[attr] = regex_list.copy()
         
         # Luego agregar/overwrite con los de config (si existen)
         if 'attributes' in self.rules:
             for attr_name, attr_config in self.rules['attributes'].items():
                 if 'patterns' in attr_config:
-                    if attr_name not in self.patterns:
-                        self.patterns[attr_name] = []
-                    self.patterns[attr_name].extend(attr_config['patterns'])
+                    if attr_name not in patterns:
+                        patterns[attr_name] = []
+                    patterns[attr_name].extend(attr_config['patterns'])
+        return patterns
+    
+    def _compile_patterns(self) -> Tuple[Dict[str, List[str]], Dict[str, CompiledAttributePatterns]]:
+        """Fusiona y precompila todos los patrones (una vez por YAML)."""
+        patterns = self._merge_patterns()
+        compiled_patterns = {
+            attr: compile_attribute_patterns(attr, regex_list)
+            for attr, regex_list in patterns.items()
+        }
+        return patterns, compiled_patterns
     
     def extract_all_attributes(self, product_name: str) -> Dict[str, List[ExtractedAttribute]]:
         """
@@ -111,9 +233,9 @@ class PatternExtractor:
         results = {}
         product_name = str(product_name).upper()
         
-        # Ejecutar cada extractor de atributo
-        for attr_name, patterns in self.patterns.items():
-            extracted = self._extract_attribute(product_name, attr_name, patterns)
+        # Ejecutar cada extractor de atributo (patrones precompilados)
+        for attr_name, compiled in self.compiled_patterns.items():
+            extracted = self._scan_attribute(product_name, compiled)
             if extracted:
                 results[attr_name] = extracted
         
@@ -131,62 +253,74 @@ class PatternExtractor:
         Returns:
             Lista de atributos extraídos
         """
+        compiled = self.compiled_patterns.get(attr_name)
+        if compiled is None or [src for src, _ in compiled.patterns] != list(patterns):
+            compiled = compile_attribute_patterns(attr_name, patterns)
+        return self._scan_attribute(text, compiled)
+    
+    def _scan_attribute(self, text: str, compiled: CompiledAttributePatterns) -> List[ExtractedAttribute]:
+        """
+        Escanea un atributo con sus patrones precompilados.
+        
+        La alternancia fusionada hace un único escaneo del nombre: si ningún
+        patrón coincide (el caso común) el atributo se descarta sin más
+        trabajo. Si hay coincidencia, cada patrón se recorre en su orden
+        original para conservar exactamente los valores, las coincidencias
+        solapadas entre patrones y el `pattern_used` de cada extracción.
+        
+        Args:
+            text: Texto donde buscar
+            compiled: Patrones compilados del atributo
+        
+        Returns:
+            Lista de atributos extraídos
+        """
+        if compiled.combined is not None and compiled.combined.search(text) is None:
+            return []
+        
         extracted_values = set()  # Usar set para evitar duplicados
         results = []
+        attr_name = compiled.name
+        unit = self.UNIT_MAP.get(attr_name)
         
-        for pattern in patterns:
-            try:
-                matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern, regex in compiled.patterns:
+            for match in regex.finditer(text):
+                # Obtener valor (grupo 1, o grupos 1+2 si hay fracciones)
+                if match.lastindex == 1:
+                    value = match.group(1)
+                elif match.lastindex == 2:
+                    # Caso de fracciones: 1 1/8
+                    value = f"{match.group(1)} {match.group(2)}/8\""
+                else:
+                    continue
                 
-                for match in matches:
-                    # Obtener valor (grupo 1, o grupos 1+2 si hay fracciones)
-                    if match.lastindex == 1:
-                        value = match.group(1)
-                    elif match.lastindex == 2:
-                        # Caso de fracciones: 1 1/8
-                        value = f"{match.group(1)} {match.group(2)}/8\""
-                    else:
-                        continue
-                    
-                    # Evitar duplicados
-                    if value not in extracted_values:
-                        extracted_values.add(value)
-                        
-                        # Obtener unidad si existe en config
-                        unit = self._get_unit_for_attribute(attr_name)
-                        
-                        results.append(ExtractedAttribute(
-                            name=attr_name,
-                            value=value,
-                            unit=unit,
-                            pattern_used=pattern,
-                            confidence=0.95  # Regex con alta confianza
-                        ))
-            
-            except re.error as e:
-                logger.warning(f"Error en regex para {attr_name}: {str(e)}")
-                continue
+                # Evitar duplicados
+                if value not in extracted_values:
+                    extracted_values.add(value)
+                    results.append(ExtractedAttribute(
+                        name=attr_name,
+                        value=value,
+                        unit=unit,
+                        pattern_used=pattern,
+                        confidence=0.95  # Regex con alta confianza
+                    ))
         
         return results
     
     def _get_unit_for_attribute(self, attr_name: str) -> Optional[str]:
         """Obtiene unidad estándar para atributo."""
-        unit_map = {
-            'diametro': 'pulgada/mm',
-            'largo': 'cm/m',
-            'grosor': 'mm',
-            'peso': 'kg/g',
-            'cantidad': 'unidades'
-        }
-        return unit_map.get(attr_name)
+        return self.UNIT_MAP.get(attr_name)
     
-    def extract_to_dataframe(self, df: pd.DataFrame, name_column: str = 'Nombre_Limpio') -> pd.DataFrame:
+    def extract_to_dataframe(self, df: pd.DataFrame, name_column: str = 'Nombre_Limpio',
+                             vectorized: bool = True) -> pd.DataFrame:
         """
         Extrae atributos para todo el DataFrame.
         
         Args:
             df: DataFrame con productos
             name_column: Columna con nombres a procesar
+            vectorized: Si True, extrae por columnas con `str.extractall`;
+                si False, usa el recorrido fila a fila (referencia)
         
         Returns:
             DataFrame original + columnas de atributos extraídos
@@ -195,16 +329,30 @@ class PatternExtractor:
         
         logger.info(f"Extrayendo atributos de {len(df)} registros...")
         
-        # Estructuras para guardar resultados
-        all_extracted = []
+        if name_column in df.columns:
+            names = df[name_column]
+        else:
+            names = pd.Series('', index=df.index, dtype=object)
         
-        for idx, row in df.iterrows():
-            name = row.get(name_column, '')
-            attributes = self.extract_all_attributes(name)
-            all_extracted.append(attributes)
+        if vectorized:
+            # Extraer una vez por nombre único y difundir por posición
+            codes, uniques = pd.factorize(names, use_na_sentinel=False)
+            unique_columns = self._extract_columns_vectorized(pd.Series(uniques, dtype=object))
+            columns = {
+                attr: tuple(np.asarray(col)[codes] for col in cols)
+                for attr, cols in unique_columns.items()
+            }
+            self.memo.record(f"{self._memo_namespace}.extract_to_dataframe",
+                             hits=len(names) - len(uniques), misses=len(uniques))
+        else:
+            all_extracted = self.memo.map(
+                names, self.extract_all_attributes,
+                f"{self._memo_namespace}.extract_all_attributes"
+            ).tolist()
+            columns = self._attributes_to_columns(all_extracted)
         
         # Procesar resultados y agregarlos al DataFrame
-        df = self._flatten_attributes_to_columns(df, all_extracted)
+        df = self._assign_attribute_columns(df, columns)
         
         logger.info("✓ Extracción de atributos completada")
         
@@ -217,33 +365,185 @@ class PatternExtractor:
         
         Args:
             df: DataFrame original
-            extracted_list: Lista de dicts con atributos extraídos
+            extracted_list: Lista de dicts con atributos extraídos (por posición)
         
         Returns:
             DataFrame con nuevas columnas
         """
+        return self._assign_attribute_columns(df, self._attributes_to_columns(extracted_list))
+    
+    def _attributes_to_columns(self, extracted_list: List[Dict]) -> Dict[str, Tuple[list, list, list]]:
+        """
+        Convierte extracciones por fila en listas por atributo.
+        
+        Args:
+            extracted_list: Lista de dicts con atributos extraídos (por posición)
+        
+        Returns:
+            Dict {atributo: (valores, confianzas, cantidades)}
+        """
         # Identificar todos los atributos únicos
         all_attributes = set()
         for extracted in extracted_list:
             all_attributes.update(extracted.keys())
         
-        # Crear columnas para cada atributo
+        n = len(extracted_list)
+        columns = {}
         for attr in sorted(all_attributes):
-            df[f'Atributo_{attr}'] = None
-            df[f'Atributo_{attr}_confianza'] = 0.0
-            df[f'Atributo_{attr}_cantidad'] = 0
-        
-        # Llenar datos
-        for idx, extracted in enumerate(extracted_list):
-            for attr, values in extracted.items():
-                if values:
+            values, confidences, counts = [None] * n, [0.0] * n, [0] * n
+            for pos, extracted in enumerate(extracted_list):
+                found = extracted.get(attr)
+                if found:
                     # Valor principal (primer match)
-                    df.at[idx, f'Atributo_{attr}'] = values[0].value
-                    df.at[idx, f'Atributo_{attr}_confianza'] = values[0].confidence
-                    df.at[idx, f'Atributo_{attr}_cantidad'] = len(values)
+                    values[pos] = found[0].value
+                    confidences[pos] = found[0].confidence
+                    counts[pos] = len(found)
+            columns[attr] = (values, confidences, counts)
+        
+        return columns
+    
+    def _assign_attribute_columns(self, df: pd.DataFrame,
+                                  columns: Dict[str, Tuple[list, list, list]]) -> pd.DataFrame:
+        """
+        Agrega en bloque las columnas Atributo_* (sin escrituras celda a celda).
+        
+        Args:
+            df: DataFrame destino (cualquier índice)
+            columns: Dict {atributo: (valores, confianzas, cantidades)}
+        
+        Returns:
+            DataFrame con nuevas columnas
+        """
+        new_columns = {}
+        for attr in sorted(columns):
+            values, confidences, counts = columns[attr]
+            new_columns[f'Atributo_{attr}'] = pd.Series(values, index=df.index, dtype=object)
+            new_columns[f'Atributo_{attr}_confianza'] = pd.Series(confidences, index=df.index, dtype='float64')
+            new_columns[f'Atributo_{attr}_cantidad'] = pd.Series(counts, index=df.index, dtype='int64')
+        
+        for col, series in new_columns.items():
+            df[col] = series
         
         return df
     
+    def _extract_columns_vectorized(self, names: pd.Series) -> Dict[str, Tuple[list, list, list]]:
+        """
+        Extrae atributos por columnas con `Series.str.extractall`.
+        
+        Mismas reglas que `extract_all_attributes`:
+        - Orden de valores: patrón (en orden) y luego posición del match
+        - Valor = grupo 1, o "g1 g2/8\"" si el último grupo es el 2
+        - Duplicados por fila descartados; el primero es el valor principal
+        
+        Nota: `extractall` trata capturas vacías ('') como sin valor; ningún
+        patrón de atributos captura texto vacío.
+        
+        Args:
+            names: Serie de nombres (cualquier índice)
+        
+        Returns:
+            Dict {atributo: (valores, confianzas, cantidades)}
+        """
+        n = len(names)
+        valid = np.fromiter((isinstance(v, str) and bool(v.strip()) for v in names),
+                            dtype=bool, count=n)
+        positions = np.flatnonzero(valid)
+        texts = pd.Series(names.to_numpy(dtype=object)[valid], index=positions,
+                          dtype=object).str.upper()
+        
+        columns = {}
+        for attr_name, compiled in self.compiled_patterns.items():
+            subset = texts
+            if compiled.combined is not None and len(subset):
+                # Escaneo único con la alternancia fusionada
+                search = compiled.combined.search
+                hit = np.fromiter((search(text) is not None for text in subset),
+                                  dtype=bool, count=len(subset))
+                subset = subset[hit]
+            if not len(subset):
+                continue
+            
+            parts = []
+            for order, (pattern, regex) in enumerate(compiled.patterns):
+                part = self._extract_pattern_vectorized(subset, regex)
+                if part is not None and len(part):
+                    part['orden'] = order
+                    parts.append(part)
+            if not parts:
+                continue
+            
+            found = pd.concat(parts, ignore_index=True)
+            found = found.sort_values(['pos', 'orden', 'match'], kind='mergesort')
+            found = found.drop_duplicates(['pos', 'value'], keep='first')
+            
+            grouped = found.groupby('pos', sort=False)['value']
+            first = grouped.first()
+            counts = grouped.size()
+            
+            values = np.full(n, None, dtype=object)
+            values[first.index.to_numpy()] = first.to_numpy(dtype=object)
+            confidences = np.zeros(n, dtype='float64')
+            confidences[first.index.to_numpy()] = 0.95  # Regex con alta confianza
+            quantities = np.zeros(n, dtype='int64')
+            quantities[counts.index.to_numpy()] = counts.to_numpy()
+            columns[attr_name] = (values, confidences, quantities)
+        
+        return columns
+    
+    @staticmethod
+    def _extract_pattern_vectorized(texts: pd.Series, regex: Pattern) -> Optional[pd.DataFrame]:
+        """
+        Aplica un patrón compilado a una serie y devuelve sus valores.
+        
+        Args:
+            texts: Nombres en mayúsculas indexados por posición
+            regex: Patrón compilado
+        
+        Returns:
+            DataFrame con columnas pos, match, value (o None si no aplica)
+        """
+        if regex.groups == 0:
+            # Sin grupos no hay lastindex: el patrón nunca aporta valores
+            return None
+        
+        if _has_nested_groups(regex.pattern):
+            # lastindex no se puede reconstruir desde extractall: fila a fila
+            rows = []
+            for pos, text in texts.items():
+                for i, match in enumerate(regex.finditer(text)):
+                    if match.lastindex == 1:
+                        rows.append((pos, i, match.group(1)))
+                    elif match.lastindex == 2:
+                        rows.append((pos, i, f"{match.group(1)} {match.group(2)}/8\""))
+            return pd.DataFrame(rows, columns=['pos', 'match', 'value'])
+        
+        matches = texts.str.extractall(regex)
+        if matches.empty:
+            return None
+        
+        groups = matches.to_numpy(dtype=object)
+        present = pd.notna(groups)
+        # lastindex = último grupo que participó (1-based, 0 = ninguno)
+        last = np.where(present.any(axis=1),
+                        groups.shape[1] - np.argmax(present[:, ::-1], axis=1), 0)
+        
+        first = groups[:, 0]
+        values = np.full(len(groups), None, dtype=object)
+        values[last == 1] = first[last == 1]
+        if groups.shape[1] >= 2:
+            is_fraction = last == 2
+            values[is_fraction] = [
+                f"{g1 if pd.notna(g1) else None} {g2}/8\""
+                for g1, g2 in zip(first[is_fraction], groups[is_fraction, 1])
+            ]
+        
+        keep = (last == 1) | (last == 2)
+        return pd.DataFrame({
+            'pos': matches.index.get_level_values(0).to_numpy()[keep],
+            'match': matches.index.get_level_values('match').to_numpy()[keep],
+            'value': values[keep],
+        })
+    
     def get_extraction_summary(self, df: pd.DataFrame) -> str:
         """
         Genera resumen de extracciones realizadas.
@@ -275,18 +575,22 @@ class PatternExtractor:
 
 
 # Funciones de conveniencia
-def extract_attributes(df: pd.DataFrame, rules_path: str = 'config/rules.yaml') -> pd.DataFrame:
+def extract_attributes(df: pd.DataFrame, rules_path: str = 'config/rules.yaml',
+                       memo: Optional[NameMemo] = None,
+                       compiled_rules: Optional[CompiledRules] = None) -> pd.DataFrame:
     """
     Extrae atributos técnicos de productos.
     
     Args:
         df: DataFrame con productos
         rules_path: Path a archivo de reglas
+        memo: Memoización por nombre compartida entre etapas (opcional)
+        compiled_rules: Reglas compiladas compartidas (opcional)
     
     Returns:
         DataFrame con atributos extraídos
     """
-    extractor = PatternExtractor(rules_path)
+    extractor = PatternExtractor(rules_path, memo=memo, compiled_rules=compiled_rules)
     df_extracted = extractor.extract_to_dataframe(df)
     print(extractor.get_extraction_summary(df_extracted))
     return df_extracted
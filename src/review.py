@@ -6,6 +6,7 @@ Salida: Excel en data/processed/ listo para revisión humana
 """
 
 import pandas as pd
+import numpy as np
 import logging
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime
@@ -244,7 +245,7 @@ class ReviewFormatter:
             review_df['Categorías'] = df.get('Familia_Detectada', '').fillna('Otros')
         
         # Etiquetas (de atributos)
-        review_df['Etiquetas'] = df.apply(self._generate_tags, axis=1)
+        review_df['Etiquetas'] = self._generate_tags_column(df)
         
         # Clase de envío
         review_df['Clase de envío'] = ''
@@ -289,7 +290,7 @@ class ReviewFormatter:
         review_df = self._add_woocommerce_attributes(review_df, df)
         
         # Columnas de auditoría
-        review_df['Confianza_Automática'] = df.apply(self._calculate_confidence, axis=1)
+        review_df['Confianza_Automática'] = self._calculate_confidence_column(df)
         review_df['Revisado_Humano'] = 'No'
         review_df['Notas_Revisión'] = ''
         
@@ -468,6 +469,9 @@ class ReviewFormatter:
         - Convierte hijos a 'variation'
         - Recolecta TODOS los valores de atributos para el padre
         
+        Una sola agrupación por clave de padre entrega las posiciones de los
+        hijos; nombres base, atributos y filas padre se arman en bloque.
+        
         Args:
             df_src: DataFrame fuente con datos originales
             review_df: DataFrame de revisión en proceso
@@ -484,7 +488,8 @@ class ReviewFormatter:
             return result
         
         # Identificar grupos por SKU_Parent temporal
-        current_parent_keys = [p for p in result['_SKU_Parent_Temp'].dropna().unique().tolist() if p != '']
+        parent_temp = result['_SKU_Parent_Temp']
+        current_parent_keys = [p for p in parent_temp.dropna().unique().tolist() if p != '']
         if not current_parent_keys:
             return result
         
@@ -503,26 +508,57 @@ class ReviewFormatter:
         # Conjunto de SKUs ya tomados
         taken_skus = set(str(x) for x in result['SKU'].fillna('').tolist() if x)
         
-        # Mapeo grupo -> nombre base
+        # Código de grupo por fila (-1 = sin grupo):
+        # - hijos: su _SKU_Parent_Temp
+        # - registro original sin padre cuyo SKU coincide con la clave
+        key_codes, str_key_codes = {}, {}
+        for code, key in enumerate(current_parent_keys):
+            key_codes.setdefault(key, code)
+            str_key_codes.setdefault(str(key), code)
+        without_parent = (parent_temp.isna() | (parent_temp == '')).to_numpy()
+        child_codes = parent_temp.map(key_codes).fillna(-1).to_numpy(dtype=int)
+        original_codes = result['SKU'].astype(str).map(str_key_codes).fillna(-1).to_numpy(dtype=int)
+        codes = np.where(without_parent, original_codes, child_codes)
+        
+        # Posiciones (en orden de filas) de los hijos de cada grupo
+        group_positions = pd.Series(codes).groupby(codes).indices
+        
+        # Mapeo grupo -> nombre base (moda de Nombre_Base entre sus hijos)
         group_name_map = {}
         if 'Nombre_Base' in df_src.columns:
-            for key in current_parent_keys:
-                mask = df_src['SKU_Parent'] == key
-                if mask.any():
-                    base_counts = df_src.loc[mask, 'Nombre_Base'].fillna('').value_counts()
-                    if len(base_counts) > 0:
-                        group_name_map[key] = base_counts.index[0]
-                    else:
-                        group_name_map[key] = str(df_src.loc[mask, 'Nombre_Limpio'].iloc[0])
+            src_keys = df_src['SKU_Parent'].to_numpy(dtype=object)
+            in_groups = df_src['SKU_Parent'].isin(current_parent_keys).to_numpy()
+            base_counts = pd.DataFrame({
+                'key': src_keys[in_groups],
+                'base': df_src['Nombre_Base'].fillna('').to_numpy(dtype=object)[in_groups],
+            }).groupby(['key', 'base'], sort=False).size()
+            if len(base_counts) > 0:
+                # idxmax = primera base con la cuenta máxima (igual que value_counts)
+                for key, (_, base) in base_counts.groupby(level=0, sort=False).idxmax().items():
+                    group_name_map[key] = base
         else:
-            for key in current_parent_keys:
-                mask = result['_SKU_Parent_Temp'] == key
-                if mask.any():
-                    group_name_map[key] = str(result.loc[mask, 'Nombre'].iloc[0])
+            names = result['Nombre'].to_numpy(dtype=object)
+            child_first = pd.Series(np.arange(len(result)))[child_codes >= 0].groupby(
+                child_codes[child_codes >= 0]).first()
+            for code, pos in child_first.items():
+                group_name_map.setdefault(current_parent_keys[code], str(names[pos]))
+        
+        # Columnas de atributos (nombre, valores) presentes
+        attr_slots = [
+            (i, f'Nombre del atributo {i}', f'Valor(es) del atributo {i}')
+            for i in range(1, 4)
+            if f'Nombre del atributo {i}' in result.columns and f'Valor(es) del atributo {i}' in result.columns
+        ]
+        attr_arrays = {
+            i: (result[name_col].to_numpy(dtype=object), result[val_col].to_numpy(dtype=object))
+            for i, name_col, val_col in attr_slots
+        }
         
-        # Crear filas padre y actualizar variaciones
-        parent_rows = []
-        for key in current_parent_keys:
+        # Generar SKU padre y recolectar datos por grupo (en orden de claves)
+        new_parent_skus = np.empty(len(current_parent_keys), dtype=object)
+        processed = np.zeros(len(current_parent_keys), dtype=bool)
+        parent_specs = []
+        for code, key in enumerate(current_parent_keys):
             base_name = group_name_map.get(key)
             if not base_name:
                 continue
@@ -530,116 +566,122 @@ class ReviewFormatter:
             new_parent_sku = gen_parent_sku(base_name, taken_skus)
             taken_skus.add(new_parent_sku)
             
-            # Encontrar todas las variaciones de este grupo
-            mask_children = result['_SKU_Parent_Temp'] == key
-            # También incluir el registro original si su SKU == key
-            mask_original = (result['SKU'].astype(str) == str(key)) & (
-                (result['_SKU_Parent_Temp'].isna()) | (result['_SKU_Parent_Temp'] == '')
-            )
-            mask_all_children = mask_children | mask_original
-            
-            if not mask_all_children.any():
+            positions = group_positions.get(code)
+            if positions is None or len(positions) == 0:
                 continue
+            new_parent_skus[code] = new_parent_sku
+            processed[code] = True
             
-            # Actualizar variaciones
-            result.loc[mask_all_children, 'Tipo'] = 'variation'
-            result.loc[mask_all_children, '_SKU_Parent_Temp'] = new_parent_sku
-            
-            # Restaurar SKU original si existe
-            if 'SKU_Original' in result.columns:
-                for idx in result.index[mask_all_children]:
-                    orig = result.at[idx, 'SKU_Original']
-                    if orig and str(orig).strip():
-                        result.at[idx, 'SKU'] = str(orig)
-            
-            # Recolectar TODOS los valores de atributos para el padre
-            children_df = result[mask_all_children]
-            
-            # Obtener valores únicos de cada atributo para el padre
+            # Valores únicos de cada atributo (preservar orden, quitar duplicados)
             parent_attr_values = {}
-            for i in range(1, 4):
-                val_col = f'Valor(es) del atributo {i}'
-                name_col = f'Nombre del atributo {i}'
-                if val_col in children_df.columns and name_col in children_df.columns:
-                    attr_name = children_df[name_col].dropna().unique()
-                    attr_name = attr_name[0] if len(attr_name) > 0 else ''
-                    
-                    # Recolectar todos los valores únicos
-                    all_vals = children_df[val_col].dropna().unique().tolist()
-                    all_vals = [str(v).strip() for v in all_vals if str(v).strip()]
-                    unique_vals = list(dict.fromkeys(all_vals))  # Preservar orden, quitar duplicados
-                    
-                    parent_attr_values[i] = {
-                        'name': attr_name,
-                        'values': '|'.join(unique_vals)  # Separados por | para WooCommerce
-                    }
-            
-            # Obtener datos de muestra del primer hijo
-            sample = children_df.iloc[0] if len(children_df) > 0 else None
-            
-            # Construir fila padre
-            parent = {}
-            for col in result.columns:
-                parent[col] = ''
-            
-            parent['ID'] = None  # Se asigna después
-            parent['Tipo'] = 'variable'
-            parent['SKU'] = new_parent_sku
-            parent['GTIN, UPC, EAN o ISBN'] = ''
-            parent['Nombre'] = str(base_name)
-            parent['Publicado'] = 0  # Borrador
-            parent['¿Está destacado?'] = 0
-            parent['Visibilidad en el catálogo'] = 'visible'
-            parent['Descripción corta'] = str(base_name)
-            parent['Descripción'] = ''
-            parent['Estado del impuesto'] = 'taxable'
-            parent['Clase de impuesto'] = ''
-            parent['¿En inventario?'] = 1
-            parent['Inventario'] = ''  # Variable NO tiene stock
-            parent['¿Permitir reservas de productos agotados?'] = 0
-            parent['¿Vendido individualmente?'] = 0
-            parent['¿Permitir valoraciones de clientes?'] = 1
-            parent['Precio normal'] = ''  # Variable NO tiene precio
-            parent['Precio rebajado'] = ''
-            parent['Categorías'] = sample.get('Categorías', 'Otros') if sample is not None else 'Otros'
-            parent['Etiquetas'] = ''
-            parent['Imágenes'] = ''
-            parent['Principal'] = ''  # Padre NO tiene Principal
-            parent['Posición'] = None
-            parent['Marcas'] = sample.get('Marcas', '') if sample is not None else ''
-            parent['_SKU_Parent_Temp'] = ''  # Padre no tiene padre
-            parent['SKU_Original'] = ''
-            parent['Confianza_Automática'] = 0
-            parent['Revisado_Humano'] = 'No'
-            parent['Notas_Revisión'] = ''
-            parent['Orden_Base'] = 0  # Se ordena al inicio del grupo
-            
-            # Atributos del padre: TODOS los valores posibles
-            for i in range(1, 4):
-                if i in parent_attr_values:
-                    parent[f'Nombre del atributo {i}'] = parent_attr_values[i]['name']
-                    parent[f'Valor(es) del atributo {i}'] = parent_attr_values[i]['values']
-                    parent[f'Atributo visible {i}'] = 1
-                    parent[f'Atributo global {i}'] = 0
-                else:
-                    parent[f'Nombre del atributo {i}'] = ''
-                    parent[f'Valor(es) del atributo {i}'] = ''
-                    parent[f'Atributo visible {i}'] = 1
-                    parent[f'Atributo global {i}'] = 0
+            for i, (names_arr, values_arr) in attr_arrays.items():
+                attr_names = [v for v in names_arr[positions] if not pd.isna(v)]
+                all_vals = [str(v).strip() for v in values_arr[positions] if not pd.isna(v)]
+                unique_vals = list(dict.fromkeys(v for v in all_vals if v))
+                parent_attr_values[i] = {
+                    'name': attr_names[0] if attr_names else '',
+                    'values': '|'.join(unique_vals)  # Separados por | para WooCommerce
+                }
             
-            parent_rows.append(parent)
+            parent_specs.append((new_parent_sku, base_name, positions[0], parent_attr_values))
         
-        # Agregar filas padre al DataFrame
-        if parent_rows:
-            parents_df = pd.DataFrame(parent_rows)
-            # Alinear columnas
-            for col in result.columns:
-                if col not in parents_df.columns:
-                    parents_df[col] = ''
-            parents_df = parents_df[result.columns]
-            result = pd.concat([parents_df, result], ignore_index=True)
+        # Actualizar variaciones en bloque
+        child_mask = (codes >= 0) & processed[np.maximum(codes, 0)]
+        if child_mask.any():
+            result.loc[child_mask, 'Tipo'] = 'variation'
+            result.loc[child_mask, '_SKU_Parent_Temp'] = new_parent_skus[codes[child_mask]]
+            
+            # Restaurar SKU original si existe
+            if 'SKU_Original' in result.columns:
+                originals = result['SKU_Original'].to_numpy(dtype=object)
+                restore = np.zeros(len(result), dtype=bool)
+                for pos in np.flatnonzero(child_mask):
+                    orig = originals[pos]
+                    restore[pos] = bool(orig and str(orig).strip())
+                if restore.any():
+                    result.loc[restore, 'SKU'] = [str(orig) for orig in originals[restore]]
+        
+        # Agregar filas padre al DataFrame (un solo DataFrame en bloque)
+        if parent_specs:
+            result = pd.concat([self._build_parent_rows(result, parent_specs), result], ignore_index=True)
         
         return result
+    
+    def _build_parent_rows(self, result: pd.DataFrame, parent_specs: List[Tuple]) -> pd.DataFrame:
+        """
+        Construye las filas padre ('variable') alineadas con las columnas de result.
+        
+        Args:
+            result: DataFrame de revisión (después de actualizar variaciones)
+            parent_specs: [(sku_padre, nombre_base, posición del primer hijo,
+                {i: {'name', 'values'}})]
+        
+        Returns:
+            DataFrame de padres con las mismas columnas que result
+        """
+        n_parents = len(parent_specs)
+        first_child = [pos for _, _, pos, _ in parent_specs]
+        
+        # Valores fijos de un padre: sin precio ni stock, sin Principal
+        fixed = {
+            'ID': None,  # Se asigna después
+            'Tipo': 'variable',
+            'GTIN, UPC, EAN o ISBN': '',
+            'Publicado': 0,  # Borrador
+            '¿Está destacado?': 0,
+            'Visibilidad en el catálogo': 'visible',
+            'Descripción': '',
+            'Estado del impuesto': 'taxable',
+            'Clase de impuesto': '',
+            '¿En inventario?': 1,
+            'Inventario': '',  # Variable NO tiene stock
+            '¿Permitir reservas de productos agotados?': 0,
+            '¿Vendido individualmente?': 0,
+            '¿Permitir valoraciones de clientes?': 1,
+            'Precio normal': '',  # Variable NO tiene precio
+            'Precio rebajado': '',
+            'Etiquetas': '',
+            'Imágenes': '',
+            'Principal': '',  # Padre NO tiene Principal
+            'Posición': None,
+            '_SKU_Parent_Temp': '',  # Padre no tiene padre
+            'SKU_Original': '',
+            'Confianza_Automática': 0,
+            'Revisado_Humano': 'No',
+            'Notas_Revisión': '',
+            'Orden_Base': 0,  # Se ordena al inicio del grupo
+        }
+        for i in range(1, 4):
+            fixed[f'Nombre del atributo {i}'] = ''
+            fixed[f'Valor(es) del atributo {i}'] = ''
+            fixed[f'Atributo visible {i}'] = 1
+            fixed[f'Atributo global {i}'] = 0
+        
+        data = {col: [fixed.get(col, '')] * n_parents for col in result.columns}
+        
+        def set_column(col: str, values: list) -> None:
+            if col in data:
+                data[col] = values
+        
+        set_column('SKU', [sku for sku, _, _, _ in parent_specs])
+        set_column('Nombre', [str(base) for _, base, _, _ in parent_specs])
+        set_column('Descripción corta', [str(base) for _, base, _, _ in parent_specs])
+        
+        # Datos de muestra del primer hijo
+        if 'Categorías' in result.columns:
+            set_column('Categorías', result['Categorías'].to_numpy(dtype=object)[first_child].tolist())
+        if 'Marcas' in result.columns:
+            set_column('Marcas', result['Marcas'].to_numpy(dtype=object)[first_child].tolist())
+        
+        # Atributos del padre: TODOS los valores posibles
+        for i in range(1, 4):
+            if any(i in attrs for _, _, _, attrs in parent_specs):
+                set_column(f'Nombre del atributo {i}',
+                           [attrs[i]['name'] if i in attrs else '' for _, _, _, attrs in parent_specs])
+                set_column(f'Valor(es) del atributo {i}',
+                           [attrs[i]['values'] if i in attrs else '' for _, _, _, attrs in parent_specs])
+        
+        return pd.DataFrame(data, columns=result.columns)
 
     def _update_principal_column(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -899,6 +941,51 @@ class ReviewFormatter:
         
         return ', '.join(tags) if tags else ''
     
+    @staticmethod
+    def _truthy(series: pd.Series) -> np.ndarray:
+        """`pd.notna(v) and v` por elemento (misma semántica que en una fila)."""
+        return series.notna().to_numpy() & series.astype(bool).to_numpy()
+    
+    def _generate_tags_column(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Genera etiquetas para todo el DataFrame por columnas.
+        
+        Mismo resultado que `df.apply(self._generate_tags, axis=1)`: las
+        columnas de atributos se descubren una sola vez y cada componente
+        (familia, marca, 3 atributos) se calcula sobre la columna completa.
+        
+        Args:
+            df: DataFrame procesado
+        
+        Returns:
+            Serie de etiquetas separadas por coma (índice de df)
+        """
+        # (máscara, texto) por componente, en el orden de _generate_tags
+        parts = []
+        
+        # Familia y marca
+        for col in ('Familia_Detectada', 'Marca_Detectada'):
+            if col in df.columns:
+                parts.append((self._truthy(df[col]), df[col].astype(str).str.lower()))
+        
+        # Atributos clave (máx 3)
+        attr_cols = [col for col in df.columns if col.startswith('Atributo_')
+                    and not col.endswith('_confianza') and not col.endswith('_cantidad')]
+        for col in attr_cols[:3]:
+            simplified = (
+                df[col].astype(str)
+                .str.lower().str.replace('"', '', regex=False).str.replace('mm', '', regex=False).str.strip()
+            )
+            keep = df[col].notna().to_numpy() & (simplified.str.len().to_numpy() > 2)
+            parts.append((keep, simplified.str[:20]))
+        
+        # Cada etiqueta conservada es no vacía: hay separador si ya hay texto
+        tags = pd.Series('', index=df.index)
+        for keep, text in parts:
+            sep = np.where(tags.to_numpy() != '', ', ', '')
+            tags = tags.mask(keep, tags + sep + text)
+        return tags
+    
     def _add_attributes_to_review(self, review_df: pd.DataFrame, 
                                   df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -1009,6 +1096,63 @@ class ReviewFormatter:
         # Asegurar rango 0-100
         return int(min(100, max(0, score)))
     
+    def _calculate_confidence_column(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Calcula la confianza automática (0-100) para todo el DataFrame.
+        
+        Mismos factores y resultado que `_calculate_confidence` fila a fila,
+        con cada factor evaluado como arreglo numpy sobre la columna.
+        
+        Args:
+            df: DataFrame procesado
+        
+        Returns:
+            Serie de scores enteros (índice de df)
+        """
+        n = len(df)
+        score = np.zeros(n, dtype=np.int64)
+        
+        # 1. Nombre limpio (30%)
+        if 'Nombre_Original' in df.columns and 'Nombre_Limpio' in df.columns:
+            both = (df['Nombre_Original'].notna() & df['Nombre_Limpio'].notna()).to_numpy()
+            orig = df['Nombre_Original'].astype(str).str.strip()
+            clean = df['Nombre_Limpio'].astype(str).str.strip()
+            unchanged = (orig == clean).to_numpy(dtype=bool, na_value=False)
+            minimal = (clean.str.len() > orig.str.len() * 0.7).to_numpy(dtype=bool, na_value=False)
+            score += np.select([~both, unchanged, minimal], [0, 30, 20], default=10)
+        
+        # 2. Atributos detectados (20%)
+        attr_count = np.zeros(n, dtype=np.int64)
+        for col in df.columns:
+            if not col.startswith('Atributo_cantidad'):
+                continue
+            series = df[col]
+            if pd.api.types.is_numeric_dtype(series) and series.dtype != object:
+                attr_count += (series.notna() & (series > 0)).to_numpy(dtype=bool)
+            else:
+                # Texto no vacío, o número (bool incluido) positivo
+                text = series.astype(str)
+                is_text = (text == series).to_numpy(dtype=bool, na_value=False)
+                filled = (text.str.strip() != '').to_numpy(dtype=bool, na_value=False)
+                numbers = pd.to_numeric(series.where(~is_text), errors='coerce')
+                attr_count += (is_text & filled) | (numbers > 0).to_numpy(dtype=bool, na_value=False)
+        score += np.minimum(20, attr_count * 5)
+        
+        # 3. Marca detectada (20%)
+        if 'Marca_Detectada' in df.columns:
+            score += np.where(self._truthy(df['Marca_Detectada']), 20, 0)
+        
+        # 4. Sin ambigüedad (30%)
+        # Veracidad de Python, sin notna: NaN cuenta como familia/medidas
+        if 'Familia_Detectada' in df.columns:
+            family = df['Familia_Detectada']
+            score += np.where(family.astype(bool).to_numpy() & (family != 'None').to_numpy(), 15, 0)
+        if 'Tiene_Medidas' in df.columns:
+            score += np.where(df['Tiene_Medidas'].astype(bool).to_numpy(), 15, 0)
+        
+        # Asegurar rango 0-100
+        return pd.Series(np.clip(score, 0, 100), index=df.index)
+    
     def save_for_review(self, review_df: pd.DataFrame, output_dir: str = 'data/processed') -> Path:
         """
         Guarda DataFrame en formato Excel para revisión.
@@ -0,0 +1,253 @@
+"""
+REVIEW_JOURNAL.PY - Diario de ediciones del revisor (autoguardado incremental)
+Responsabilidad: Que un cierre inesperado no pierda lo editado desde el último guardado
+Método: Cada edición se anexa como una línea JSON junto al maestro y se re-aplica al abrirlo
+Salida: DataFrame del maestro con las ediciones recuperadas
+"""
+
+import os
+import json
+import logging
+import pandas as pd
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from src.review_save import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Tipos de edición (todas se aplican con apply_edit, en vivo y al recuperar)
+EDIT_SET = 'set'                # celda: row, col, value
+EDIT_ADD_COLUMN = 'add_column'  # columna nueva con un valor fijo: col, value
+EDIT_APPEND = 'append'          # fila nueva al final: values
+EDIT_DROP = 'drop'              # quitar filas y renumerar el índice: rows
+EDIT_RENUMBER_IDS = 'renumber_ids'  # ID = 1..n
+
+
+def apply_edit(df: pd.DataFrame, edit: dict) -> pd.DataFrame:
+    """
+    Aplica una edición al DataFrame y lo devuelve (las ediciones de filas crean
+    uno nuevo, las de celdas modifican el mismo).
+    """
+    op = edit['op']
+    if op == EDIT_SET:
+        try:
+            df.at[edit['row'], edit['col']] = edit['value']
+        except (TypeError, ValueError):
+            # Columna leída como numérica (p. ej. vacía en el CSV) que recibe texto
+            df[edit['col']] = df[edit['col']].astype(object)
+            df.at[edit['row'], edit['col']] = edit['value']
+        return df
+    if op == EDIT_ADD_COLUMN:
+        df[edit['col']] = edit['value']
+        return df
+    if op == EDIT_APPEND:
+        return pd.concat([df, pd.DataFrame([edit['values']])], ignore_index=True)
+    if op == EDIT_DROP:
+        return df.drop(edit['rows']).reset_index(drop=True)
+    if op == EDIT_RENUMBER_IDS:
+        df['ID'] = range(1, len(df) + 1)
+        return df
+    raise ValueError(f"Edición desconocida: {op!r}")
+
+
+def _json_default(value):
+    # Escalares de numpy (int64, bool_, float64) y lo demás como texto
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def _dump(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=_json_default) + '\n'
+
+
+def file_fingerprint(path) -> Optional[List[int]]:
+    """Tamaño y mtime del archivo: identifica qué versión del maestro hay en disco."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class EditJournal:
+    """
+    Diario de ediciones de un maestro (`<nombre>.journal.jsonl` a su lado).
+    
+    - Cada edición es una línea JSON con un número de secuencia creciente;
+      anotarla cuesta una escritura corta, no reescribir el libro completo
+    - `<nombre>.journal.json` guarda hasta qué secuencia incluye el maestro
+      en disco (con su tamaño y mtime). Al guardar se marca la secuencia como
+      pendiente y, si el guardado termina, se compacta el diario (solo quedan
+      las ediciones posteriores a la copia guardada)
+    - Al abrir, se re-aplican las ediciones que el maestro aún no tiene. Si
+      el maestro cambió fuera del revisor, el diario se aparta sin aplicarse
+    """
+    
+    # Con tantas ediciones sin guardar, conviene compactar (guardar el maestro)
+    COMPACT_EVERY = 5000
+    
+    def __init__(self, file_path):
+        self.file_path = Path(file_path)
+        self.path = self.file_path.with_name(f"{self.file_path.stem}.journal.jsonl")
+        self.state_path = self.file_path.with_name(f"{self.file_path.stem}.journal.json")
+        self.state = {'files': {}, 'seq': 0, 'pending_seq': None}
+        self.last_seq = 0
+        self.unsaved = 0
+        self.set_aside_path = None
+        self._file = None
+    
+    # ----- Apertura y recuperación -----
+    
+    def open(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+        """
+        Re-aplica sobre el maestro recién cargado las ediciones que le faltan.
+        Devuelve el DataFrame y cuántas ediciones se recuperaron.
+        """
+        records, complete = self._read_records()
+        if not complete:
+            self._rewrite(records)
+        state = self._read_state()
+        covered = self._covered_seq(state) if state is not None else None
+        
+        recovered = []
+        if covered is None:
+            if records:
+                self._set_aside()
+                records = []
+            self.last_seq = 0
+            self.state = {'files': {self.file_path.name: file_fingerprint(self.file_path)}, 'seq': 0, 'pending_seq': None}
+            self._write_state()
+        else:
+            recovered = [record for record in records if record['seq'] > covered]
+            for record in recovered:
+                df = apply_edit(df, record)
+            self.last_seq = max([covered] + [record['seq'] for record in records])
+            if state.get('pending_seq') is not None and covered == state['pending_seq']:
+                # El guardado terminó pero no llegó a registrarse
+                state = {'files': {self.file_path.name: file_fingerprint(self.file_path)}, 'seq': covered, 'pending_seq': None}
+            else:
+                state['pending_seq'] = None
+            self.state = state
+            self._write_state()
+        
+        self.unsaved = len(recovered)
+        if recovered:
+            logger.info(f"Recuperadas {len(recovered)} ediciones de {self.path.name}")
+        return df, len(recovered)
+    
+    def start(self):
+        """Empieza un diario vacío para un archivo que se va a guardar por primera vez (Guardar como)."""
+        records, _complete = self._read_records()
+        if records:
+            self._set_aside()
+        self.last_seq = 0
+        self.unsaved = 0
+        self.state = {'files': {}, 'seq': 0, 'pending_seq': None}
+        self._write_state()
+    
+    def _covered_seq(self, state) -> Optional[int]:
+        """Secuencia ya incluida en el maestro en disco, o None si el diario no es de esta versión."""
+        if state.get('files', {}).get(self.file_path.name) == file_fingerprint(self.file_path):
+            return state.get('seq', 0)
+        # El maestro cambió después de marcar un guardado: es ese guardado
+        return state.get('pending_seq')
+    
+    def _read_records(self) -> Tuple[List[dict], bool]:
+        """Registros del diario y si se leyó completo."""
+        records = []
+        if not self.path.exists():
+            return records, True
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Última línea a medio escribir al cortarse el proceso
+                    logger.warning(f"Línea incompleta en {self.path.name}; se descarta")
+                    return records, False
+        return records, True
+    
+    def _read_state(self) -> Optional[dict]:
+        try:
+            return json.loads(self.state_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+    
+    def _write_state(self):
+        atomic_write(self.state_path, lambda tmp: tmp.write_text(json.dumps(self.state), encoding='utf-8'))
+    
+    def _set_aside(self):
+        """Conserva un diario que no corresponde al maestro actual, sin aplicarlo."""
+        self.close()
+        self.set_aside_path = self.path.with_name(
+            f"{self.file_path.stem}.journal.{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        )
+        os.replace(self.path, self.set_aside_path)
+        logger.warning(f"{self.path.name} no corresponde a {self.file_path.name}; apartado en {self.set_aside_path.name}")
+    
+    # ----- Escritura -----
+    
+    def append(self, edit: dict):
+        """Anota una edición ya aplicada."""
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self.last_seq += 1
+        record = {'seq': self.last_seq, **edit}
+        self._file.write(_dump(record))
+        self._file.flush()
+        self.unsaved += 1
+    
+    @property
+    def needs_compaction(self) -> bool:
+        return self.unsaved >= self.COMPACT_EVERY
+    
+    def begin_snapshot(self) -> int:
+        """Marca el comienzo de un guardado; devuelve la secuencia que incluirá la copia."""
+        self.state['pending_seq'] = self.last_seq
+        self._write_state()
+        return self.last_seq
+    
+    def snapshot_saved(self, seq: int, paths):
+        """El guardado de la copia hasta `seq` terminó: registra el maestro y compacta."""
+        self.state = {
+            'files': {Path(path).name: file_fingerprint(path) for path in paths},
+            'seq': seq,
+            'pending_seq': None,
+        }
+        self._write_state()
+        self._compact(seq)
+    
+    def snapshot_failed(self):
+        self.state['pending_seq'] = None
+        self._write_state()
+    
+    def _compact(self, seq: int):
+        """Deja en el diario solo las ediciones posteriores a `seq`."""
+        self.close()
+        records, _complete = self._read_records()
+        keep = [record for record in records if record['seq'] > seq]
+        self.unsaved = len(keep)
+        self._rewrite(keep)
+    
+    def _rewrite(self, records):
+        self.close()
+        if not records:
+            self.path.unlink(missing_ok=True)
+            return
+        lines = ''.join(_dump(record) for record in records)
+        atomic_write(self.path, lambda tmp: tmp.write_text(lines, encoding='utf-8'))
+    
+    def discard(self):
+        """Descarta las ediciones sin guardar (cerrar sin guardar)."""
+        self._compact(self.last_seq)
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
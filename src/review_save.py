@@ -0,0 +1,130 @@
+"""
+REVIEW_SAVE.PY - Guardado del maestro de revisión en segundo plano
+Responsabilidad: Escribir xlsx/CSV sin bloquear al revisor ni dejar archivos a medias
+Método: Copia del DataFrame + hilo de trabajo + archivo temporal y os.replace
+Salida: Archivos del maestro (y CSV WooCommerce) reemplazados de forma atómica
+"""
+
+import os
+import tempfile
+import threading
+import pandas as pd
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+FORMAT_XLSX = 'xlsx'
+FORMAT_CSV = 'csv'
+FORMAT_WOOCOMMERCE = 'woocommerce'
+
+# Columnas de auditoría que no van al CSV de WooCommerce
+AUDIT_COLUMNS = ['Confianza_Automática', 'Revisado_Humano', 'Notas_Revisión']
+
+
+def save_targets(file_path, woocommerce: bool = False) -> List[Tuple[str, Path]]:
+    """
+    Archivos a escribir al guardar `file_path`.
+    
+    Un .csv guarda solo el CSV (no hace falta pasar por openpyxl); cualquier
+    otra extensión guarda el xlsx y el CSV hermano, como antes.
+    """
+    file_path = Path(file_path)
+    targets = []
+    if file_path.suffix.lower() != '.csv':
+        targets.append((FORMAT_XLSX, file_path.with_suffix('.xlsx')))
+    targets.append((FORMAT_CSV, file_path.with_suffix('.csv')))
+    if woocommerce:
+        woo_name = f"woocommerce_import_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        targets.append((FORMAT_WOOCOMMERCE, file_path.parent / woo_name))
+    return targets
+
+
+def woocommerce_columns(df: pd.DataFrame) -> List[str]:
+    """Columnas del CSV WooCommerce (sin columnas de auditoría)."""
+    return [col for col in df.columns if not col.startswith('SKU_Original') and col not in AUDIT_COLUMNS]
+
+
+def atomic_write(path, write: Callable[[Path], None]):
+    """
+    Llama a write(ruta_temporal) en el mismo directorio y reemplaza `path`
+    solo si terminó bien: un error o un cierre a mitad deja el archivo anterior.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(Path(tmp_name))
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def write_target(df: pd.DataFrame, fmt: str, path):
+    """Escribe un formato del maestro de forma atómica."""
+    if fmt == FORMAT_XLSX:
+        def write(tmp):
+            with pd.ExcelWriter(tmp, engine='openpyxl') as writer:
+                df.to_excel(writer, sheet_name='Maestro', index=False)
+    elif fmt == FORMAT_CSV:
+        def write(tmp):
+            df.to_csv(tmp, index=False, encoding='utf-8')
+    elif fmt == FORMAT_WOOCOMMERCE:
+        def write(tmp):
+            df[woocommerce_columns(df)].to_csv(tmp, index=False, encoding='utf-8')
+    else:
+        raise ValueError(f"Formato de guardado desconocido: {fmt!r}")
+    atomic_write(path, write)
+
+
+def save_review_files(df: pd.DataFrame, targets, progress: Optional[Callable[[int, int, Path], None]] = None):
+    """Escribe cada destino en orden; progress(i, total, ruta) antes de cada uno."""
+    for i, (fmt, path) in enumerate(targets, 1):
+        if progress is not None:
+            progress(i, len(targets), path)
+        write_target(df, fmt, path)
+
+
+class BackgroundSave:
+    """
+    Un guardado en un hilo de trabajo sobre una copia del DataFrame.
+    
+    El hilo no toca la interfaz: deja su avance en `status` y quien lo lanzó
+    lo consulta (root.after en la GUI, el menú en la consola). Las ediciones
+    hechas mientras se guarda no entran en este guardado.
+    """
+    
+    def __init__(self, df: pd.DataFrame, targets):
+        self.snapshot = df.copy()
+        self.targets = list(targets)
+        self.status = "Guardando..."
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="review-save", daemon=True)
+    
+    def start(self) -> 'BackgroundSave':
+        self._thread.start()
+        return self
+    
+    def _run(self):
+        try:
+            save_review_files(self.snapshot, self.targets, self._progress)
+            self.status = "Guardado: " + ", ".join(path.name for _fmt, path in self.targets)
+        except Exception as e:
+            self.error = e
+            self.status = f"Error al guardar: {e}"
+    
+    def _progress(self, i, total, path):
+        self.status = f"Guardando {path.name} ({i}/{total})..."
+    
+    @property
+    def done(self) -> bool:
+        return not self._thread.is_alive()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que termine; devuelve True si terminó."""
+        self._thread.join(timeout)
+        return self.done
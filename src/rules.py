@@ -0,0 +1,229 @@
+"""
+RULES.PY - Reglas compiladas compartidas por todas las etapas
+Responsabilidad: Parsear rules.yaml una sola vez y reutilizar lo compilado
+Método: Registro en memoria + pickle en disco indexado por hash del YAML
+Salida: CompiledRules con el dict de reglas y artefactos por etapa
+"""
+
+import sys
+import types
+import atexit
+import pickle
+import hashlib
+import logging
+import functools
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# Subir si cambia el formato del pickle (la estructura de los artefactos ya
+# queda cubierta por el código fuente en la huella de cada uno)
+RULES_CACHE_VERSION = 2
+
+# Relativo a la raíz del repositorio, no al directorio de trabajo
+DEFAULT_CACHE_DIR = str(Path(__file__).resolve().parents[1] / 'data' / 'cache' / 'rules')
+
+
+@functools.lru_cache(maxsize=None)
+def _module_source_hash(module_name: str) -> Optional[str]:
+    """SHA-256 del código fuente de un módulo importado (None si no tiene archivo)."""
+    module = sys.modules.get(module_name)
+    module_file = getattr(module, '__file__', None)
+    if not module_file:
+        return None
+    try:
+        return hashlib.sha256(Path(module_file).read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def _source_fingerprint(func: Callable) -> Tuple[Tuple[str, Optional[str]], ...]:
+    """
+    Huella del código que construye un artefacto: fuente del módulo del builder
+    y de los módulos del mismo paquete que este usa (p. ej. src.keywords para
+    KeywordMatcher), como hace el parser espacial con su propio módulo.
+    
+    Si se edita el builder o un helper (compile_attribute_patterns,
+    KeywordMatcher...), el artefacto en caché deja de coincidir y se reconstruye.
+    """
+    module_name = getattr(getattr(func, '__func__', func), '__module__', None)
+    module = sys.modules.get(module_name) if module_name else None
+    if module is None:
+        return ()
+    
+    package = module_name.split('.')[0]
+    names = {module_name}
+    for value in vars(module).values():
+        dependency = value.__name__ if isinstance(value, types.ModuleType) else getattr(value, '__module__', None)
+        if isinstance(dependency, str) and dependency.split('.')[0] == package:
+            names.add(dependency)
+    return tuple((name, _module_source_hash(name)) for name in sorted(names))
+
+
+class CompiledRules:
+    """
+    Reglas parseadas y compiladas una sola vez.
+    - `rules`: dict tal como lo entrega yaml.safe_load
+    - Artefactos por etapa (regex compiladas, autómatas de keywords, tablas
+      de validación) construidos bajo demanda con `artifact()`
+    - Compartido en el proceso: `load()` devuelve la misma instancia para el
+      mismo archivo y contenido
+    - Persistido como pickle indexado por el hash del YAML: en un arranque
+      en caliente no se parsea el YAML ni se reconstruyen las tablas. Los
+      artefactos nuevos se escriben una sola vez con `flush()` (al terminar
+      de construir las etapas, o al salir del proceso)
+    """
+    
+    # Instancias compartidas: (ruta absoluta, hash) -> CompiledRules
+    _registry: Dict[Tuple[str, str], 'CompiledRules'] = {}
+    
+    def __init__(self, rules: Dict, rules_path: str, content_hash: Optional[str] = None,
+                 cache_path: Optional[Path] = None):
+        """
+        Inicializa reglas compiladas.
+        
+        Args:
+            rules: Diccionario de reglas
+            rules_path: Path al archivo de reglas
+            content_hash: SHA-256 del YAML (None si el archivo no existe)
+            cache_path: Pickle donde persistir artefactos (None = sin disco)
+        """
+        self.rules = rules
+        self.rules_path = rules_path
+        self.content_hash = content_hash
+        self.cache_path = cache_path
+        self.artifacts: Dict[str, Any] = {}
+        self._dirty = False
+        self._flush_registered = False
+    
+    @property
+    def found(self) -> bool:
+        """Indica si el archivo de reglas existía."""
+        return self.content_hash is not None
+    
+    @classmethod
+    def load(cls, rules_path: str = 'config/rules.yaml',
+             cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> 'CompiledRules':
+        """
+        Obtiene las reglas compiladas (memoria → pickle → YAML).
+        
+        Args:
+            rules_path: Path al archivo de reglas
+            cache_dir: Directorio de pickles (None para no usar disco)
+        
+        Returns:
+            CompiledRules compartido
+        """
+        path = Path(rules_path)
+        try:
+            content = path.read_bytes()
+        except FileNotFoundError:
+            logger.warning(f"Reglas no encontradas: {rules_path}")
+            return cls({}, rules_path)
+        
+        content_hash = hashlib.sha256(content).hexdigest()
+        key = (str(path.resolve()), content_hash)
+        compiled = cls._registry.get(key)
+        if compiled is not None:
+            return compiled
+        
+        cache_path = None
+        if cache_dir is not None:
+            cache_path = Path(cache_dir) / f"rules_{content_hash[:16]}.pkl"
+            compiled = cls._read_cache(cache_path, rules_path, content_hash)
+        
+        if compiled is None:
+            rules = yaml.safe_load(content.decode('utf-8')) or {}
+            compiled = cls(rules, rules_path, content_hash, cache_path)
+            logger.info(f"Reglas parseadas desde: {rules_path}")
+        else:
+            logger.info(f"Reglas compiladas cargadas desde caché: {cache_path}")
+        
+        cls._registry[key] = compiled
+        return compiled
+    
+    @classmethod
+    def _read_cache(cls, cache_path: Path, rules_path: str,
+                    content_hash: str) -> Optional['CompiledRules']:
+        """Lee el pickle si existe y corresponde a este YAML."""
+        if not cache_path.exists():
+            return None
+        try:
+            with open(cache_path, 'rb') as f:
+                payload = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Caché de reglas inválida ({cache_path}): {e}")
+            return None
+        
+        if (payload.get('version') != RULES_CACHE_VERSION
+                or payload.get('python') != tuple(sys.version_info[:2])
+                or payload.get('content_hash') != content_hash):
+            return None
+        
+        compiled = cls(payload['rules'], rules_path, content_hash, cache_path)
+        compiled.artifacts = payload.get('artifacts', {})
+        return compiled
+    
+    def save(self) -> None:
+        """Persiste reglas y artefactos (escritura atómica)."""
+        if self.cache_path is None:
+            return
+        payload = {
+            'version': RULES_CACHE_VERSION,
+            'python': tuple(sys.version_info[:2]),
+            'content_hash': self.content_hash,
+            'rules': self.rules,
+            'artifacts': self.artifacts,
+        }
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=self.cache_path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_name, self.cache_path)
+        except Exception as e:
+            # La caché es una optimización: nunca debe romper el pipeline
+            logger.warning(f"No se pudo guardar caché de reglas: {e}")
+    
+    def flush(self) -> None:
+        """Persiste el pickle si hay artefactos nuevos desde la última escritura."""
+        if self._dirty:
+            self._dirty = False
+            self.save()
+    
+    def artifact(self, name: str, builder: Callable[[], Any], fingerprint: Any = None) -> Any:
+        """
+        Devuelve un artefacto compilado, construyéndolo una sola vez.
+        
+        Args:
+            name: Nombre del artefacto (p. ej. 'patterns.compiled')
+            builder: Función que lo construye a partir de `rules`
+            fingerprint: Entradas del artefacto que no están en el YAML
+                (p. ej. patrones universales del código); si cambian, el
+                artefacto se reconstruye. El código fuente del builder y de
+                los módulos que usa se incluye siempre en la huella
+        
+        Returns:
+            Artefacto compilado
+        """
+        source = repr((_source_fingerprint(builder), fingerprint))
+        key = f"{name}:{hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]}"
+        
+        if key not in self.artifacts:
+            self.artifacts[key] = builder()
+            self._dirty = True
+            if self.cache_path is not None and not self._flush_registered:
+                # Quien no llame a flush() igual deja el pickle al salir
+                atexit.register(self.flush)
+                self._flush_registered = True
+        return self.artifacts[key]
+    
+    @classmethod
+    def clear_registry(cls) -> None:
+        """Olvida las instancias compartidas en memoria (no borra el disco)."""
+        cls._registry.clear()
@@ -5,28 +5,112 @@ Conserva los datos originales del Excel, actualiza atributos de hijos y crea pad
 
 import pandas as pd
 import json
+import os
 import re
 from pathlib import Path
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterable
 
-# Ruta del archivo de mapeo SKU
+# Ruta del archivo de mapeo SKU (versionado, único almacenamiento del mapeo)
 SKU_MAPPING_PATH = Path("data/sku_mapping.json")
 
 
+def _write_sku_mapping(path: Path, mapping: dict[str, str]) -> None:
+    """Escribe el JSON de mapeo completo (archivo temporal + reemplazo atómico)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(mapping, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class SkuMappingStore:
+    """
+    Mapeo SKU_PROVEEDOR (catálogo) <-> SKU_LOCAL persistente.
+    
+    - Diccionarios en ambos sentidos: búsqueda O(1) por SKU del catálogo y
+      por SKU local
+    - Si varios SKUs del catálogo apuntan al mismo SKU local, gana el
+      registrado primero (mismo resultado que recorrer el mapeo en orden)
+    - El JSON versionado es el único almacenamiento: `save()` lo reescribe
+      completo, y solo si hubo relaciones nuevas o cambiadas
+    """
+    
+    def __init__(self, json_path: Path | str = SKU_MAPPING_PATH):
+        self.json_path = Path(json_path)
+        self._forward: dict[str, str] = {}
+        self._reverse: dict[str, set[str]] = {}
+        self._position: dict[str, int] = {}
+        self._dirty: set[str] = set()
+        if self.json_path.exists():
+            with open(self.json_path, 'r', encoding='utf-8') as f:
+                for catalog_sku, local_sku in json.load(f).items():
+                    self._set(catalog_sku, local_sku)
+    
+    def __len__(self) -> int:
+        return len(self._forward)
+    
+    def __contains__(self, catalog_sku: str) -> bool:
+        return catalog_sku in self._forward
+    
+    def _set(self, catalog_sku: str, local_sku: str) -> None:
+        previous = self._forward.get(catalog_sku)
+        if previous is not None:
+            holders = self._reverse.get(previous)
+            if holders is not None:
+                holders.discard(catalog_sku)
+                if not holders:
+                    del self._reverse[previous]
+        else:
+            self._position[catalog_sku] = len(self._position)
+        self._forward[catalog_sku] = local_sku
+        self._reverse.setdefault(local_sku, set()).add(catalog_sku)
+    
+    def upsert(self, catalog_sku: str, local_sku: str) -> None:
+        """Registra (o actualiza) la relación SKU catálogo -> SKU local."""
+        if self._forward.get(catalog_sku) == local_sku:
+            return
+        self._set(catalog_sku, local_sku)
+        self._dirty.add(catalog_sku)
+    
+    def get_local_sku(self, catalog_sku: str) -> str | None:
+        """SKU local asociado a un SKU del catálogo."""
+        return self._forward.get(catalog_sku)
+    
+    def get_catalog_sku(self, local_sku: str) -> str | None:
+        """SKU del catálogo asociado a un SKU local (el registrado primero)."""
+        holders = self._reverse.get(local_sku)
+        if not holders:
+            return None
+        if len(holders) == 1:
+            return next(iter(holders))
+        return min(holders, key=self._position.__getitem__)
+    
+    def to_dict(self) -> dict[str, str]:
+        """Mapeo completo SKU catálogo -> SKU local (en orden de registro)."""
+        return dict(self._forward)
+    
+    def save(self) -> int:
+        """
+        Reescribe el JSON si hubo relaciones nuevas o cambiadas (sin cambios
+        no toca el archivo). Devuelve cuántas relaciones cambiaron.
+        """
+        if not self._dirty:
+            return 0
+        _write_sku_mapping(self.json_path, self._forward)
+        changed = len(self._dirty)
+        self._dirty.clear()
+        return changed
+
+
 def load_sku_mapping() -> dict[str, str]:
     """Carga el diccionario de mapeo SKU_PROVEEDOR -> SKU_LOCAL."""
-    if SKU_MAPPING_PATH.exists():
-        with open(SKU_MAPPING_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+    return SkuMappingStore(SKU_MAPPING_PATH).to_dict()
 
 
 def save_sku_mapping(mapping: dict[str, str]) -> None:
-    """Guarda el diccionario de mapeo SKU_PROVEEDOR -> SKU_LOCAL."""
-    SKU_MAPPING_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(SKU_MAPPING_PATH, 'w', encoding='utf-8') as f:
-        json.dump(mapping, f, indent=2, ensure_ascii=False)
+    """Guarda el diccionario de mapeo SKU_PROVEEDOR -> SKU_LOCAL (reemplaza el anterior)."""
+    _write_sku_mapping(SKU_MAPPING_PATH, mapping)
     print(f"Mapeo SKU guardado: {len(mapping)} relaciones en {SKU_MAPPING_PATH}")
 
 
@@ -40,21 +124,100 @@ def load_catalog(catalog_path: str) -> dict[str, dict]:
     return catalog
 
 
-def find_sku_in_text(text: str, catalog_skus: set[str]) -> str | None:
-    """Busca un SKU del catálogo dentro de un texto (nombre o SKU del Excel)."""
-    text_upper = text.upper()
-    # Ordenar SKUs por longitud descendente para encontrar el más específico primero
-    for sku in sorted(catalog_skus, key=len, reverse=True):
-        sku_escaped = re.escape(sku)
-        patterns = [
-            rf'\({sku_escaped}\)',  # (SKU)
-            rf'\b{sku_escaped}\b',  # SKU como palabra
-            rf'{sku_escaped}$',     # SKU al final
+class CatalogSkuIndex:
+    """
+    Índice de SKUs del catálogo para buscarlos dentro de textos.
+    
+    Se construye una vez por catálogo y reemplaza el recorrido de todos los
+    SKUs con regex por consultas a un dict:
+    - (SKU): cada tramo entre '(' y ')' del texto se consulta en el índice
+    - SKU como palabra: cada tramo entre dos límites de palabra (\\b)
+    - SKU al final: un sufijo por cada largo de SKU existente
+    Gana el SKU más largo (más específico); a igual largo, el que aparece
+    primero en el texto.
+    """
+    
+    def __init__(self, catalog_skus: Iterable[str]):
+        # SKU en mayúsculas -> SKUs originales (comparación sin mayúsculas)
+        self._by_key: dict[str, list[str]] = {}
+        for sku in catalog_skus:
+            self._by_key.setdefault(sku.upper(), []).append(sku)
+        for originals in self._by_key.values():
+            originals.sort()
+        self._lengths = sorted({len(key) for key in self._by_key if key}, reverse=True)
+        self._length_set = set(self._lengths)
+        self._max_length = self._lengths[0] if self._lengths else 0
+    
+    def __len__(self) -> int:
+        return sum(len(originals) for originals in self._by_key.values())
+    
+    @staticmethod
+    def _is_word(ch: str) -> bool:
+        """Mismo criterio que \\w en regex unicode."""
+        return ch.isalnum() or ch == '_'
+    
+    def find(self, text: str) -> str | None:
+        """Busca el SKU del catálogo más específico dentro del texto."""
+        text_upper = text.upper()
+        n = len(text_upper)
+        keys = self._by_key
+        lengths = self._length_set
+        best = None  # (largo, -inicio, clave)
+        
+        def consider(start: int, end: int) -> None:
+            nonlocal best
+            if end - start in lengths:
+                key = text_upper[start:end]
+                if key in keys:
+                    candidate = (end - start, -start, key)
+                    if best is None or candidate[:2] > best[:2]:
+                        best = candidate
+        
+        # (SKU)
+        opens = [i for i, ch in enumerate(text_upper) if ch == '(']
+        if opens:
+            closes = [j for j, ch in enumerate(text_upper) if ch == ')']
+            for i in opens:
+                for j in closes:
+                    if j > i + 1:
+                        consider(i + 1, j)
+        
+        # SKU como palabra: ambos extremos en límites de palabra
+        word = [self._is_word(ch) for ch in text_upper]
+        boundaries = [
+            p for p in range(n + 1)
+            if (p > 0 and word[p - 1]) != (p < n and word[p])
         ]
-        for pattern in patterns:
-            if re.search(pattern, text_upper, re.IGNORECASE):
-                return sku
-    return None
+        for a, start in enumerate(boundaries):
+            for end in boundaries[a + 1:]:
+                if end - start > self._max_length:
+                    break
+                consider(start, end)
+        
+        # SKU al final ($ también acepta un salto de línea final)
+        ends = [n, n - 1] if text_upper.endswith('\n') else [n]
+        for end in ends:
+            for length in self._lengths:
+                if length <= end:
+                    consider(end - length, end)
+        
+        if best is not None:
+            return keys[best[2]][0]
+        # Un SKU vacío coincide con cualquier texto (como la regex original)
+        if '' in keys:
+            return keys[''][0]
+        return None
+
+
+def find_sku_in_text(text: str, catalog_skus: set[str],
+                     index: CatalogSkuIndex | None = None) -> str | None:
+    """Busca un SKU del catálogo dentro de un texto (nombre o SKU del Excel).
+    
+    Pasar `index` (construido una vez) evita reconstruirlo en cada llamada.
+    """
+    if index is None:
+        index = CatalogSkuIndex(catalog_skus)
+    return index.find(text)
 
 
 def aggregate_attributes(products_data: list[dict]) -> dict[str, list[str]]:
@@ -89,16 +252,17 @@ def generate_woocommerce_from_catalog(
     # Cargar datos
     catalog = load_catalog(catalog_path)
     catalog_skus = set(catalog.keys())
+    sku_index = CatalogSkuIndex(catalog_skus)
     df_original = pd.read_excel(excel_path, sheet_name='Maestro')
     
-    # Cargar mapeo de SKUs existente
-    sku_mapping = load_sku_mapping()
+    # Cargar mapeo de SKUs existente (índices en ambos sentidos)
+    sku_store = SkuMappingStore()
     new_mappings = 0
     cached_mappings = 0
     
     print(f"Productos en catálogo: {len(catalog_skus)}")
     print(f"Productos en Excel original: {len(df_original)}")
-    print(f"Mapeos SKU cargados: {len(sku_mapping)}")
+    print(f"Mapeos SKU cargados: {len(sku_store)}")
     
     # Copiar todas las columnas del original
     all_columns = list(df_original.columns)
@@ -129,7 +293,7 @@ def generate_woocommerce_from_catalog(
     print(f"\nGrupos existentes: {len(existing_parents)} padres")
     
     # === PASO 2: ENCONTRAR MATCHES CON CATÁLOGO ===
-    matches = []  # Lista de {idx, catalog_sku, catalog_data, category_path}
+    matches = {}  # idx -> {idx, catalog_sku, catalog_data, category_path}
     groups_by_category = {}  # category_path -> lista de items
     
     total_rows = len(df_original)
@@ -146,34 +310,31 @@ def generate_woocommerce_from_catalog(
         sku_excel = str(row['SKU']) if pd.notna(row['SKU']) else ""
         
         # Primero buscar en el mapeo existente (por SKU local)
-        found_sku = None
-        for cat_sku, local_sku in sku_mapping.items():
-            if local_sku == sku_excel:
-                found_sku = cat_sku
-                cached_mappings += 1
-                break
+        found_sku = sku_store.get_catalog_sku(sku_excel)
+        if found_sku:
+            cached_mappings += 1
         
         # Si no está en mapeo, buscar por texto
         if not found_sku:
-            found_sku = find_sku_in_text(nombre, catalog_skus)
+            found_sku = sku_index.find(nombre)
             if not found_sku:
-                found_sku = find_sku_in_text(sku_excel, catalog_skus)
+                found_sku = sku_index.find(sku_excel)
             
             # Guardar nueva relación en el mapeo
             if found_sku and sku_excel:
-                sku_mapping[found_sku] = sku_excel
+                sku_store.upsert(found_sku, sku_excel)
                 new_mappings += 1
         
         if found_sku:
             cat_data = catalog[found_sku]
             category_path = tuple(cat_data.get('category_path', []))
             
-            matches.append({
+            matches[idx] = {
                 'idx': idx,
                 'catalog_sku': found_sku,
                 'catalog_data': cat_data,
                 'category_path': category_path,
-            })
+            }
             
             # Agrupar por categoría para crear padres
             if category_path not in groups_by_category:
@@ -191,7 +352,7 @@ def generate_woocommerce_from_catalog(
     
     # === PASO 3: IDENTIFICAR PADRES A DISOLVER ===
     # Un padre se disuelve si tiene al menos un hijo con match en catálogo
-    matched_indices = {m['idx'] for m in matches}
+    matched_indices = set(matches)
     parents_to_dissolve = set()  # IDs de padres a eliminar
     
     for idx in matched_indices:
@@ -210,8 +371,9 @@ def generate_woocommerce_from_catalog(
     print(f"  Hijos sin match a convertir a simple: {len(children_to_convert_simple)}")
     print(f"  Grupos intactos: {len(existing_parents) - len(parents_to_dissolve)}")
     
-    # Guardar el mapeo actualizado
-    save_sku_mapping(sku_mapping)
+    # Guardar el mapeo actualizado (solo relaciones nuevas o cambiadas)
+    written = sku_store.save()
+    print(f"Mapeo SKU guardado: {written} cambios, {len(sku_store)} relaciones en {sku_store.json_path}")
     
     # Crear lista de filas para el nuevo DataFrame
     output_rows = []
@@ -302,7 +464,7 @@ def generate_woocommerce_from_catalog(
         
         if idx in matched_indices:
             # Producto CON coincidencia en catálogo -> variation con nuevo padre
-            match = next(m for m in matches if m['idx'] == idx)
+            match = matches[idx]
             cat_data = match['catalog_data']
             category_path = match['category_path']
             
@@ -0,0 +1,148 @@
+"""
+Tests para la extracción local con PyMuPDF (catalogo_pdf).
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest
+import src.catalogo_pdf
+from src.catalogo_pdf import (
+    LAYOUT_AUTO, LAYOUT_CELLS, LAYOUT_SPATIAL, LINE_BLANK, LINE_CODIGO, LINE_PAGE_NUMBER, LINE_SECTION, LINE_SKU, LINE_TEXT,
+    detect_layout, extract_catalogo, extract_text_from_pdf, join_pages, layout_text_from_words, lex_catalog_lines, parse_catalog_text,
+)
+from src.catalogo_spatial_parser import _iter_pages, parse_spatial_catalog
+
+
+PAGE = [
+    " TORNILLO AUTOPERFORANTE                                 TORNILLO TX",
+    "  CODIGO      NOMINAL     ENVASE                         CODIGO      NOMINAL     ENVASE",
+    "  120ATPF     #12-24      100 U                          100TX01     6.3         100 U",
+    "",
+    "                                                 Página 1 de 8",
+]
+
+
+def _words(lines, char_width=5.0, line_height=12.0):
+    """Palabras con coordenadas como las de page.get_text("words")."""
+    words = []
+    for row, line in enumerate(lines):
+        col = 0
+        for n, token in enumerate(line.split()):
+            col = line.index(token, col)
+            x0 = col * char_width
+            y0 = row * line_height
+            words.append((x0, y0, x0 + len(token) * char_width, y0 + 10.0, token, 0, row, n))
+            col += len(token)
+    return words
+
+
+class TestLayoutText:
+    """Reconstrucción de líneas desde coordenadas de palabras."""
+    
+    def test_conserva_columnas(self):
+        assert layout_text_from_words(_words(PAGE)) == "\n".join(PAGE)
+    
+    def test_orden_de_palabras_y_desalineacion_vertical(self):
+        words = _words(PAGE)[::-1]
+        # Palabras de la misma fila con y levemente distinta
+        words = [(x0, y0 + (1.5 if n % 2 else 0), x1, y1, t, b, l, n) for x0, y0, x1, y1, t, b, l, n in words]
+        assert layout_text_from_words(words) == "\n".join(PAGE)
+    
+    def test_palabras_solapadas_separadas(self):
+        words = [(0, 0, 30, 10, 'CODIGO', 0, 0, 0), (20, 0, 40, 10, 'X', 0, 0, 1)]
+        assert layout_text_from_words(words, char_width=5.0) == "CODIGO X"
+    
+    def test_pagina_vacia(self):
+        assert layout_text_from_words([]) == ""
+    
+    def test_marcadores_de_pagina(self):
+        text = join_pages([(1, "A"), (2, "B")])
+        assert text == "A\n<<<\f\nB\n<<<\f"
+        pages = list(_iter_pages(text.splitlines()))
+        # Como en el .txt de LLMWhisper, el último marcador abre una página vacía
+        assert [[l for l in p if l.strip() and not l.startswith('<<<')] for p in pages] == [['A'], ['B'], []]
+
+
+class TestExtractTextFromPdf:
+    """Extracción en varios procesos (requiere PyMuPDF)."""
+    
+    def test_paralelo_igual_a_secuencial(self, tmp_path):
+        fitz = pytest.importorskip('fitz')
+        pdf_path = tmp_path / 'catalogo.pdf'
+        with fitz.open() as doc:
+            for n in range(12):
+                page = doc.new_page()
+                page.insert_text((50, 72), f"CODIGO      NOMINAL", fontname='cour', fontsize=10)
+                page.insert_text((50, 86), f"SKU{n:03d}      #8", fontname='cour', fontsize=10)
+            doc.save(pdf_path)
+        
+        secuencial = extract_text_from_pdf(str(pdf_path), workers=1)
+        paralelo = extract_text_from_pdf(str(pdf_path), workers=3)
+        assert paralelo == secuencial
+        assert [n for n, _t in paralelo] == list(range(1, 13))
+        assert "SKU011" in paralelo[-1][1]
+
+
+CELLS = [
+    "FIJACIONES - Tornillos para Metalcon",
+    "Zincado Brillante",
+    "CODIGO",
+    "NOMINAL",
+    "LARGO",
+    "52ATPF",
+    "#8",
+    '1/2"',
+    "65ATPF-G",
+    "#10",
+    '3/4"',
+    "Página 1 de 8",
+]
+
+
+class TestCatalogEngine:
+    """Un solo lexeo y back-end elegido según el layout."""
+    
+    def test_lexer_clasifica_una_vez(self):
+        kinds = [t.kind for t in lex_catalog_lines(CELLS[:6] + ["", "Página 1 de 8"])]
+        assert kinds == [LINE_SECTION, LINE_TEXT, LINE_CODIGO, LINE_TEXT, LINE_TEXT, LINE_SKU, LINE_BLANK, LINE_PAGE_NUMBER]
+        assert lex_catalog_lines([PAGE[1]])[0].second_codigo == PAGE[1].index("CODIGO", 3)
+    
+    def test_detecta_layout(self):
+        assert detect_layout(lex_catalog_lines(CELLS)) == LAYOUT_CELLS
+        assert detect_layout(lex_catalog_lines(PAGE)) == LAYOUT_SPATIAL
+    
+    def test_back_end_celdas(self):
+        result = parse_catalog_text("\n".join(CELLS))
+        assert result["layout"] == LAYOUT_CELLS
+        assert result["structure"] == {"FIJACIONES": {"Tornillos para Metalcon": {"skus": ["52ATPF", "65ATPF-G"]}}}
+        assert result["products"]["65ATPF-G"]["attributes"] == [
+            {"name": "NOMINAL", "value": "#10"},
+            {"name": "LARGO", "value": '3/4"'},
+            {"name": "Subcategoría / Acabado", "value": "Zincado Brillante"},
+        ]
+    
+    def test_back_end_espacial_igual_al_parser(self):
+        text = "\n".join(["FIJACIONES - Tornillos para Metalcon"] + PAGE)
+        result = parse_catalog_text(text)
+        assert result["layout"] == LAYOUT_SPATIAL
+        assert (result["structure"], result["products"]) == parse_spatial_catalog(text)
+        assert {"120ATPF", "100TX01"} <= set(result["products"])
+    
+    def test_layout_forzado_y_desconocido(self):
+        assert parse_catalog_text("\n".join(CELLS), layout=LAYOUT_SPATIAL)["layout"] == LAYOUT_SPATIAL
+        with pytest.raises(ValueError):
+            parse_catalog_text("", layout="columnas")
+    
+    @pytest.mark.parametrize('layout, expected', [(LAYOUT_CELLS, {"52ATPF", "65ATPF-G"}), (LAYOUT_AUTO, {"120ATPF", "100TX01"})])
+    def test_fallback_pymupdf_en_formato_del_back_end(self, tmp_path, monkeypatch, layout, expected):
+        """Sin LLMWhisper, el texto de PyMuPDF sale en el formato que lee el back-end pedido."""
+        def fake_extract(pdf_path, layout=True, workers=None):
+            lines = ["FIJACIONES - Tornillos para Metalcon"] + PAGE if layout else CELLS
+            return [(1, "\n".join(lines))]
+        
+        monkeypatch.setattr(src.catalogo_pdf, 'extract_text_from_pdf', fake_extract)
+        pdf = tmp_path / 'catalogo.pdf'
+        pdf.write_bytes(b'%PDF-1.4 falso')
+        data = extract_catalogo(str(pdf), use_llmwhisper=False, layout=layout)
+        assert set(data["products"]) == expected
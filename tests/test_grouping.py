@@ -0,0 +1,128 @@
+"""
+Tests para el agrupador de productos (asignación por columnas).
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import re
+import logging
+
+import numpy as np
+import pytest
+import pandas as pd
+from src.grouping import ProductGrouper
+
+
+def _group_products_loop(grouper, df):
+    """Implementación de referencia: groupby + escrituras escalares con .loc."""
+    df = df.copy()
+    if 'SKU_Origen' not in df.columns and 'SKU' in df.columns:
+        df['SKU_Origen'] = df['SKU'].copy()
+    df['Es_Padre_Potencial'] = df['Nombre_Limpio'].apply(grouper._is_potential_parent)
+    df['Tipo'] = 'simple'
+    df['SKU_WooCommerce'] = ''
+    df['SKU_Parent'] = None
+    df['Nombre_Base'] = df['Nombre_Limpio'].apply(grouper._extract_base_name)
+    has_origin = 'SKU_Origen' in df.columns
+    
+    for _, group_df in df.groupby('Nombre_Base'):
+        group_indices = group_df.index.tolist()
+        if len(group_df) > 1:
+            parent_idx = group_indices[0]
+            df.loc[parent_idx, 'Tipo'] = 'variable'
+            if has_origin and pd.notna(df.loc[parent_idx, 'SKU_Origen']):
+                parent_sku = re.sub(r'-[A-Z0-9]+$', '', str(df.loc[parent_idx, 'SKU_Origen']).strip())
+            else:
+                parent_sku = grouper._generate_parent_sku(df.loc[parent_idx, 'Nombre_Limpio'])
+            df.loc[parent_idx, 'SKU_WooCommerce'] = parent_sku
+            df.loc[parent_idx, 'SKU_Parent'] = None
+            for var_idx in group_indices[1:]:
+                df.loc[var_idx, 'Tipo'] = 'variable'
+                df.loc[var_idx, 'SKU_Parent'] = parent_sku
+                if has_origin and pd.notna(df.loc[var_idx, 'SKU_Origen']):
+                    var_sku = str(df.loc[var_idx, 'SKU_Origen']).strip()
+                else:
+                    var_sku = grouper._generate_variation_sku(
+                        parent_sku, df.loc[var_idx, 'Nombre_Limpio'], df.loc[var_idx])
+                df.loc[var_idx, 'SKU_WooCommerce'] = var_sku
+        else:
+            idx = group_indices[0]
+            if has_origin and pd.notna(df.loc[idx, 'SKU_Origen']):
+                df.loc[idx, 'SKU_WooCommerce'] = str(df.loc[idx, 'SKU_Origen']).strip()
+            else:
+                df.loc[idx, 'SKU_WooCommerce'] = grouper._generate_simple_sku(df.loc[idx, 'Nombre_Limpio'])
+    
+    df.loc[df['SKU_WooCommerce'].isna() | (df['SKU_WooCommerce'] == ''), 'SKU_WooCommerce'] = \
+        df['Nombre_Limpio'].apply(grouper._generate_simple_sku)
+    df['SKU'] = df['SKU_WooCommerce']
+    return df
+
+
+@pytest.fixture(scope="module")
+def grouper():
+    return ProductGrouper()
+
+
+def _frame(with_sku=True):
+    nombres = [
+        'TORNILLO HEXAGONAL INOX M6 X 30MM',
+        'TORNILLO HEXAGONAL INOX M8 X 40MM',
+        'ABRAZADERA 1/2 COBRE OMEGA',
+        'KIT TARUGOS SURTIDO',
+        'ABRAZADERA 3/4 COBRE OMEGA',
+        'TORNILLO HEXAGONAL INOX M10',
+        'LLAVE ALLEN',
+        np.nan,
+        'CABLE 5M',
+        'CABLE 10M',
+    ]
+    df = pd.DataFrame({
+        'Nombre_Limpio': nombres,
+        'Tiene_Medidas': [True] * len(nombres),
+        'Atributo_diametro': ['M6', 'M8', '1/2"', None, '3/4"', 'M10', None, None, None, None],
+        'Atributo_diametro_confianza': [0.9] * len(nombres),
+        'Atributo_material': ['INOX', 'INOX', 'COBRE', None, 'COBRE', None, None, None, None, None],
+    })
+    if with_sku:
+        df['SKU'] = ['TOR-M6', 'TOR-M8', None, 'KIT-1', 'ABR-34', None, ' LL-01 ', 'X-1', 'CAB-5', None]
+    return df
+
+
+class TestVectorizedGrouping:
+    """La asignación por columnas debe reproducir el recorrido por grupos."""
+    
+    @pytest.mark.parametrize("with_sku", [True, False])
+    def test_paridad_con_recorrido_por_grupos(self, grouper, with_sku):
+        df = _frame(with_sku)
+        esperado = _group_products_loop(grouper, df)
+        obtenido = grouper.group_products(df)
+        pd.testing.assert_frame_equal(obtenido, esperado)
+    
+    def test_paridad_con_indice_no_secuencial(self, grouper):
+        df = _frame().sample(frac=1, random_state=7)
+        df.index = [f'fila-{i}' for i in range(len(df))]
+        esperado = _group_products_loop(grouper, df)
+        obtenido = grouper.group_products(df)
+        pd.testing.assert_frame_equal(obtenido, esperado)
+    
+    def test_estructura_padre_variaciones(self, grouper):
+        df = grouper.group_products(_frame())
+        tornillos = df[df['Nombre_Base'] == 'TORNILLO HEXAGONAL INOX']
+        assert list(tornillos['Tipo']) == ['variable'] * 3
+        assert tornillos['SKU_Parent'].iloc[0] is None
+        assert list(tornillos['SKU_Parent'].iloc[1:]) == ['TOR'] * 2
+        assert df.loc[6, 'SKU'] == 'LL-01'
+        assert df.loc[7, 'SKU'] == 'PROD'
+    
+    def test_log_por_grupo_solo_en_debug(self, grouper, caplog):
+        with caplog.at_level(logging.INFO, logger='src.grouping'):
+            grouper.group_products(_frame())
+        assert not any('Grupo encontrado' in r.message for r in caplog.records)
+        
+        caplog.clear()
+        with caplog.at_level(logging.DEBUG, logger='src.grouping'):
+            grouper.group_products(_frame())
+        grupos = [r for r in caplog.records if 'Grupo encontrado' in r.message]
+        assert len(grupos) == 2
+        assert all(r.levelno == logging.DEBUG for r in grupos)
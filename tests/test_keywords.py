@@ -0,0 +1,53 @@
+"""
+Tests para el autómata de palabras clave (Aho-Corasick).
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.keywords import KeywordMatcher
+from src.cleaner import DataCleaner
+from src.grouping import ProductGrouper
+
+
+class TestKeywordMatcher:
+    """Misma semántica que `keyword in text` para cada palabra."""
+    
+    def test_encuentra_todas_las_apariciones(self):
+        matcher = KeywordMatcher(['he', 'she', 'hers', 'his'])
+        found = sorted((start, word) for start, word, _, _ in matcher.iter_matches('ushers'))
+        assert found == [(1, 'she'), (2, 'he'), (2, 'hers')]
+    
+    def test_prioridad_por_orden_de_declaracion(self):
+        matcher = KeywordMatcher([('abrazadera', 'abrazaderas'), ('tuerca abraz', 'abrazaderas'),
+                                  ('tuerca', 'tuercas')])
+        assert matcher.first_by_priority('TUERCA ABRAZADERA') == 'abrazaderas'
+        assert matcher.first_by_priority('TUERCA M6') == 'tuercas'
+        assert matcher.first_by_priority('PERNO') is None
+    
+    def test_minusculas(self):
+        matcher = KeywordMatcher(['Kit'])
+        assert matcher.contains_any('KIT SURTIDO')
+        assert not matcher.contains_any('KI T')
+
+
+class TestCallSites:
+    """Detección de familia, padre potencial y ruido con el autómata."""
+    
+    def test_familia_primera_declarada(self):
+        cleaner = DataCleaner()
+        # 'abrazaderas' se declara antes que 'tuercas' en rules.yaml
+        assert cleaner._detect_family('TUERCA ABRAZADERA 1/2') == 'abrazaderas'
+        assert cleaner._detect_family('TUERCA HEXAGONAL M8') == 'tornillos'
+        assert cleaner._detect_family('ARANDELA') is None
+    
+    def test_padre_potencial(self):
+        grouper = ProductGrouper()
+        assert grouper._is_potential_parent('KIT TARUGOS')
+        assert not grouper._is_potential_parent('TARUGO 8MM')
+    
+    def test_ruido_en_orden(self):
+        cleaner = DataCleaner()
+        assert cleaner.clean_name('OFERTA abrazadera STOCK') == 'ABRAZADERA'
+        # Quitar STOCK deja PROMO, que se elimina después (orden original)
+        assert cleaner.clean_name('PROSTOCKMO tarugo') == 'TARUGO'
@@ -0,0 +1,207 @@
+"""
+Tests para la extracción en paralelo con LLMWhisper (llmwhisper_extract).
+
+Se usa un servidor HTTP local que imita la API v2 (whisper, whisper-status,
+whisper-retrieve) en lugar del servicio real.
+"""
+import sys
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest
+from src.llmwhisper_extract import WhisperApiError, WhisperHttpClient, get_pdf_text_via_llmwhisper
+
+
+class StubWhisperer:
+    """Estado del servidor falso: lotes en curso, fallos programados y concurrencia."""
+    
+    def __init__(self, failures=None, status_polls=2, failure_code=500, status_failures=None, error_batches=None):
+        self.failures = dict(failures or {})  # rango -> nº de envíos que fallan
+        self.failure_code = failure_code
+        self.status_failures = dict(status_failures or {})  # rango -> nº de sondeos con 503
+        self.error_batches = dict(error_batches or {})  # rango -> nº de lotes que terminan en error
+        self.status_polls = status_polls
+        self.submissions = []
+        self.polls = {}
+        self.in_flight = set()
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+    
+    def handler(self):
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+            
+            def _reply(self, code, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def do_POST(self):
+                url = urllib.parse.urlparse(self.path)
+                params = urllib.parse.parse_qs(url.query)
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                page_range = params['pages_to_extract'][0]
+                with stub.lock:
+                    stub.submissions.append(page_range)
+                    if stub.failures.get(page_range, 0) > 0:
+                        stub.failures[page_range] -= 1
+                        return self._reply(stub.failure_code, {'message': 'fallo'})
+                    whisper_hash = f"h{page_range}-{len(stub.submissions)}"
+                    stub.polls[whisper_hash] = 0
+                    stub.in_flight.add(whisper_hash)
+                    stub.max_in_flight = max(stub.max_in_flight, len(stub.in_flight))
+                self._reply(202, {'whisper_hash': whisper_hash, 'status': 'processing'})
+            
+            def do_GET(self):
+                url = urllib.parse.urlparse(self.path)
+                whisper_hash = urllib.parse.parse_qs(url.query)['whisper_hash'][0]
+                page_range = whisper_hash[1:].rsplit('-', 1)[0]
+                if url.path.endswith('/whisper-status'):
+                    with stub.lock:
+                        if stub.status_failures.get(page_range, 0) > 0:
+                            stub.status_failures[page_range] -= 1
+                            return self._reply(503, {'message': 'no disponible'})
+                        if stub.error_batches.get(page_range, 0) > 0:
+                            stub.error_batches[page_range] -= 1
+                            return self._reply(200, {'status': 'error'})
+                        stub.polls[whisper_hash] += 1
+                        # Los primeros lotes tardan más: terminan fuera de orden
+                        start = int(page_range.split('-')[0])
+                        done = stub.polls[whisper_hash] > stub.status_polls + (start < 20)
+                    return self._reply(200, {'status': 'processed' if done else 'processing'})
+                with stub.lock:
+                    stub.in_flight.discard(whisper_hash)
+                self._reply(200, {'result_text': f"texto {page_range}"})
+        
+        return Handler
+
+
+@pytest.fixture
+def stub_server():
+    """Levanta el servidor falso; devuelve una función que crea el stub y su cliente."""
+    servers = []
+    
+    def start(**kwargs):
+        stub = StubWhisperer(**kwargs)
+        server = ThreadingHTTPServer(('127.0.0.1', 0), stub.handler())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        client = WhisperHttpClient(base_url=f"http://127.0.0.1:{server.server_port}/api/v2", api_key='test')
+        return stub, client
+    
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / 'catalogo.pdf'
+    path.write_bytes(b'%PDF-1.4 falso')
+    return path
+
+
+def _extract(pdf_path, client, **kwargs):
+    options = dict(total_pages=95, pages_per_batch=20, poll_interval=0.01, retry_backoff=0.01, cache_dir=None)
+    options.update(kwargs)
+    return get_pdf_text_via_llmwhisper(str(pdf_path), client=client, **options)
+
+
+class TestParallelBatches:
+    """Lotes en paralelo contra el servidor falso."""
+    
+    def test_texto_en_orden_de_paginas(self, stub_server, pdf_path, tmp_path):
+        stub, client = stub_server()
+        txt_path = tmp_path / 'catalogo.txt'
+        text = _extract(pdf_path, client, max_workers=3, txt_path=txt_path)
+        
+        rangos = ['1-20', '21-40', '41-60', '61-80', '81-95']
+        esperado = []
+        for page_range in rangos:
+            esperado += [f"<<< Páginas {page_range} >>>", f"texto {page_range}"]
+        assert text == "\n".join(esperado)
+        assert txt_path.read_text(encoding='utf-8') == text
+        assert sorted(stub.submissions) == sorted(rangos)
+        assert 1 < stub.max_in_flight <= 3
+    
+    def test_reintenta_lote_fallido(self, stub_server, pdf_path):
+        stub, client = stub_server(failures={'41-60': 2})
+        text = _extract(pdf_path, client, max_workers=4, max_retries=2)
+        assert 'texto 41-60' in text
+        assert stub.submissions.count('41-60') == 3
+    
+    def test_agota_reintentos(self, stub_server, pdf_path):
+        stub, client = stub_server(failures={'21-40': 10})
+        with pytest.raises(WhisperApiError) as excinfo:
+            _extract(pdf_path, client, max_workers=2, max_retries=1)
+        assert excinfo.value.status_code == 500
+        assert stub.submissions.count('21-40') == 2
+    
+    def test_reintenta_sondeo_sin_reenviar(self, stub_server, pdf_path):
+        stub, client = stub_server(status_failures={'41-60': 2})
+        text = _extract(pdf_path, client, max_workers=4, max_retries=2)
+        assert 'texto 41-60' in text
+        assert stub.submissions.count('41-60') == 1
+    
+    def test_lote_en_error_se_reenvia(self, stub_server, pdf_path):
+        stub, client = stub_server(error_batches={'1-20': 1})
+        text = _extract(pdf_path, client, max_workers=4, max_retries=1)
+        assert 'texto 1-20' in text
+        assert stub.submissions.count('1-20') == 2
+    
+    def test_error_4xx_no_se_reintenta(self, stub_server, pdf_path):
+        stub, client = stub_server(failures={'21-40': 10}, failure_code=401)
+        with pytest.raises(WhisperApiError) as excinfo:
+            _extract(pdf_path, client, max_workers=2, max_retries=3, retry_backoff=5)
+        assert excinfo.value.status_code == 401
+        assert stub.submissions.count('21-40') == 1
+
+
+class TestBatchCache:
+    """Los lotes terminados se guardan y una nueva ejecución pide solo los que faltan."""
+    
+    def test_reanuda_solo_lotes_faltantes(self, stub_server, pdf_path, tmp_path):
+        cache_dir = tmp_path / 'cache'
+        stub, client = stub_server(failures={'61-80': 10})
+        with pytest.raises(WhisperApiError):
+            _extract(pdf_path, client, max_workers=2, max_retries=1, cache_dir=cache_dir)
+        guardados = sorted(p.name for p in cache_dir.rglob('*.txt'))
+        assert 'layout_preserving_61-80.txt' not in guardados
+        assert 'layout_preserving_1-20.txt' in guardados
+        
+        stub, client = stub_server()
+        txt_path = tmp_path / 'catalogo.txt'
+        text = _extract(pdf_path, client, max_workers=2, cache_dir=cache_dir, txt_path=txt_path)
+        pendientes = {'1-20', '21-40', '41-60', '61-80', '81-95'} - {
+            name[len('layout_preserving_'):-len('.txt')] for name in guardados
+        }
+        assert sorted(stub.submissions) == sorted(pendientes)
+        assert txt_path.read_text(encoding='utf-8') == text
+        assert text.count('<<< Páginas') == 5 and 'texto 61-80' in text
+        
+        # Todo en caché: no se llama a la API
+        stub, client = stub_server()
+        assert _extract(pdf_path, client, max_workers=1, cache_dir=cache_dir) == text
+        assert stub.submissions == []
+    
+    def test_clave_incluye_pdf_y_output_mode(self, stub_server, pdf_path, tmp_path):
+        cache_dir = tmp_path / 'cache'
+        stub, client = stub_server()
+        _extract(pdf_path, client, max_workers=2, cache_dir=cache_dir)
+        _extract(pdf_path, client, max_workers=2, cache_dir=cache_dir, output_mode='text')
+        assert len(stub.submissions) == 10
+        
+        pdf_path.write_bytes(b'%PDF-1.4 otro contenido')
+        _extract(pdf_path, client, max_workers=2, cache_dir=cache_dir)
+        assert len(stub.submissions) == 15
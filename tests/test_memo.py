@@ -0,0 +1,46 @@
+"""
+Tests para la memoización por nombre compartida entre etapas.
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pandas as pd
+from src.memo import NameMemo
+
+
+class TestNameMemo:
+    """Una llamada por nombre único, resultado difundido a todas las filas."""
+    
+    def test_map_calcula_una_vez_por_nombre(self):
+        calls = []
+        
+        def upper(name):
+            calls.append(name)
+            return name.upper()
+        
+        memo = NameMemo()
+        names = pd.Series(['a', 'b', 'a', 'a', 'b'], index=[10, 11, 12, 13, 14])
+        result = memo.map(names, upper, 'upper')
+        
+        assert result.tolist() == ['A', 'B', 'A', 'A', 'B']
+        assert result.index.tolist() == [10, 11, 12, 13, 14]
+        assert sorted(calls) == ['a', 'b']
+        assert memo.stats['upper'].misses == 2
+        assert memo.stats['upper'].hits == 3
+    
+    def test_map_equivale_a_apply(self):
+        memo = NameMemo()
+        names = pd.Series(['x 1', 'y', None, 'x 1'])
+        esperado = names.apply(lambda n: isinstance(n, str) and '1' in n)
+        obtenido = memo.map(names, lambda n: isinstance(n, str) and '1' in n, 'tiene_1')
+        pd.testing.assert_series_equal(obtenido, esperado)
+    
+    def test_lru_acotado(self):
+        memo = NameMemo(maxsize=2)
+        for name in ['a', 'b', 'c']:
+            memo.get('ns', name, str.upper)
+        memo.get('ns', 'a', str.upper)
+        assert memo.stats['ns'].misses == 4
+        memo.get('ns', 'c', str.upper)
+        assert memo.stats['ns'].hits == 1
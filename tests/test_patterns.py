@@ -0,0 +1,100 @@
+"""
+Tests para el extractor de patrones (motor de regex precompiladas).
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import re
+
+import pytest
+import pandas as pd
+from src.patterns import PatternExtractor, compile_attribute_patterns, _has_nested_groups
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    return PatternExtractor()
+
+
+NOMBRES = [
+    'ABRAZADERA TITAN MINI T10 1/4"',
+    'TORNILLO M6 ACERO 30MM',
+    'PERNO 1 1/8" X 10CM',
+    'CABLE 5M GALVANIZADO PACK 10',
+    'LLAVE 3/8" INOX ESPESOR 2.5',
+    'Ø12.5 TUERCA HEXAGONAL',
+    'KIT TARUGOS 100 PZ',
+    'LARGO 12 INCH',
+    'CAJA/50 TORNILLOS 2,5MM X 5 M',
+]
+
+
+def _extract_uncompiled(text, patterns):
+    """Implementación de referencia: re.finditer patrón por patrón."""
+    values = []
+    for pattern in patterns:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            if match.lastindex == 1:
+                value = match.group(1)
+            elif match.lastindex == 2:
+                value = f"{match.group(1)} {match.group(2)}/8\""
+            else:
+                continue
+            if value not in [v for v, _ in values]:
+                values.append((value, pattern))
+    return values
+
+
+class TestCompiledPatterns:
+    """El motor compilado debe devolver lo mismo que el escaneo sin compilar."""
+    
+    @pytest.mark.parametrize("nombre", NOMBRES)
+    def test_paridad_con_escaneo_por_patron(self, extractor, nombre):
+        text = nombre.upper()
+        result = extractor.extract_all_attributes(nombre)
+        for attr_name, patterns in extractor.patterns.items():
+            expected = _extract_uncompiled(text, patterns)
+            got = [(a.value, a.pattern_used) for a in result.get(attr_name, [])]
+            assert got == expected, attr_name
+    
+    def test_flags_inline_se_fusionan(self):
+        compiled = compile_attribute_patterns('material', [r'(?i)(acero|inox)', r'(cobre)'])
+        assert compiled.combined is not None
+        assert compiled.combined.search('TUBO INOX') is not None
+        assert compiled.combined.search('TUBO PVC') is None
+    
+    def test_patron_invalido_se_descarta_al_compilar(self):
+        compiled = compile_attribute_patterns('largo', [r'(\d+', r'(\d+)\s*cm'])
+        assert [src for src, _ in compiled.patterns] == [r'(\d+)\s*cm']
+
+
+class TestVectorizedExtraction:
+    """El modo por columnas debe producir exactamente las mismas columnas."""
+    
+    def _frame(self):
+        return pd.DataFrame({
+            'Nombre_Limpio': NOMBRES + ['', None, 3, 'TORNILLO M6 ACERO 30MM'],
+            'Otro': range(len(NOMBRES) + 4),
+        })
+    
+    def test_paridad_con_modo_fila_a_fila(self, extractor):
+        df = self._frame()
+        esperado = extractor.extract_to_dataframe(df, vectorized=False)
+        obtenido = extractor.extract_to_dataframe(df, vectorized=True)
+        pd.testing.assert_frame_equal(obtenido, esperado)
+    
+    def test_indice_no_secuencial(self, extractor):
+        df = self._frame()
+        df.index = [f'fila-{i}' for i in range(len(df))]
+        obtenido = extractor.extract_to_dataframe(df)
+        assert len(obtenido) == len(df)
+        assert obtenido.loc['fila-1', 'Atributo_diametro'] == '30'
+        assert obtenido.loc['fila-1', 'Atributo_material'] == 'ACERO'
+        assert obtenido.loc['fila-9', 'Atributo_diametro_cantidad'] == 0
+    
+    def test_grupos_anidados(self):
+        assert _has_nested_groups(r'((\d+)mm)')
+        assert not _has_nested_groups(r'(\d+)/(\d+)\s*"')
+        assert not _has_nested_groups(r'(?:pack|caja)\s*(\d+)')
+        assert not _has_nested_groups(r'([(])(\d+)')
@@ -0,0 +1,117 @@
+"""
+Tests para el formato de revisión (padres explícitos WooCommerce).
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import random
+
+import numpy as np
+import pytest
+import pandas as pd
+from src.review import ReviewFormatter
+
+
+@pytest.fixture
+def formatter():
+    return ReviewFormatter()
+
+
+def _src():
+    """Salida típica del agrupador: padre original + variaciones."""
+    return pd.DataFrame({
+        'Nombre_Base': ['TORNILLO HEX', 'TORNILLO HEX', 'TORNILLO HEXAGONAL', 'TORNILLO HEX', 'LLAVE'],
+        'Nombre_Limpio': ['TORNILLO HEX M6', 'TORNILLO HEX M8', 'TORNILLO HEX M10', 'TORNILLO HEX M12', 'LLAVE'],
+        'SKU_Parent': [None, 'TOR', 'TOR', 'TOR', None],
+    })
+
+
+def _review(src):
+    return pd.DataFrame({
+        'ID': None,
+        'Tipo': ['variable', 'variable', 'variable', 'variable', 'simple'],
+        'SKU': ['TOR', 'T-8', 'T-10', 'T-12', 'LL-1'],
+        'SKU_Original': ['TOR-6', 'T-8', '', 'T-12', 'LL-1'],
+        'Nombre': src['Nombre_Limpio'],
+        'Categorías': ['Tornillos', 'Otros', 'Otros', 'Otros', 'Llaves'],
+        'Precio normal': [100, 110, 120, 130, 50],
+        'Nombre del atributo 1': ['Diámetro'] * 5,
+        'Valor(es) del atributo 1': ['M6', 'M8 ', 'M8', 'M12', ''],
+        'Nombre del atributo 2': [''] * 5,
+        'Valor(es) del atributo 2': [''] * 5,
+        '_SKU_Parent_Temp': src['SKU_Parent'].fillna(''),
+    })
+
+
+class TestExplicitParents:
+    """Padres explícitos construidos en bloque a partir de una agrupación."""
+    
+    def test_crea_un_padre_por_grupo(self, formatter):
+        src = _src()
+        result = formatter._ensure_explicit_parents_woo(src, _review(src))
+        assert len(result) == 6
+        padre = result.iloc[0]
+        assert padre['Tipo'] == 'variable'
+        assert padre['SKU'].startswith('GRP-TORNILLO-HEX-')
+        # Moda de Nombre_Base entre los hijos
+        assert padre['Nombre'] == 'TORNILLO HEX'
+        assert padre['Precio normal'] == ''
+        assert padre['Categorías'] == 'Tornillos'
+        assert padre['Valor(es) del atributo 1'] == 'M6|M8|M12'
+    
+    def test_hijos_pasan_a_variation_con_sku_original(self, formatter):
+        src = _src()
+        result = formatter._ensure_explicit_parents_woo(src, _review(src))
+        hijos = result.iloc[1:5]
+        assert list(hijos['Tipo']) == ['variation'] * 4
+        assert set(hijos['_SKU_Parent_Temp']) == {result.iloc[0]['SKU']}
+        # SKU original restaurado salvo cuando está vacío
+        assert list(hijos['SKU']) == ['TOR-6', 'T-8', 'T-10', 'T-12']
+        assert result.iloc[5]['Tipo'] == 'simple'
+    
+    def test_sin_nombre_base_usa_primer_hijo(self, formatter):
+        src = _src()
+        result = formatter._ensure_explicit_parents_woo(src.drop(columns=['Nombre_Base']), _review(src))
+        assert result.iloc[0]['Nombre'] == 'TORNILLO HEX M8'
+    
+    def test_sku_padre_no_colisiona(self, formatter):
+        src = _src()
+        review = _review(src)
+        primero = formatter._ensure_explicit_parents_woo(src, review).iloc[0]['SKU']
+        review.loc[4, 'SKU'] = primero
+        segundo = formatter._ensure_explicit_parents_woo(src, review).iloc[0]['SKU']
+        assert segundo == f"{primero}-1"
+
+
+def _frame_mixto(n=300, seed=1):
+    """Columnas con valores mixtos (NaN, None, números, bool, 'None')."""
+    rnd = random.Random(seed)
+    pool = [None, np.nan, '', 'None', 'x', 'ABC mm"', 0, 3, 2.5, -1, True, False, '  ',
+            'TORNILLO 3/8" MM']
+    cols = ['Nombre_Original', 'Nombre_Limpio', 'Familia_Detectada', 'Marca_Detectada',
+            'Tiene_Medidas', 'Atributo_diametro', 'Atributo_cantidad', 'Atributo_diametro_confianza',
+            'Atributo_largo', 'Atributo_material']
+    df = pd.DataFrame({c: [rnd.choice(pool) for _ in range(n)] for c in cols}, dtype=object)
+    df['Atributo_cantidad_cantidad'] = [rnd.randint(-1, 3) for _ in range(n)]
+    df.index = [f'p{i}' for i in range(n)]
+    return df
+
+
+class TestColumnarScoring:
+    """Etiquetas y confianza por columnas = resultado de apply(axis=1)."""
+    
+    def test_etiquetas_paridad(self, formatter):
+        df = _frame_mixto()
+        esperado = df.apply(formatter._generate_tags, axis=1)
+        pd.testing.assert_series_equal(formatter._generate_tags_column(df), esperado)
+    
+    def test_confianza_paridad(self, formatter):
+        df = _frame_mixto()
+        esperado = df.apply(formatter._calculate_confidence, axis=1)
+        pd.testing.assert_series_equal(formatter._calculate_confidence_column(df), esperado)
+    
+    def test_columnas_ausentes(self, formatter):
+        df = pd.DataFrame({'Nombre_Limpio': ['A', 'B']})
+        assert list(formatter._generate_tags_column(df)) == ['', '']
+        assert list(formatter._calculate_confidence_column(df)) == [0, 0]
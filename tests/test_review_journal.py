@@ -0,0 +1,183 @@
+"""
+Tests para el diario de ediciones del revisor (review_journal).
+"""
+import os
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.review_journal import (
+    EDIT_ADD_COLUMN, EDIT_APPEND, EDIT_DROP, EDIT_RENUMBER_IDS, EDIT_SET, EditJournal, apply_edit,
+)
+from src.review_save import save_review_files, save_targets
+
+
+def _maestro(tmp_path):
+    path = tmp_path / 'maestro.csv'
+    pd.DataFrame({
+        'ID': [1, 2, 3, 4],
+        'SKU': ['A1', 'B2', 'C3', 'D4'],
+        'Nombre': ['Tornillo', 'Perno', 'Tuerca', 'Golilla'],
+        'Precio normal': [100.0, 200.0, np.nan, 50.0],
+        'Principal': ['', '', '', ''],
+    }).to_csv(path, index=False)
+    return path
+
+
+def _load(path):
+    return pd.read_csv(path)
+
+
+def _assert_same_values(a, b):
+    """Mismo contenido; el CSV puede cambiar tipos (p. ej. columnas vacías a float)."""
+    assert a.columns.tolist() == b.columns.tolist()
+    assert a.fillna('').astype(str).values.tolist() == b.fillna('').astype(str).values.tolist()
+
+
+EDITS = [
+    {'op': EDIT_SET, 'row': 1, 'col': 'Nombre', 'value': 'Perno Ñandú'},
+    {'op': EDIT_SET, 'row': 0, 'col': 'Precio normal', 'value': np.float64(120.5)},
+    {'op': EDIT_SET, 'row': 3, 'col': 'Precio normal', 'value': None},
+    {'op': EDIT_APPEND, 'values': {'ID': np.int64(5), 'SKU': 'GRP-X', 'Nombre': 'GRUPO', 'Precio normal': np.nan, 'Principal': ''}},
+    {'op': EDIT_SET, 'row': 2, 'col': 'Principal', 'value': 'id:5'},
+    {'op': EDIT_ADD_COLUMN, 'col': 'Nombre del atributo 1', 'value': ''},
+    {'op': EDIT_DROP, 'rows': [0]},
+    {'op': EDIT_RENUMBER_IDS},
+]
+
+
+def _edit(journal, df, edits):
+    for edit in edits:
+        df = apply_edit(df, edit)
+        journal.append(edit)
+    return df
+
+
+class TestEditJournal:
+    """Las ediciones anotadas se re-aplican sobre el maestro tras un cierre inesperado."""
+    
+    def test_recupera_tras_cierre(self, tmp_path):
+        path = _maestro(tmp_path)
+        journal = EditJournal(path)
+        df, recovered = journal.open(_load(path))
+        assert recovered == 0
+        live = _edit(journal, df, EDITS)
+        journal.close()  # cierre sin guardar
+        
+        recovered_df, recovered = EditJournal(path).open(_load(path))
+        assert recovered == len(EDITS)
+        pd.testing.assert_frame_equal(recovered_df, live)
+        assert recovered_df['ID'].tolist() == [1, 2, 3, 4]
+        assert recovered_df['Nombre'].tolist()[0] == 'Perno Ñandú'
+    
+    def test_linea_incompleta(self, tmp_path):
+        path = _maestro(tmp_path)
+        journal = EditJournal(path)
+        df, _ = journal.open(_load(path))
+        df = _edit(journal, df, EDITS[:2])
+        journal.close()
+        with open(journal.path, 'a', encoding='utf-8') as f:
+            f.write('{"seq":3,"op":"se')
+        
+        journal = EditJournal(path)
+        df, recovered = journal.open(_load(path))
+        assert recovered == 2
+        df = _edit(journal, df, EDITS[2:3])
+        journal.close()
+        assert EditJournal(path).open(_load(path))[1] == 3
+    
+    def test_guardado_compacta(self, tmp_path):
+        path = _maestro(tmp_path)
+        journal = EditJournal(path)
+        df, _ = journal.open(_load(path))
+        df = _edit(journal, df, EDITS[:4])
+        
+        seq = journal.begin_snapshot()
+        snapshot = df.copy()
+        df = _edit(journal, df, EDITS[4:])  # ediciones durante el guardado
+        targets = save_targets(path)
+        save_review_files(snapshot, targets)
+        journal.snapshot_saved(seq, [p for _fmt, p in targets])
+        assert journal.unsaved == len(EDITS) - 4
+        assert len(journal.path.read_text(encoding='utf-8').splitlines()) == len(EDITS) - 4
+        journal.close()
+        
+        recovered_df, recovered = EditJournal(path).open(_load(path))
+        assert recovered == len(EDITS) - 4
+        _assert_same_values(recovered_df, df)
+    
+    def test_cierre_entre_guardado_y_registro(self, tmp_path):
+        """El archivo se reemplazó pero el estado no llegó a registrarse: no se aplica dos veces."""
+        path = _maestro(tmp_path)
+        journal = EditJournal(path)
+        df, _ = journal.open(_load(path))
+        df = _edit(journal, df, EDITS)
+        journal.begin_snapshot()
+        save_review_files(df.copy(), save_targets(path))
+        journal.close()
+        
+        recovered_df, recovered = EditJournal(path).open(_load(path))
+        assert recovered == 0
+        assert len(recovered_df) == len(df)
+    
+    def test_maestro_cambiado_fuera(self, tmp_path):
+        path = _maestro(tmp_path)
+        journal = EditJournal(path)
+        df, _ = journal.open(_load(path))
+        _edit(journal, df, EDITS[:2])
+        journal.close()
+        
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('5,E5,Otro,10.0,\n')
+        os.utime(path, ns=(1, 1))
+        journal = EditJournal(path)
+        df, recovered = journal.open(_load(path))
+        assert recovered == 0 and len(df) == 5
+        assert journal.set_aside_path is not None and journal.set_aside_path.exists()
+        assert not journal.path.exists()
+    
+    def test_descartar(self, tmp_path):
+        path = _maestro(tmp_path)
+        journal = EditJournal(path)
+        df, _ = journal.open(_load(path))
+        _edit(journal, df, EDITS[:3])
+        journal.discard()
+        assert EditJournal(path).open(_load(path))[1] == 0
+    
+    def test_edicion_desconocida(self):
+        with pytest.raises(ValueError):
+            apply_edit(pd.DataFrame(), {'op': 'mover'})
+
+
+class TestConsoleCompaction:
+    """La compactación automática de revisor.py guarda solo el maestro."""
+    
+    def test_compactar_no_exporta_woocommerce(self, tmp_path, monkeypatch):
+        from revisor import ProductReviewer
+        
+        path = _maestro(tmp_path)
+        reviewer = ProductReviewer.__new__(ProductReviewer)
+        reviewer.file_path = path
+        reviewer.df = _load(path)
+        reviewer.modified = False
+        reviewer.background_save, reviewer.save_seq = None, None
+        reviewer.journal = EditJournal(path)
+        reviewer.df, _ = reviewer.journal.open(reviewer.df)
+        monkeypatch.setattr(EditJournal, 'COMPACT_EVERY', 3)
+        
+        for i, nombre in enumerate(['Uno', 'Dos', 'Tres']):
+            reviewer.set_cell(i, 'Nombre', nombre)
+        assert reviewer.background_save is not None
+        reviewer.finish_save()
+        
+        assert not list(tmp_path.glob('woocommerce_import_*.csv'))
+        assert _load(path)['Nombre'].tolist()[:3] == ['Uno', 'Dos', 'Tres']
+        assert reviewer.journal.unsaved == 0
+        
+        # Guardar con S sí genera el CSV WooCommerce
+        reviewer.save_file()
+        reviewer.finish_save()
+        assert len(list(tmp_path.glob('woocommerce_import_*.csv'))) == 1
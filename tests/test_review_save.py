@@ -0,0 +1,91 @@
+"""
+Tests para el guardado en segundo plano del maestro de revisión (review_save).
+"""
+import sys
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pandas as pd
+import pytest
+from src import review_save
+from src.review_save import (
+    FORMAT_CSV, FORMAT_WOOCOMMERCE, FORMAT_XLSX, BackgroundSave, atomic_write, save_review_files, save_targets,
+)
+
+
+def _df():
+    return pd.DataFrame({
+        'SKU': ['A1', 'B2'],
+        'Nombre': ['Tornillo', 'Perno'],
+        'SKU_Original_1': ['a1', 'b2'],
+        'Revisado_Humano': ['Sí', 'No'],
+    })
+
+
+class TestSaveTargets:
+    def test_xlsx_guarda_excel_y_csv(self, tmp_path):
+        targets = save_targets(tmp_path / 'maestro.xlsx')
+        assert targets == [(FORMAT_XLSX, tmp_path / 'maestro.xlsx'), (FORMAT_CSV, tmp_path / 'maestro.csv')]
+    
+    def test_csv_no_pasa_por_excel(self, tmp_path):
+        targets = save_targets(tmp_path / 'maestro.CSV', woocommerce=True)
+        assert [fmt for fmt, _path in targets] == [FORMAT_CSV, FORMAT_WOOCOMMERCE]
+        assert targets[1][1].name.startswith('woocommerce_import_')
+
+
+class TestAtomicWrite:
+    def test_error_conserva_archivo_anterior(self, tmp_path):
+        path = tmp_path / 'maestro.csv'
+        path.write_text('anterior', encoding='utf-8')
+        
+        def write(tmp):
+            tmp.write_text('a medias', encoding='utf-8')
+            raise OSError('disco lleno')
+        
+        with pytest.raises(OSError):
+            atomic_write(path, write)
+        assert path.read_text(encoding='utf-8') == 'anterior'
+        assert list(tmp_path.iterdir()) == [path]
+    
+    def test_escribe_todos_los_formatos(self, tmp_path):
+        pytest.importorskip('openpyxl')
+        targets = save_targets(tmp_path / 'maestro.xlsx', woocommerce=True)
+        progress = []
+        save_review_files(_df(), targets, lambda i, total, path: progress.append((i, total, path.name)))
+        
+        assert [i for i, _total, _name in progress] == [1, 2, 3]
+        assert pd.read_excel(tmp_path / 'maestro.xlsx', sheet_name='Maestro').equals(_df())
+        assert pd.read_csv(tmp_path / 'maestro.csv').equals(_df())
+        assert pd.read_csv(targets[2][1]).columns.tolist() == ['SKU', 'Nombre']
+        assert not list(tmp_path.glob('*.tmp'))
+
+
+class TestBackgroundSave:
+    def test_guarda_la_copia_y_no_las_ediciones_posteriores(self, tmp_path, monkeypatch):
+        started, release = threading.Event(), threading.Event()
+        write_target = review_save.write_target
+        
+        def slow_write(df, fmt, path):
+            started.set()
+            release.wait(5)
+            write_target(df, fmt, path)
+        
+        monkeypatch.setattr(review_save, 'write_target', slow_write)
+        df = _df()
+        save = BackgroundSave(df, save_targets(tmp_path / 'maestro.csv')).start()
+        df.at[0, 'Nombre'] = 'Editado durante el guardado'
+        assert started.wait(5) and not save.done
+        assert save.status == 'Guardando maestro.csv (1/1)...'
+        
+        release.set()
+        assert save.wait(5)
+        assert save.error is None and save.status == 'Guardado: maestro.csv'
+        assert pd.read_csv(tmp_path / 'maestro.csv')['Nombre'].tolist() == ['Tornillo', 'Perno']
+    
+    def test_error_queda_registrado(self, tmp_path):
+        (tmp_path / 'maestro.csv').mkdir()  # no se puede reemplazar un directorio
+        save = BackgroundSave(_df(), save_targets(tmp_path / 'maestro.csv')).start()
+        assert save.wait(5)
+        assert save.error is not None and save.status.startswith('Error al guardar')
+        assert not list(tmp_path.glob('*.tmp'))
@@ -0,0 +1,365 @@
+"""
+Tests para la lista virtualizada y los índices del revisor (revisor_gui).
+
+No hace falta pantalla: se usa un Treeview falso que registra lo que se
+materializa.
+"""
+import sys
+import random
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.review_journal import EditJournal
+from revisor_gui import ProductGroupIndex, ProductReviewerGUI, ProductSearchIndex, VirtualProductList
+
+
+class FakeTree:
+    """Lo mínimo de ttk.Treeview que usa VirtualProductList."""
+    
+    def __init__(self):
+        self.items = {}
+        self.order = []
+        self._selection = ()
+        self._focus = ''
+        self.inserts = 0
+    
+    def bind(self, *args, **kwargs):
+        pass
+    
+    def get_children(self):
+        return tuple(self.order)
+    
+    def delete(self, *iids):
+        for iid in iids:
+            del self.items[iid]
+            self.order.remove(iid)
+        self._selection = tuple(i for i in self._selection if i in self.items)
+    
+    def insert(self, parent, index, iid, values, tags):
+        self.items[iid] = (values, tags)
+        self.order.append(iid)
+        self.inserts += 1
+    
+    def exists(self, iid):
+        return iid in self.items
+    
+    def item(self, iid, values, tags):
+        self.items[iid] = (values, tags)
+    
+    def selection(self):
+        return self._selection
+    
+    def selection_set(self, iids):
+        self._selection = tuple(iids)
+    
+    def focus(self, iid=None):
+        if iid is None:
+            return self._focus
+        self._focus = iid
+
+
+class FakeScrollbar:
+    def configure(self, **kwargs):
+        pass
+    
+    def set(self, first, last):
+        self.position = (first, last)
+
+
+def _make_list(rows, values=None):
+    values = values if values is not None else {}
+    tree = FakeTree()
+    view = VirtualProductList(tree, FakeScrollbar(), lambda idx: (values.get(idx, (idx,)), ['simple']))
+    view.page_size = 20
+    view.set_rows(rows)
+    return view, tree
+
+
+def _click(view, tree, iids, extend=False):
+    """Simula una selección hecha por el usuario en el árbol."""
+    view._extend_selection = extend
+    tree.selection_set([str(i) for i in iids])
+    view._on_tree_select(None)
+
+
+class TestVirtualProductList:
+    """Solo se materializa la ventana visible."""
+    
+    def test_solo_ventana_visible(self):
+        view, tree = _make_list(range(100_000))
+        assert len(tree.get_children()) == 21
+        assert tree.get_children()[0] == '0'
+        
+        view.yview('moveto', 0.5)
+        assert tree.get_children()[0] == '50000'
+        view.yview('scroll', 1, 'pages')
+        assert tree.get_children()[0] == '50020'
+        view.yview('moveto', 1.0)
+        assert tree.get_children()[-1] == '99999'
+        assert tree.inserts < 100
+    
+    def test_seleccion_sobrevive_scroll(self):
+        view, tree = _make_list(range(1000))
+        _click(view, tree, [3])
+        view.yview('moveto', 0.5)
+        assert tree.selection() == ()
+        _click(view, tree, [510], extend=True)
+        assert view.selection() == ('3', '510')
+        
+        view.yview('moveto', 0.0)
+        assert tree.selection() == ('3',)
+        _click(view, tree, [5])
+        assert view.selection() == ('5',)
+    
+    def test_select_desplaza_y_respeta_filtro(self):
+        view, tree = _make_list(range(0, 2000, 2))
+        assert view.select(1500)
+        assert '1500' in tree.get_children() and tree.focus() == '1500'
+        assert view.selection() == ('1500',)
+        assert not view.select(1501)
+    
+    def test_actualiza_fila_en_el_lugar(self):
+        values = {}
+        view, tree = _make_list(range(500), values)
+        inserts = tree.inserts
+        values[4] = ('editado',)
+        view.update_row(4)
+        view.update_row(400)  # fuera de la ventana: no se materializa
+        assert tree.items['4'][0] == ('editado',)
+        assert '400' not in tree.items
+        assert tree.inserts == inserts
+    
+    def test_refiltrar_conserva_seleccion_visible(self):
+        view, tree = _make_list(range(100))
+        _click(view, tree, [2, 7])
+        view.set_rows([7, 8, 9])
+        assert view.selection() == ('7',)
+        assert tree.get_children() == ('7', '8', '9')
+
+
+class _Var:
+    def __init__(self, value):
+        self.value = value
+    
+    def get(self):
+        return self.value
+
+
+class TestFilterMask:
+    """La máscara vectorizada filtra igual que el filtrado por pasos anterior."""
+    
+    @pytest.mark.parametrize("tipo, marca, busqueda, esperado", [
+        ('all', 'Todas', '', [0, 1, 2, 3]),
+        ('variation', 'Todas', '', [2, 3]),
+        ('pending', 'Todas', '', [1, 3]),
+        ('all', 'mamut', '', [0, 2]),
+        ('all', 'Todas', 'tor', [0, 2, 3]),
+        ('variation', 'Todas', 'ab', [3]),
+    ])
+    def test_filtros(self, tipo, marca, busqueda, esperado):
+        gui = ProductReviewerGUI.__new__(ProductReviewerGUI)
+        gui.df = pd.DataFrame({
+            'Tipo': ['simple', 'variable', 'variation', 'variation'],
+            'SKU': ['T1', 'P1', 'T2', 'AB3'],
+            'Nombre': ['Tornillo', 'Perno', 'Tornillo 2', 'Tornillo AB'],
+            'Marcas': ['Mamut', 'Otra', 'MAMUT', None],
+            'Revisado_Humano': ['Sí', 'No', 'Sí', 'No'],
+        })
+        gui.filter_var, gui.brand_filter_var, gui.search_var = _Var(tipo), _Var(marca), _Var(busqueda)
+        gui.search_index = None
+        assert gui.get_filtered_index().tolist() == esperado
+        assert gui.get_filtered_df().index.tolist() == esperado
+
+
+def _pandas_mask(df, tipo, marca, busqueda):
+    """El filtrado original, fila por fila con pandas."""
+    mask = pd.Series(True, index=df.index)
+    if tipo in ('simple', 'variable', 'variation'):
+        mask &= df['Tipo'] == tipo
+    elif tipo == 'pending':
+        mask &= df['Revisado_Humano'] != 'Sí'
+    elif tipo == 'approved':
+        mask &= df['Revisado_Humano'] == 'Sí'
+    if marca != 'Todas':
+        mask &= df['Marcas'].astype(str).str.upper() == marca.upper()
+    if busqueda:
+        mask &= (
+            df['SKU'].astype(str).str.upper().str.contains(busqueda, regex=False) |
+            df['Nombre'].astype(str).str.upper().str.contains(busqueda, regex=False)
+        )
+    return mask.to_numpy()
+
+
+def _random_df(rnd, n):
+    palabras = ['Tornillo', 'Perno', 'Golilla', 'Zincado', 'Ñandú', 'Cañería', '#8', '1/4"']
+    return pd.DataFrame({
+        'Tipo': [rnd.choice(['simple', 'variable', 'variation']) for _ in range(n)],
+        'SKU': [f"{rnd.randint(1, 99)}{rnd.choice('ABT')}TX" for _ in range(n)],
+        'Nombre': [' '.join(rnd.choice(palabras) for _ in range(3)) for _ in range(n)],
+        'Marcas': [rnd.choice(['Mamut', 'MAMUT', 'Otra', None]) for _ in range(n)],
+        'Revisado_Humano': [rnd.choice(['Sí', 'No']) for _ in range(n)],
+    })
+
+
+BUSQUEDAS = ['', 'T', 'TX', '12A', 'TORNILLO', 'TORNILLO PER', 'Ñ', 'ÑANDÚ', 'AÑ', 'XTORN', 'ZZZ']
+
+
+class TestProductSearchIndex:
+    """El índice filtra igual que pandas, también tras editar filas."""
+    
+    def test_igual_a_pandas(self):
+        df = _random_df(random.Random(1), 400)
+        index = ProductSearchIndex(df)
+        for tipo in ['all', 'variation', 'pending', 'approved']:
+            for marca in ['Todas', 'mamut']:
+                for busqueda in BUSQUEDAS:
+                    esperado = _pandas_mask(df, tipo, marca, busqueda)
+                    assert (index.filter_mask(tipo, marca, busqueda) == esperado).all(), (tipo, marca, busqueda)
+    
+    def test_no_calza_entre_sku_y_nombre(self):
+        df = pd.DataFrame({'Tipo': ['simple'], 'SKU': ['AB12'], 'Nombre': ['ACERO'], 'Marcas': [None], 'Revisado_Humano': ['No']})
+        index = ProductSearchIndex(df)
+        assert not index.filter_mask(search='12A').any()
+        assert not index.filter_mask(search='2A').any()
+        assert index.filter_mask(search='B12').all()
+    
+    def test_edicion_incremental(self):
+        rnd = random.Random(2)
+        df = _random_df(rnd, 300)
+        index = ProductSearchIndex(df)
+        index.filter_mask(search='TORNILLO')  # queda en caché
+        for _ in range(40):
+            idx = rnd.randrange(len(df))
+            df.at[idx, 'Nombre'] = rnd.choice(['Tornillo Nuevo', 'xyz', 'Perno Ñandú'])
+            df.at[idx, 'Tipo'] = rnd.choice(['simple', 'variation'])
+            df.at[idx, 'Marcas'] = rnd.choice(['Nueva', 'Mamut'])
+            df.at[idx, 'Revisado_Humano'] = rnd.choice(['Sí', 'No'])
+            index.update_rows(df, [idx])
+        for tipo in ['all', 'simple', 'approved']:
+            for marca in ['Todas', 'NUEVA']:
+                for busqueda in BUSQUEDAS + ['NUEVO', 'XYZ']:
+                    esperado = _pandas_mask(df, tipo, marca, busqueda)
+                    assert (index.filter_mask(tipo, marca, busqueda) == esperado).all(), (tipo, marca, busqueda)
+        assert index.count('approved') == (df['Revisado_Humano'] == 'Sí').sum()
+        assert index.count('variation') == (df['Tipo'] == 'variation').sum()
+    
+    def test_reconstruye_con_muchas_ediciones(self, monkeypatch):
+        monkeypatch.setattr(ProductSearchIndex, 'MAX_DIRTY_ROWS', 5)
+        df = _random_df(random.Random(3), 50)
+        index = ProductSearchIndex(df)
+        df['Nombre'] = 'Otro ' + df['Nombre']
+        index.update_rows(df, list(range(10)))
+        assert not index._dirty
+        assert (index.filter_mask(search='OTRO') == (np.arange(50) < 10)).all()
+    
+    def test_cambio_de_filas(self):
+        df = _random_df(random.Random(4), 20)
+        index = ProductSearchIndex(df)
+        assert index.matches(df)
+        assert not index.matches(df.drop([3]).reset_index(drop=True))
+
+
+def _groups_df(rnd, n_groups, n_simples):
+    rows = []
+    for g in range(n_groups):
+        rows.append({'ID': len(rows) + 1, 'Tipo': 'variable', 'Principal': None})
+    for _ in range(n_simples):
+        parent = rnd.choice([None, ''] + [f'id:{g + 1}' for g in range(n_groups + 2)])
+        rows.append({'ID': len(rows) + 1, 'Tipo': 'variation' if parent else 'simple', 'Principal': parent})
+    return pd.DataFrame(rows)
+
+
+class TestProductGroupIndex:
+    """Padre e hijos desde el índice, igual que recorriendo el DataFrame."""
+    
+    def test_igual_al_recorrido(self):
+        df = _groups_df(random.Random(5), 30, 500)
+        index = ProductGroupIndex(df)
+        for parent_id in range(1, 34):
+            assert index.children(parent_id) == df[df['Principal'] == f'id:{parent_id}'].index.tolist()
+            parent_df = df[df['ID'] == parent_id]
+            assert index.parent_row(parent_id) == (parent_df.index[0] if len(parent_df) else None)
+        assert index.parent_row(10_000) is None
+    
+    def test_set_principal(self):
+        df = _groups_df(random.Random(6), 5, 50)
+        index = ProductGroupIndex(df)
+        rnd = random.Random(7)
+        for _ in range(100):
+            idx = rnd.randrange(5, len(df))
+            principal = rnd.choice(['', 'id:1', 'id:3', 'id:4'])
+            df.at[idx, 'Principal'] = principal
+            index.set_principal(idx, principal)
+        for parent_id in range(1, 6):
+            assert index.children(parent_id) == df[df['Principal'] == f'id:{parent_id}'].index.tolist()
+    
+    def test_gui_mantiene_y_reconstruye(self):
+        gui = ProductReviewerGUI.__new__(ProductReviewerGUI)
+        gui.df = _groups_df(random.Random(8), 3, 20)
+        gui.group_index, gui.journal = None, None
+        index = gui.get_group_index()
+        
+        gui.set_principal(10, 'id:2')
+        assert 10 in gui.get_group_index().children(2)
+        assert gui.get_group_index() is index
+        
+        # Filas nuevas (crear grupo): se reconstruye con el padre agregado
+        gui.df = pd.concat([gui.df, pd.DataFrame([{'ID': 99, 'Tipo': 'variable', 'Principal': ''}])], ignore_index=True)
+        gui.set_principal(11, 'id:99')
+        assert gui.get_group_index() is not index
+        assert gui.get_group_index().parent_row(99) == len(gui.df) - 1
+        assert gui.get_group_index().children(99) == [11]
+
+
+class _Label:
+    def config(self, **kwargs):
+        self.options = kwargs
+
+
+class _Root:
+    """Guarda los callbacks de after() para ejecutarlos a mano."""
+    
+    def __init__(self):
+        self.callbacks = []
+    
+    def after(self, ms, callback):
+        self.callbacks.append(callback)
+    
+    def update_idletasks(self):
+        pass
+
+
+class TestBackgroundSaveGui:
+    """
+    Guardar no bloquea: un segundo pedido se encola y se guarda el último estado.
+    Las ediciones van al diario hasta que un guardado las incluye.
+    """
+    
+    def test_guardado_pendiente_y_espera_al_cerrar(self, tmp_path):
+        gui = ProductReviewerGUI.__new__(ProductReviewerGUI)
+        gui.root, gui.status_label, gui.modified_label = _Root(), _Label(), _Label()
+        gui.background_save, gui.save_pending = None, False
+        gui.file_path = tmp_path / 'maestro.csv'
+        gui.df = pd.DataFrame({'SKU': ['A1'], 'Nombre': ['Tornillo']})
+        gui.journal, gui.save_seq, gui.retired_journal = EditJournal(gui.file_path), None, None
+        gui.journal.start()
+        gui.modified = True
+        
+        gui.save_file()
+        assert gui.background_save is not None and not gui.modified
+        gui.set_cell(0, 'Nombre', 'Perno')
+        assert gui.journal.unsaved == 1
+        gui.modified = True
+        gui.save_file()
+        assert gui.save_pending
+        
+        gui.wait_for_save()
+        assert gui.background_save is None and not gui.save_pending
+        assert pd.read_csv(gui.file_path)['Nombre'].tolist() == ['Perno']
+        assert not (tmp_path / 'maestro.xlsx').exists()
+        assert not gui.modified
+        assert gui.status_label.options['text'] == 'Guardado: maestro.csv'
+        assert gui.journal.unsaved == 0 and not gui.journal.path.exists()
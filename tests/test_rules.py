@@ -0,0 +1,160 @@
+"""
+Tests para las reglas compiladas compartidas (CompiledRules).
+"""
+import sys
+import importlib
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest
+import src.rules
+from src.rules import CompiledRules
+from src.cleaner import DataCleaner
+from src.patterns import PatternExtractor
+from src.grouping import ProductGrouper
+from src.attributes import AttributeValidator
+
+
+RULES_YAML = """
+families:
+  abrazaderas:
+    keywords: [abrazadera, brida]
+  tornillos:
+    keywords: [tornillo]
+attributes:
+  material:
+    keywords: [Acero, Bronce]
+    patterns: ['(bronce)']
+parent_product:
+  patterns: ['surtido']
+variation_keywords:
+  diametro: [diametro]
+"""
+
+
+@pytest.fixture(autouse=True)
+def _registro_limpio():
+    CompiledRules.clear_registry()
+    yield
+    CompiledRules.clear_registry()
+
+
+@pytest.fixture
+def rules_file(tmp_path):
+    path = tmp_path / 'rules.yaml'
+    path.write_text(RULES_YAML, encoding='utf-8')
+    return path
+
+
+class TestCompiledRules:
+    """Parseo único, registro compartido y caché en disco."""
+    
+    def test_misma_instancia_en_el_proceso(self, rules_file, tmp_path):
+        a = CompiledRules.load(str(rules_file), cache_dir=str(tmp_path / 'cache'))
+        b = CompiledRules.load(str(rules_file), cache_dir=str(tmp_path / 'cache'))
+        assert a is b
+        assert a.rules['families']['tornillos']['keywords'] == ['tornillo']
+    
+    def test_etapas_comparten_artefactos(self, rules_file, tmp_path):
+        rules = CompiledRules.load(str(rules_file), cache_dir=str(tmp_path / 'cache'))
+        e1 = PatternExtractor(str(rules_file), compiled_rules=rules)
+        e2 = PatternExtractor(str(rules_file), compiled_rules=rules)
+        assert e1.compiled_patterns is e2.compiled_patterns
+        assert '(bronce)' in e1.patterns['material']
+    
+    def test_pickle_en_caliente_no_reparsea_yaml(self, rules_file, tmp_path, monkeypatch):
+        cache_dir = str(tmp_path / 'cache')
+        rules = CompiledRules.load(str(rules_file), cache_dir=cache_dir)
+        DataCleaner(str(rules_file), compiled_rules=rules)
+        ProductGrouper(str(rules_file), compiled_rules=rules)
+        AttributeValidator(str(rules_file), compiled_rules=rules)
+        assert not list((tmp_path / 'cache').glob('rules_*.pkl'))
+        rules.flush()
+        assert list((tmp_path / 'cache').glob('rules_*.pkl'))
+        
+        CompiledRules.clear_registry()
+        import src.rules
+        monkeypatch.setattr(src.rules.yaml, 'safe_load',
+                            lambda *a, **k: pytest.fail('YAML reparseado'))
+        warm = CompiledRules.load(str(rules_file), cache_dir=cache_dir)
+        assert warm is not rules
+        
+        cleaner = DataCleaner(str(rules_file), compiled_rules=warm)
+        assert cleaner._detect_family('BRIDA METALICA') == 'abrazaderas'
+        grouper = ProductGrouper(str(rules_file), compiled_rules=warm)
+        assert grouper._is_potential_parent('SURTIDO DE TORNILLOS')
+        assert grouper.variation_attributes == {'diametro'}
+        validator = AttributeValidator(str(rules_file), compiled_rules=warm)
+        assert 'bronce' in validator.valid_materials
+    
+    def test_cambio_de_yaml_invalida_cache(self, rules_file, tmp_path):
+        cache_dir = str(tmp_path / 'cache')
+        antes = CompiledRules.load(str(rules_file), cache_dir=cache_dir)
+        rules_file.write_text(RULES_YAML.replace('tornillo]', 'tornillo, perno]'), encoding='utf-8')
+        despues = CompiledRules.load(str(rules_file), cache_dir=cache_dir)
+        assert despues.content_hash != antes.content_hash
+        cleaner = DataCleaner(str(rules_file), compiled_rules=despues)
+        assert cleaner._detect_family('PERNO M8') == 'tornillos'
+    
+    def test_pickle_corrupto_se_reconstruye(self, rules_file, tmp_path):
+        cache_dir = tmp_path / 'cache'
+        rules = CompiledRules.load(str(rules_file), cache_dir=str(cache_dir))
+        rules.save()
+        for pkl in cache_dir.glob('rules_*.pkl'):
+            pkl.write_bytes(b'no es un pickle')
+        CompiledRules.clear_registry()
+        again = CompiledRules.load(str(rules_file), cache_dir=str(cache_dir))
+        assert again.rules == rules.rules
+    
+    def test_una_sola_escritura_por_carga(self, rules_file, tmp_path, monkeypatch):
+        rules = CompiledRules.load(str(rules_file), cache_dir=str(tmp_path / 'cache'))
+        escrituras = []
+        monkeypatch.setattr(rules, 'save', lambda: escrituras.append(1))
+        DataCleaner(str(rules_file), compiled_rules=rules)
+        PatternExtractor(str(rules_file), compiled_rules=rules)
+        ProductGrouper(str(rules_file), compiled_rules=rules)
+        AttributeValidator(str(rules_file), compiled_rules=rules)
+        rules.flush()
+        rules.flush()
+        assert escrituras == [1]
+    
+    def test_cambio_en_modulo_auxiliar_invalida_artefacto(self, rules_file, tmp_path, monkeypatch):
+        # Paquete con un builder que delega en un helper de otro módulo
+        package = tmp_path / 'pkg_reglas'
+        package.mkdir()
+        (package / '__init__.py').write_text('', encoding='utf-8')
+        (package / 'helper.py').write_text('def make():\n    return 1\n', encoding='utf-8')
+        (package / 'builder.py').write_text(
+            'from pkg_reglas.helper import make\n\n\ndef build():\n    return make()\n', encoding='utf-8'
+        )
+        monkeypatch.syspath_prepend(str(tmp_path))
+        import pkg_reglas.builder
+        
+        cache_dir = str(tmp_path / 'cache')
+        rules = CompiledRules.load(str(rules_file), cache_dir=cache_dir)
+        assert rules.artifact('prueba', pkg_reglas.builder.build) == 1
+        rules.flush()
+        
+        # Se edita solo el helper: el builder no cambia
+        (package / 'helper.py').write_text('def make():\n    return 20\n', encoding='utf-8')
+        importlib.invalidate_caches()
+        importlib.reload(sys.modules['pkg_reglas.helper'])
+        importlib.reload(pkg_reglas.builder)
+        src.rules._module_source_hash.cache_clear()
+        CompiledRules.clear_registry()
+        warm = CompiledRules.load(str(rules_file), cache_dir=cache_dir)
+        assert warm is not rules
+        assert warm.artifact('prueba', pkg_reglas.builder.build) == 20
+        
+        for name in ('pkg_reglas.builder', 'pkg_reglas.helper', 'pkg_reglas'):
+            sys.modules.pop(name, None)
+    
+    def test_directorio_de_cache_anclado_al_repositorio(self):
+        assert Path(src.rules.DEFAULT_CACHE_DIR) == Path(__file__).resolve().parents[1] / 'data' / 'cache' / 'rules'
+    
+    def test_archivo_inexistente(self, tmp_path):
+        rules = CompiledRules.load(str(tmp_path / 'no_existe.yaml'))
+        assert not rules.found
+        assert rules.rules == {}
+        cleaner = DataCleaner(str(tmp_path / 'no_existe.yaml'))
+        assert cleaner.rules['families'] == {}
@@ -0,0 +1,73 @@
+"""
+Tests para el índice de SKUs del catálogo (woocommerce_catalog_generator).
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import re
+import random
+
+import pytest
+from src.woocommerce_catalog_generator import CatalogSkuIndex, find_sku_in_text
+
+
+def _find_regex(text, catalog_skus):
+    """Implementación de referencia: regex por SKU, del más largo al más corto."""
+    text_upper = text.upper()
+    for sku in sorted(catalog_skus, key=len, reverse=True):
+        sku_escaped = re.escape(sku)
+        for pattern in (rf'\({sku_escaped}\)', rf'\b{sku_escaped}\b', rf'{sku_escaped}$'):
+            if re.search(pattern, text_upper, re.IGNORECASE):
+                return sku
+    return None
+
+
+CATALOGO = {'MT-100', 'MT-1000', 'AB12', '12', 'X-7', 'c-30', '.5'}
+
+
+class TestCatalogSkuIndex:
+    """El índice debe encontrar lo mismo que la búsqueda con regex."""
+    
+    @pytest.mark.parametrize("texto, esperado", [
+        ('ABRAZADERA (MT-1000) ZINC', 'MT-1000'),
+        ('ABRAZADERA MT-100 ZINC', 'MT-100'),
+        ('TORNILLOAB12 ZINC', None),
+        ('TORNILLOAB12', 'AB12'),
+        ('TORNILLO AB12', 'AB12'),
+        ('PERNO X-7 Y 12', 'X-7'),
+        ('perno c-30', 'c-30'),
+        ('CODIGO XAB12\n', 'AB12'),
+        ('PIEZA 0.5', '.5'),
+        ('', None),
+    ])
+    def test_casos(self, texto, esperado):
+        index = CatalogSkuIndex(CATALOGO)
+        assert index.find(texto) == esperado
+        assert _find_regex(texto, CATALOGO) == esperado
+    
+    def test_mas_largo_primero(self):
+        index = CatalogSkuIndex(CATALOGO)
+        assert index.find('KIT MT-100 MT-1000') == 'MT-1000'
+    
+    def test_paridad_aleatoria(self):
+        rnd = random.Random(0)
+        skus = set()
+        while len(skus) < 80:
+            skus.add(''.join(rnd.choice('AB12-./_') for _ in range(rnd.randint(1, 4))))
+        index = CatalogSkuIndex(skus)
+        for _ in range(2000):
+            text = ''.join(rnd.choice('AB12-./ ()_x') for _ in range(rnd.randint(0, 20)))
+            esperado = _find_regex(text, skus)
+            obtenido = index.find(text)
+            if esperado is None:
+                assert obtenido is None, text
+            else:
+                # A igual largo el orden original dependía del set: basta el largo
+                assert obtenido is not None and len(obtenido) == len(esperado), text
+                assert _find_regex(text, {obtenido}) == obtenido
+    
+    def test_funcion_compatible(self):
+        assert find_sku_in_text('ABRAZADERA (MT-1000)', CATALOGO) == 'MT-1000'
+        index = CatalogSkuIndex(CATALOGO)
+        assert find_sku_in_text('PERNO X-7', CATALOGO, index=index) == 'X-7'
@@ -0,0 +1,86 @@
+"""
+Tests para el mapeo persistente de SKUs (woocommerce_catalog_generator).
+"""
+import sys
+import json
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src import woocommerce_catalog_generator
+from src.woocommerce_catalog_generator import SkuMappingStore, load_sku_mapping, save_sku_mapping
+
+
+def _first_match(mapping, local_sku):
+    """Búsqueda anterior: primer SKU del catálogo (en orden) con ese SKU local."""
+    for cat_sku, sku in mapping.items():
+        if sku == local_sku:
+            return cat_sku
+    return None
+
+
+class TestSkuMappingStore:
+    """Búsquedas en ambos sentidos y persistencia en el JSON versionado."""
+    
+    def _store(self, tmp_path):
+        return SkuMappingStore(tmp_path / 'sku_mapping.json')
+    
+    def test_busqueda_en_ambos_sentidos(self, tmp_path):
+        store = self._store(tmp_path)
+        store.upsert('MT-100', '1001')
+        store.upsert('MT-200', '1002')
+        assert store.get_local_sku('MT-100') == '1001'
+        assert store.get_catalog_sku('1002') == 'MT-200'
+        assert store.get_catalog_sku('9999') is None
+        assert store.get_local_sku('XX') is None
+    
+    def test_paridad_con_recorrido_lineal(self, tmp_path):
+        store = self._store(tmp_path)
+        mapping = {}
+        pares = [('A', '1'), ('B', '1'), ('C', '2'), ('A', '2'), ('D', '1'), ('B', '3')]
+        for cat_sku, local_sku in pares:
+            store.upsert(cat_sku, local_sku)
+            mapping[cat_sku] = local_sku
+            for local in ('1', '2', '3', '4'):
+                assert store.get_catalog_sku(local) == _first_match(mapping, local)
+        assert store.to_dict() == mapping
+    
+    def test_guarda_solo_con_cambios(self, tmp_path):
+        json_path = tmp_path / 'sku_mapping.json'
+        store = self._store(tmp_path)
+        assert store.save() == 0
+        assert not json_path.exists()
+        
+        store.upsert('A', '1')
+        store.upsert('B', '2')
+        assert store.save() == 2
+        assert json.loads(json_path.read_text(encoding='utf-8')) == {'A': '1', 'B': '2'}
+        
+        mtime = json_path.stat().st_mtime_ns
+        store.upsert('B', '2')
+        assert store.save() == 0
+        assert json_path.stat().st_mtime_ns == mtime
+        
+        store.upsert('A', '3')
+        assert store.save() == 1
+        reloaded = self._store(tmp_path)
+        assert reloaded.to_dict() == {'A': '3', 'B': '2'}
+        assert reloaded.get_catalog_sku('3') == 'A'
+    
+    def test_carga_json_existente_en_orden(self, tmp_path):
+        json_path = tmp_path / 'sku_mapping.json'
+        json_path.write_text(json.dumps({'A': '1', 'B': '1'}), encoding='utf-8')
+        
+        store = self._store(tmp_path)
+        assert store.get_catalog_sku('1') == 'A'
+        assert store.save() == 0
+
+
+def test_save_sku_mapping_reemplaza_el_anterior(tmp_path, monkeypatch):
+    """save_sku_mapping() escribe el mapeo recibido: lo que no trae se elimina."""
+    json_path = tmp_path / 'sku_mapping.json'
+    monkeypatch.setattr(woocommerce_catalog_generator, 'SKU_MAPPING_PATH', json_path)
+    
+    save_sku_mapping({'A': '1', 'B': '2'})
+    save_sku_mapping({'B': '3'})
+    
+    assert load_sku_mapping() == {'B': '3'}
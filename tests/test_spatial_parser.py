@@ -6,7 +6,8 @@ import sys
 sys.path.insert(0, r"c:\Users\yubyr\source\repos\Catalogo")
 
 import pytest
-from src.catalogo_spatial_parser import parse_spatial_catalog, parse_row_parts, looks_like_sku, clean_logo_text, fix_ocr_errors
+from src import catalogo_spatial_parser
+from src.catalogo_spatial_parser import parse_spatial_catalog, parse_spatial_catalog_parallel, parse_spatial_catalog_incremental, classify_half, iter_spatial_products, SpatialCatalog, detect_page_layout, split_line_halves, parse_row_parts, looks_like_sku, clean_logo_text, fix_ocr_errors, parse_spatial_lines, table_gap_from_positions
 
 
 class TestParseRowParts:
@@ -865,5 +866,342 @@ class TestCatalogStructure:
                 f"Producto {sku} de Perno Coche debe estar bajo Madera: {path}"
 
 
+class TestParallelParsing:
+    """El modo por páginas en paralelo debe dar exactamente lo mismo que el secuencial."""
+    
+    @staticmethod
+    def _two_tables(left, right):
+        return f"{left:<56}{right}"
+    
+    def test_estado_arrastrado_entre_paginas(self):
+        """
+        Caso: tipo de producto, acabado y NOMINAL definidos en una página
+        y heredados por las filas de las páginas siguientes.
+        """
+        lines = [
+            "FIJACIONES - Tornillos para Volcanita",
+            self._two_tables("TORNILLO DRYWALL", "TORNILLO FRAMER"),
+            self._two_tables("CODIGO    NOMINAL    LARGO    ENVASE", "CODIGO    NOMINAL    LARGO    ENVASE"),
+            self._two_tables("Zincado Brillante", "Fosfatizado"),
+            self._two_tables('AB100    #6    1"    500 U', 'FR200    #8    1/2"    100 U'),
+            "<<<",
+            self._two_tables('AB101    2"    500 U', 'FR201    3/4"    100 U'),
+            "<<<",
+            self._two_tables('AB102    3"    500 U', 'FR202    1"    100 U'),
+        ]
+        text = "\n".join(lines)
+        
+        expected = parse_spatial_catalog(text)
+        result = parse_spatial_catalog_parallel(text, max_workers=2, min_pages_per_chunk=1)
+        
+        assert result == expected
+        structure, products = result
+        assert products["AB102"]["category_path"][-1] == "TORNILLO DRYWALL"
+        assert {"name": "NOMINAL", "value": "#8"} in products["FR202"]["attributes"]
+        assert {"name": "Acabado", "value": "Fosfatizado"} in products["FR202"]["attributes"]
+        assert structure["FIJACIONES"]["Tornillos para Volcanita"]["TORNILLO DRYWALL"]["skus"] == ["AB100", "AB101", "AB102"]
+    
+    def test_catalogo_completo_igual_al_secuencial(self):
+        """Cada página en su propio bloque: estructura y orden idénticos."""
+        import os
+        import json
+        txt_path = os.path.join(os.path.dirname(__file__), "..", "pdf", "Catalogo_Mamut_2025.txt")
+        if not os.path.exists(txt_path):
+            pytest.skip("Archivo de catálogo no disponible")
+        with open(txt_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        
+        expected = parse_spatial_catalog(text)
+        result = parse_spatial_catalog_parallel(text, max_workers=2, min_pages_per_chunk=1)
+        
+        assert json.dumps(result, ensure_ascii=False) == json.dumps(expected, ensure_ascii=False)
+
+
+class TestIncrementalParsing:
+    """La caché por página solo re-parsea lo que cambió y da el mismo resultado."""
+    
+    PAGES = [
+        [
+            "FIJACIONES - Tornillos para Volcanita",
+            "TORNILLO DRYWALL".ljust(56) + "TORNILLO FRAMER",
+            "CODIGO    NOMINAL    LARGO    ENVASE".ljust(56) + "CODIGO    NOMINAL    LARGO    ENVASE",
+            "Zincado Brillante".ljust(56) + "Fosfatizado",
+            'AB100    #6    1"    500 U'.ljust(56) + 'FR200    #8    1/2"    100 U',
+        ],
+        ["<<<", 'AB101    2"    500 U'.ljust(56) + 'FR201    3/4"    100 U'],
+        ["<<<", 'AB102    3"    500 U'.ljust(56) + 'FR202    1"    100 U'],
+    ]
+    
+    @classmethod
+    def _text(cls, pages):
+        return "\n".join(line for page in pages for line in page)
+    
+    @pytest.fixture
+    def parsed_pages(self, monkeypatch):
+        """Cuenta las páginas que realmente se parsean."""
+        calls = []
+        original = catalogo_spatial_parser._parse_chunk
+        
+        def counting(lines, *args):
+            calls.append(lines[-1])
+            return original(lines, *args)
+        
+        monkeypatch.setattr(catalogo_spatial_parser, "_parse_chunk", counting)
+        return calls
+    
+    def test_segunda_pasada_desde_cache(self, tmp_path, parsed_pages):
+        text = self._text(self.PAGES)
+        cache = tmp_path / "pages.pkl"
+        
+        first = parse_spatial_catalog_incremental(text, cache)
+        assert len(parsed_pages) == 3
+        
+        second = parse_spatial_catalog_incremental(text, cache)
+        assert len(parsed_pages) == 3
+        assert first == second == parse_spatial_catalog(text)
+    
+    def test_solo_reparsea_paginas_modificadas(self, tmp_path, parsed_pages):
+        cache = tmp_path / "pages.pkl"
+        parse_spatial_catalog_incremental(self._text(self.PAGES), cache)
+        parsed_pages.clear()
+        
+        pages = [list(page) for page in self.PAGES]
+        pages[2][1] = pages[2][1].replace('3"', '4"')
+        text = self._text(pages)
+        
+        result = parse_spatial_catalog_incremental(text, cache)
+        assert len(parsed_pages) == 1
+        assert result == parse_spatial_catalog(text)
+    
+    def test_cambio_de_estado_invalida_paginas_siguientes(self, tmp_path, parsed_pages):
+        """Si cambia el acabado en la página 1, las páginas que lo heredan se re-parsean."""
+        cache = tmp_path / "pages.pkl"
+        parse_spatial_catalog_incremental(self._text(self.PAGES), cache)
+        parsed_pages.clear()
+        
+        pages = [list(page) for page in self.PAGES]
+        pages[0][3] = pages[0][3].replace("Fosfatizado", "Dacromet   ")
+        text = self._text(pages)
+        
+        result = parse_spatial_catalog_incremental(text, cache)
+        assert len(parsed_pages) == 3
+        assert result == parse_spatial_catalog(text)
+        assert {"name": "Acabado", "value": "Dacromet"} in result[1]["FR202"]["attributes"]
+    
+    def test_cache_por_defecto_anclada_al_repositorio(self):
+        from pathlib import Path
+        expected = Path(__file__).resolve().parents[1] / "data" / "cache" / "spatial" / "pages.pkl"
+        assert Path(catalogo_spatial_parser.DEFAULT_PAGE_CACHE) == expected
+
+
+class TestClassifyHalf:
+    """El clasificador compilado debe coincidir con los predicados individuales."""
+    
+    @pytest.mark.parametrize("texto, pendiente, esperado", [
+        ("CODIGO    NOMINAL    LARGO    ENVASE", "", "header"),
+        ("Zincado Brillante", "", "finish"),
+        ("BALDE", "", "finish"),
+        ("TORNILLO DRYWALL", "", "title"),
+        ("TORNILLO PARA ESSVE", "", "title"),
+        ("ESSVE", "", "data"),
+        ("TERRAZAS", "TORNILLO PARA", "continuation"),
+        ("TERRAZAS", "TORNILLO DRYWALL", "data"),
+        ("ROSCA METAL", "", "subtype"),
+        ("ROSCA METAL", "TORNILLO PARA", "continuation"),
+        ("R. METAL PUNTA FINA", "", "subtype"),
+        ('AB100    #6    1"    500 U', "", "data"),
+        ("B01TAD-BM PUNTA BROCA", "", "data"),
+    ])
+    def test_casos(self, texto, pendiente, esperado):
+        assert classify_half(texto, pendiente) == esperado
+    
+    def test_equivale_a_predicados(self):
+        from src.catalogo_spatial_parser import (
+            is_header_line, is_finish_line, is_title_line, is_incomplete_title,
+            is_title_continuation, is_subtype_text,
+        )
+        
+        def por_predicados(part, pending):
+            stripped = part.strip()
+            first = stripped.split()[0] if stripped.split() else ""
+            if is_header_line(part):
+                return "header"
+            if is_finish_line(part):
+                return "finish"
+            if is_title_line(part) and not looks_like_sku(first):
+                return "title"
+            if pending and is_incomplete_title(pending) and is_title_continuation(stripped):
+                return "continuation"
+            if is_subtype_text(stripped) and not looks_like_sku(first):
+                return "subtype"
+            return "data"
+        
+        textos = [
+            "TORNILLO", "PERNO HEX 1/2", "CABLE DE ACERO", "PUNTA BROCA", "MADERA",
+            "Fosfatizado - Continuación", "inox 304", "DECK", "12 PARA", "C/GOLILLA",
+            "CONECTOR PARA MADERA Y CONCRETO CON PERFORACIONES LATERALES", "KNAPP",
+            "X1", "CODIGO ENVASE", "  ROSCA MADERA  ", "Cabeza Plana",
+        ]
+        for texto in textos:
+            for pendiente in ("", "TORNILLO PARA", "PERNO"):
+                assert classify_half(texto, pendiente) == por_predicados(texto, pendiente), (texto, pendiente)
+
+
+class TestStreamingParser:
+    """El parser en streaming entrega los mismos productos sin leer todo el texto."""
+    
+    LINES = TestIncrementalParsing.PAGES[0] + TestIncrementalParsing.PAGES[1] + TestIncrementalParsing.PAGES[2]
+    
+    def test_mismos_productos_que_parse_completo(self):
+        import io
+        text = "\n".join(self.LINES)
+        _, expected = parse_spatial_catalog(text)
+        
+        records = list(iter_spatial_products(io.StringIO(text + "\n")))
+        
+        assert [r["sku"] for r in records] == list(expected)
+        for record in records:
+            sku = record.pop("sku")
+            assert record == expected[sku]
+    
+    def test_entrega_productos_antes_de_terminar(self):
+        consumed = []
+        
+        def lines():
+            for line in self.LINES:
+                consumed.append(line)
+                yield line
+            raise AssertionError("no debería leer hasta el final")
+        
+        stream = iter_spatial_products(lines(), lookahead=5)
+        first, second = next(stream), next(stream)
+        
+        assert (first["sku"], second["sku"]) == ("AB100", "FR200")
+        assert len(consumed) < len(self.LINES)
+    
+    def test_sin_dedup_repite_skus_de_otras_paginas(self):
+        repeated = ["<<<", 'AB101    2"    500 U'.ljust(56) + 'FR201    3/4"    100 U']
+        lines = self.LINES + repeated
+        
+        unique = [r["sku"] for r in iter_spatial_products(lines)]
+        every = [r["sku"] for r in iter_spatial_products(lines, dedup=False)]
+        
+        assert unique == [r["sku"] for r in iter_spatial_products(self.LINES)]
+        assert every == unique + ["AB101", "FR201"]
+
+
+class TestSpatialCatalog:
+    """Representación compacta: misma forma JSON y mismo orden que los dicts anidados."""
+    
+    ADDS = [
+        ("S1", ("FIJACIONES", "DRYWALL"), [("NOMINAL", "#6"), ("Acabado", "Zincado")]),
+        ("S2", ("FIJACIONES",), [("LARGO", '1"')]),
+        ("S3", ("FIJACIONES", "FRAMER"), [("NOMINAL", "#8")]),
+        ("S1", ("FIJACIONES",), [("NOMINAL", "#10")]),
+        ("S2", ("FIJACIONES",), [("LARGO", '2"')]),
+    ]
+    
+    def test_forma_y_orden_json(self):
+        import json
+        catalog = SpatialCatalog()
+        for sku, path, attrs in self.ADDS:
+            catalog.add(sku, path, attrs)
+        structure, products = catalog.to_json()
+        
+        expected_structure = {
+            "FIJACIONES": {
+                "DRYWALL": {"skus": ["S1"]},
+                "skus": ["S2", "S1"],
+                "FRAMER": {"skus": ["S3"]},
+            },
+        }
+        assert json.dumps(structure) == json.dumps(expected_structure)
+        # Gana la primera aparición de cada SKU
+        assert products["S1"] == {
+            "category_path": ["FIJACIONES", "DRYWALL"],
+            "attributes": [{"name": "NOMINAL", "value": "#6"}, {"name": "Acabado", "value": "Zincado"}],
+        }
+        assert list(products) == ["S1", "S2", "S3"]
+    
+    def test_merge_igual_a_agregar_seguido(self):
+        import json
+        whole = SpatialCatalog()
+        first, second = SpatialCatalog(), SpatialCatalog()
+        for i, (sku, path, attrs) in enumerate(self.ADDS):
+            whole.add(sku, path, attrs)
+            (first if i < 2 else second).add(sku, path, attrs)
+        first.merge(second)
+        
+        assert json.dumps(first.to_json()) == json.dumps(whole.to_json())
+    
+    def test_rutas_y_textos_compartidos(self):
+        catalog = SpatialCatalog()
+        catalog.add("A1", ("X", "Y"), [("ENVASE", "100 U")])
+        catalog.add("A2", ("X", "Y"), [("ENVASE", "".join(["100", " U"]))])
+        a1, a2 = catalog.products["A1"], catalog.products["A2"]
+        assert a1.category_path is a2.category_path
+        assert a1.attributes[0][1] is a2.attributes[0][1]
+
+
+class TestPageLayout:
+    """Gutter central detectado una vez por página."""
+    
+    PAGE = [
+        "TORNILLO AUTOPERFORANTE".ljust(62) + "TORNILLO TX",
+        "CODIGO      NOMINAL     ENVASE     Entre Caras".ljust(62) + "CODIGO      NOMINAL     ENVASE",
+        "120ATPF     #12-24      100 U     5/16".ljust(62) + "100TX01     6.3         100 U",
+        " " * 50 + "5/16",
+    ]
+    
+    def test_gutter_de_dos_tablas(self):
+        layout = detect_page_layout(self.PAGE, 53)
+        assert layout.gutter_start >= 0
+        
+        # La columna Entre Caras queda en la tabla izquierda aunque termine
+        # cerca del gap estimado
+        left, right = layout.split(self.PAGE[2])
+        assert left.endswith("5/16")
+        assert right.startswith("100TX01")
+        assert layout.split(self.PAGE[3]) == (" " * 50 + "5/16", "")
+    
+    def test_sin_encabezado_doble_no_hay_gutter(self):
+        """A la derecha hay notas, no una tabla: se divide línea por línea."""
+        page = [self.PAGE[0], self.PAGE[1].rstrip().split("    CODIGO")[0], self.PAGE[2]]
+        layout = detect_page_layout(page, 53)
+        assert layout.gutter_start == -1
+        assert layout.split(self.PAGE[2]) == split_line_halves(self.PAGE[2], 53)
+    
+    def test_seccion_simple_en_pagina_con_gutter(self):
+        """Tabla con PTA TORX y notas a la derecha bajo la de dos tablas: se divide por línea."""
+        simple = [
+            "CODIGO      NOMINAL     LARGO      ENVASE      PTA TORX                  Caracteristicas",
+            "60VS13                  100             50 U      T40                       no fisurado, ladrillo",
+        ]
+        page = self.PAGE + simple
+        layout = detect_page_layout(page, 53)
+        assert layout.gutter_start >= 0
+        assert layout.split(self.PAGE[2])[1].startswith("100TX01")
+        
+        layout.start_section(simple[0])
+        assert layout.split(simple[1]) == split_line_halves(simple[1], 53)
+        
+        layout.start_section(self.PAGE[1])
+        assert layout.split(self.PAGE[2])[1].startswith("100TX01")
+
+
+class TestTableGap:
+    """El gap central sale del mismo cálculo se lean o no las líneas de nuevo."""
+    
+    def test_promedio_y_respaldo(self):
+        assert table_gap_from_positions([60, 63]) == (61, True)
+        assert table_gap_from_positions([]) == (catalogo_spatial_parser.DEFAULT_GAP_END_POS, False)
+    
+    def test_posiciones_ya_ubicadas_igual_a_detectar(self):
+        lines = TestPageLayout.PAGE
+        positions = [line.upper().find("CODIGO", line.upper().find("CODIGO") + 6)
+                     for line in lines if line.upper().count("CODIGO") >= 2]
+        assert parse_spatial_lines(lines, positions) == parse_spatial_lines(lines)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])